@@ -0,0 +1,93 @@
+# Сравнение скорости движков чтения прайс-листов.
+# Каждый файл читается всеми подходящими установленными движками, а также копиями в CSV и Parquet;
+# после очистки цен результаты всех движков должны совпадать.
+#
+#     python benchmarks/bench_readers.py input/old/*.xls* input/new/*.xls*
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_compare.readers import FORMAT_READERS, detect_format, reader_available, read_price_file
+from price_compare.pipeline import PRICE_COLUMN_NEW, load_price_list, clean_price_list
+
+# Читаем и очищаем файл указанным движком, возвращаем время и очищенные цены с артикулами
+def measure(path, reader, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            df, _ = clean_price_list(load_price_list(path, PRICE_COLUMN_NEW, reader=reader), PRICE_COLUMN_NEW, 'бенчмарк')
+        times.append(time.perf_counter() - started)
+    return min(times), df[['Артикул', PRICE_COLUMN_NEW]]
+
+# Копии файла в CSV и Parquet. Parquet хранит колонку одного типа, поэтому
+# текстовые колонки со смешанными значениями сохраняются строками
+def convert(path, directory):
+    df = read_price_file(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    csv_path = os.path.join(directory, f'{name}.csv')
+    df.to_csv(csv_path, index=False)
+    parquet_path = os.path.join(directory, f'{name}.parquet')
+    text = df.copy()
+    for column in text.columns[text.dtypes == object]:
+        text[column] = text[column].map(lambda value: value if pd.isna(value) else str(value))
+    text.columns = [str(column) for column in text.columns]
+    text.to_parquet(parquet_path, index=False)
+    return [csv_path, parquet_path]
+
+# Результаты двух движков совпадают: одинаковые цены (включая пропуски) и артикулы
+def same_result(expected, actual):
+    if len(expected) != len(actual):
+        return False
+    prices_expected = expected[PRICE_COLUMN_NEW].to_numpy(dtype='float64')
+    prices_actual = actual[PRICE_COLUMN_NEW].to_numpy(dtype='float64')
+    articles_expected = expected['Артикул'].astype(str).where(expected['Артикул'].notna(), '')
+    articles_actual = actual['Артикул'].astype(str).where(actual['Артикул'].notna(), '')
+    return (np.array_equal(prices_expected, prices_actual, equal_nan=True)
+            and (articles_expected.to_numpy() == articles_actual.to_numpy()).all())
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение скорости движков чтения прайс-листов')
+    parser.add_argument('files', nargs='+', help='файлы прайс-листов')
+    parser.add_argument('--repeat', type=int, default=3, help='число повторов (берется лучшее время)')
+    args = parser.parse_args()
+    
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for path in args.files:
+            copies = convert(path, directory)
+            reference = None
+            for source in [path] + copies:
+                for reader in FORMAT_READERS[detect_format(source)]:
+                    if not reader_available(reader):
+                        continue
+                    elapsed, result = measure(source, reader, args.repeat)
+                    if reference is None:
+                        reference = result
+                    rows.append({
+                        'Файл': os.path.basename(path),
+                        'Формат': detect_format(source),
+                        'Движок': reader,
+                        'Строк': len(result),
+                        'Время, с': round(elapsed, 3),
+                        'Совпадает': same_result(reference, result),
+                    })
+    
+    report = pd.DataFrame(rows)
+    # Ускорение относительно самого медленного движка для того же файла
+    report['Ускорение'] = (report.groupby('Файл')['Время, с'].transform('max') / report['Время, с']).round(1)
+    print(report.to_string(index=False))
+    if not report['Совпадает'].all():
+        print("\nВНИМАНИЕ: результаты движков отличаются")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
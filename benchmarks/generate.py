@@ -0,0 +1,170 @@
+# Генератор синтетических прайс-листов предыдущего и следующего года в формате,
+# который ожидает сравнение: № услуги, Артикул, Наименование услуги, цена в последней колонке.
+#
+#     python benchmarks/generate.py --rows 100000 --format xlsx --output benchmarks/data/100k
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+# Максимум строк на листе .xls (вместе со строкой заголовка)
+XLS_MAX_ROWS = 65536
+
+SERVICE_KINDS = ['Консультация', 'Прием', 'Осмотр', 'Исследование', 'Анализ', 'Процедура', 'Диагностика',
+                 'Обследование', 'Манипуляция', 'Курс лечения', 'Повторный прием', 'Экспертиза']
+SERVICE_OBJECTS = ['врача-терапевта', 'врача-хирурга', 'врача-кардиолога', 'крови общий', 'мочи общий',
+                   'ультразвуковое брюшной полости', 'рентгенологическое грудной клетки', 'функции внешнего дыхания',
+                   'электрокардиографическое', 'гормонального статуса', 'биохимический крови', 'офтальмолога',
+                   'невролога', 'физиотерапевтическая', 'массаж спины', 'вакцинация']
+SECTION_NAMES = ['Консультации специалистов', 'Лабораторные исследования', 'Функциональная диагностика',
+                 'Ультразвуковые исследования', 'Рентгенология', 'Физиотерапия', 'Процедурный кабинет',
+                 'Стоматология', 'Вакцинация', 'Медицинские осмотры']
+
+# Цены в виде "грязных" строк, как их вводят вручную: пробелы между разрядами
+# (в том числе неразрывные), запятая вместо точки, апостроф в начале, пробелы по краям
+MESSY_FORMATS = [
+    lambda price: f"{price:,.2f}".replace(',', ' ').replace('.', ','),
+    lambda price: f"{price:,.2f}".replace(',', '\xa0').replace('.', ','),
+    lambda price: f"'{price:.2f}",
+    lambda price: f" {price:.2f} ",
+    lambda price: f"{price:.2f}".replace('.', ','),
+]
+
+# Строим прайс предыдущего года: позиции с артикулами, наименованиями и ценами
+def generate_items(rows, rng, numeric_articles=0.1):
+    ids = np.arange(rows)
+    articles = pd.Series([f'A{i:07d}' for i in ids], dtype=object)
+    numeric = rng.random(rows) < numeric_articles
+    articles[numeric] = (ids[numeric] + 1000000).tolist()
+    names = (pd.Series(rng.choice(SERVICE_KINDS, rows)) + ' ' + pd.Series(rng.choice(SERVICE_OBJECTS, rows))
+             + ' (код ' + pd.Series(ids).astype(str) + ')')
+    prices = np.round(rng.lognormal(7, 1, rows), -1).clip(50, 500000)
+    return pd.DataFrame({'article': articles, 'name': names, 'price': prices})
+
+# Изменяем прайс для следующего года: часть позиций удаляется, часть получает новую цену,
+# часть добавляется (новые позиции вставляются в случайные места)
+def next_year(items, rng, removed, added, changed, max_change):
+    rows = len(items)
+    kept = items[rng.random(rows) >= removed].copy()
+    
+    change = rng.random(len(kept)) < changed
+    percent = rng.uniform(-max_change, max_change, change.sum())
+    kept.loc[change, 'price'] = np.round(kept.loc[change, 'price'] * (1 + percent / 100), 2)
+    
+    count = int(rows * added)
+    ids = np.arange(rows, rows + count)
+    new_items = pd.DataFrame({
+        'article': [f'N{i:07d}' for i in ids],
+        'name': pd.Series(rng.choice(SERVICE_KINDS, count)) + ' ' + pd.Series(rng.choice(SERVICE_OBJECTS, count))
+                + ' (новая, код ' + pd.Series(ids).astype(str) + ')',
+        'price': np.round(rng.lognormal(7, 1, count), -1).clip(50, 500000),
+    })
+    # Новые позиции встают после случайных существующих
+    kept['order'] = np.arange(len(kept), dtype='float64')
+    new_items['order'] = rng.uniform(0, len(kept), count)
+    return pd.concat([kept, new_items]).sort_values('order', kind='stable').drop(columns='order').reset_index(drop=True)
+
+# Приводим позиции к виду прайса: нумерация, заголовки разделов через каждые section_every
+# позиций (в обоих прайсах одни и те же) и часть цен в виде "грязных" строк
+def to_price_list(items, rng, section_every, messy):
+    df = pd.DataFrame({
+        COLUMNS[0]: np.arange(1, len(items) + 1).astype(object),
+        COLUMNS[1]: items['article'].to_numpy(),
+        COLUMNS[2]: items['name'].to_numpy(),
+        COLUMNS[3]: items['price'].to_numpy(dtype=object),
+    })
+    
+    dirty = np.flatnonzero(rng.random(len(df)) < messy)
+    formats = rng.integers(0, len(MESSY_FORMATS), len(dirty))
+    prices = df[COLUMNS[3]].to_numpy()
+    prices[dirty] = [MESSY_FORMATS[kind](float(price)) for kind, price in zip(formats, prices[dirty])]
+    df[COLUMNS[3]] = prices
+    
+    if section_every:
+        # Заголовки разделов: заполнено только наименование
+        positions = np.arange(0, len(df), section_every)
+        sections = pd.DataFrame({
+            COLUMNS[0]: np.nan,
+            COLUMNS[1]: np.nan,
+            COLUMNS[2]: [SECTION_NAMES[i % len(SECTION_NAMES)] + f' (раздел {i + 1})' for i in range(len(positions))],
+            COLUMNS[3]: np.nan,
+        })
+        df['order'] = np.arange(len(df), dtype='float64')
+        sections['order'] = positions - 0.5
+        df = pd.concat([df, sections]).sort_values('order', kind='stable').drop(columns='order').reset_index(drop=True)
+    return df
+
+# Записываем .xlsx потоком (write_only) - в несколько раз быстрее DataFrame.to_excel
+def write_xlsx(df, path):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    for values in df.itertuples(index=False, name=None):
+        ws.append([None if isinstance(value, float) and np.isnan(value) else value for value in values])
+    wb.save(path)
+
+def write_xls(df, path):
+    import xlwt
+    if len(df) >= XLS_MAX_ROWS:
+        raise ValueError(f"Формат .xls вмещает не более {XLS_MAX_ROWS - 1} строк, а в прайсе {len(df)}")
+    book = xlwt.Workbook(encoding='utf-8')
+    sheet = book.add_sheet('Прайс')
+    for col, column in enumerate(df.columns):
+        sheet.write(0, col, column)
+    for row, values in enumerate(df.itertuples(index=False, name=None), 1):
+        for col, value in enumerate(values):
+            if not (isinstance(value, float) and np.isnan(value)):
+                sheet.write(row, col, value)
+    book.save(path)
+
+def write_csv(df, path):
+    df.to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+
+WRITERS = {'xlsx': write_xlsx, 'xls': write_xls, 'csv': write_csv}
+
+# Формируем пару прайсов и сохраняем их в output_dir/old.<формат> и output_dir/new.<формат>.
+# Возвращаем пути к файлам
+def generate_pair(output_dir, rows, file_format='xlsx', section_every=25, messy=0.3, removed=0.02, added=0.02,
+                  changed=0.5, max_change=15, seed=0):
+    rng = np.random.default_rng(seed)
+    items_old = generate_items(rows, rng)
+    items_new = next_year(items_old, rng, removed, added, changed, max_change)
+    
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, items in [('old', items_old), ('new', items_new)]:
+        path = os.path.join(output_dir, f'{name}.{file_format}')
+        WRITERS[file_format](to_price_list(items, rng, section_every, messy), path)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description='Генератор синтетических прайс-листов для сравнения')
+    parser.add_argument('--rows', type=int, default=1000, help='число позиций в прайсе предыдущего года')
+    parser.add_argument('--format', choices=list(WRITERS), default='xlsx', help='формат файлов')
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'data'), help='папка для файлов')
+    parser.add_argument('--section-every', type=int, default=25,
+                        help='заголовок раздела через каждые N позиций (0 - без разделов)')
+    parser.add_argument('--messy', type=float, default=0.3, help='доля цен в виде строк с пробелами, запятыми и апострофами')
+    parser.add_argument('--removed', type=float, default=0.02, help='доля позиций, удаленных в новом прайсе')
+    parser.add_argument('--added', type=float, default=0.02, help='доля новых позиций в новом прайсе')
+    parser.add_argument('--changed', type=float, default=0.5, help='доля позиций с измененной ценой')
+    parser.add_argument('--max-change', type=float, default=15, help='максимальное изменение цены, %%')
+    parser.add_argument('--seed', type=int, default=0, help='начальное значение генератора случайных чисел')
+    args = parser.parse_args()
+    
+    try:
+        paths = generate_pair(args.output, args.rows, args.format, args.section_every, args.messy, args.removed,
+                              args.added, args.changed, args.max_change, args.seed)
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
+    print(f"Созданы файлы: {', '.join(paths)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# Замер производительности сравнения на синтетических прайс-листах разного размера.
+# Для каждого размера время и пиковая память каждого этапа (read, clean, match, diff, stats,
+# render, save) меряются в отдельном процессе; результаты сохраняются в JSON.
+# Пиковая память по этапам через tracemalloc (--tracemalloc) точнее, но заметно замедляет этапы,
+# поэтому по умолчанию записывается только пиковый RSS каждого этапа.
+#
+#     python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 1000000
+#     python benchmarks/run_benchmarks.py --baseline benchmarks/results/прошлый.json
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import pandas as pd
+
+from generate import generate_pair
+from price_compare.pipeline import (
+    PRICE_COLUMN_OLD, PRICE_COLUMN_NEW, Comparison, load_price_list, clean, match, diff, calculate_stats,
+)
+from price_compare.writer import build_result
+from price_compare.instrumentation import StageMonitor, environment
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Этап считается замедлившимся, если стал медленнее базового замера больше чем на эту долю
+REGRESSION_THRESHOLD = 0.2
+
+# Прогоняем все этапы сравнения для одной пары файлов, замеряя время и пиковую память каждого.
+# Вывод сравнения в консоль подавляется, чтобы не влиять на замер
+def measure_pair(file_old, file_new, trace_memory=False):
+    monitor = StageMonitor(trace_memory)
+    
+    def run(stage, action):
+        with monitor.stage(stage), open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return action()
+    
+    comparison = run('read', lambda: Comparison(load_price_list(file_old, PRICE_COLUMN_OLD),
+                                                load_price_list(file_new, PRICE_COLUMN_NEW)))
+    rows_old, rows_new = len(comparison.df_old), len(comparison.df_new)
+    run('clean', lambda: clean(comparison))
+    run('match', lambda: match(comparison))
+    run('diff', lambda: diff(comparison))
+    run('stats', lambda: calculate_stats(comparison))
+    workbook = run('render', lambda: build_result(
+        comparison.df_result, PRICE_COLUMN_NEW, comparison.removed_services, comparison.new_services,
+        comparison.total_change_percent, comparison.total_old_common, comparison.total_new_common))
+    with tempfile.TemporaryDirectory() as directory:
+        run('save', lambda: workbook.save(os.path.join(directory, 'result.xlsx')))
+    
+    return {
+        'rows_old': rows_old,
+        'rows_new': rows_new,
+        'stages': {record.pop('stage'): record for record in monitor.stages},
+        'total_seconds': monitor.total_seconds(),
+        'max_rss_mb': round(max(record['peak_rss_mb'] for record in monitor.stages), 1),
+    }
+
+# Замер одного размера в отдельном процессе: пиковый RSS не накапливается между размерами
+def measure_in_subprocess(file_old, file_new, trace_memory=False):
+    command = [sys.executable, '-W', 'ignore', os.path.abspath(__file__), '--measure', file_old, file_new]
+    if trace_memory:
+        command.append('--tracemalloc')
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+# Файлы для размера генерируются один раз и переиспользуются в следующих запусках
+def prepare_files(data_dir, rows, file_format, seed):
+    directory = os.path.join(data_dir, f'{file_format}_{rows}_{seed}')
+    paths = [os.path.join(directory, f'{name}.{file_format}') for name in ('old', 'new')]
+    if not all(os.path.exists(path) for path in paths):
+        print(f"Генерируем прайсы на {rows} позиций ({file_format})...")
+        paths = generate_pair(directory, rows, file_format, seed=seed)
+    return paths
+
+# Версия кода для отчета: текущий коммит git, если он доступен
+def code_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=BENCHMARKS_DIR,
+                              check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Сравниваем с базовым замером: отношение времени по этапам и замедлившиеся этапы
+def compare_with_baseline(report, baseline_file):
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {result['rows']: result for result in json.load(f)['results']}
+    
+    regressions = []
+    rows = []
+    for result in report['results']:
+        base = baseline.get(result['rows'])
+        if base is None:
+            continue
+        for stage, values in result['stages'].items():
+            base_seconds = base['stages'].get(stage, {}).get('seconds')
+            if not base_seconds:
+                continue
+            ratio = values['seconds'] / base_seconds
+            rows.append({'Позиций': result['rows'], 'Этап': stage, 'Было, с': base_seconds,
+                         'Стало, с': values['seconds'], 'Отношение': round(ratio, 2)})
+            if ratio > 1 + REGRESSION_THRESHOLD and values['seconds'] - base_seconds > 0.05:
+                regressions.append(f"{result['rows']} позиций, этап {stage}: {base_seconds} с -> {values['seconds']} с")
+    
+    print(f"\nСравнение с {baseline_file}:")
+    print(pd.DataFrame(rows).to_string(index=False))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер производительности сравнения прайс-листов')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='размеры прайсов (число позиций)')
+    parser.add_argument('--format', choices=['xlsx', 'xls', 'csv'], default='xlsx', help='формат входных файлов')
+    parser.add_argument('--seed', type=int, default=0, help='начальное значение генератора прайсов')
+    parser.add_argument('--data-dir', default=os.path.join(BENCHMARKS_DIR, 'data'), help='папка для сгенерированных прайсов')
+    parser.add_argument('--output', help='JSON-файл с результатами (по умолчанию - benchmarks/results/<дата>.json)')
+    parser.add_argument('--baseline', help='JSON-файл прошлого замера для поиска замедлений')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='замерять пиковую память каждого этапа через tracemalloc (замедляет этапы)')
+    parser.add_argument('--measure', nargs=2, metavar=('OLD', 'NEW'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    # Внутренний режим: замер одной пары в текущем процессе
+    if args.measure:
+        print(json.dumps(measure_pair(*args.measure, trace_memory=args.tracemalloc)))
+        return
+    
+    report = {
+        'version': code_version(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        **environment(),
+        'format': args.format,
+        'tracemalloc': args.tracemalloc,
+        'results': [],
+    }
+    for rows in args.sizes:
+        file_old, file_new = prepare_files(args.data_dir, rows, args.format, args.seed)
+        print(f"Замер: {rows} позиций...")
+        result = dict(rows=rows, **measure_in_subprocess(file_old, file_new, args.tracemalloc))
+        report['results'].append(result)
+        times = ', '.join(f"{stage} {values['seconds']:.2f}" for stage, values in result['stages'].items())
+        print(f"  {result['total_seconds']:.2f} с ({times}), пиковый RSS {result['max_rss_mb']} МБ")
+    
+    output = args.output or os.path.join(BENCHMARKS_DIR, 'results', time.strftime('%Y-%m-%d_%H-%M-%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в файл '{output}'")
+    
+    if args.baseline:
+        regressions = compare_with_baseline(report, args.baseline)
+        if regressions:
+            print("\nЗамедления относительно базового замера:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
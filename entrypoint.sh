@@ -27,4 +27,4 @@ ls -la /app/input/new
 
 # Запуск основного скрипта
 echo "Запуск скрипта сравнения цен..."
-python compare_prices.py
+python compare_prices.py "$@"
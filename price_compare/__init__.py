@@ -0,0 +1,53 @@
+# Сравнение прайс-листов предыдущего и следующего года.
+# Конвейер load -> clean -> match -> (fuzzy) -> diff -> stats -> render -> (export) можно вызывать из Python
+# с путями к файлам или готовыми DataFrame:
+#
+#     from price_compare import compare
+#     comparison = compare('old.xlsx', 'new.xlsx', 'result.xlsx')
+#     print(comparison.stats)
+import importlib
+
+from .cleaning import TEXT_DTYPE, clean_price, normalize_articles, normalize_prices, validate_prices
+from .matching import build_article_index, collect_services, PriceLookup
+from .changes import (
+    CHANGE_CATEGORIES, DEFAULT_CHANGE_THRESHOLD, calculate_price_changes, format_changes, classify_changes, category_titles,
+)
+from .writer import EXCEL_MAX_ROWS, write_result
+from .pipeline import (
+    PRICE_COLUMN_OLD, PRICE_COLUMN_NEW, Comparison,
+    load_price_list, standard_columns, clean_prices, clean_price_list, prepare_price_list, add_price_changes,
+    load, clean, match, diff, calculate_stats, render, export, report_stats,
+    compare, compare_loaded, write_run_report, run_comparison,
+)
+from .readers import (
+    READERS, DEFAULT_CHUNK_ROWS, SHEET_COLUMN, detect_format, select_reader, read_price_file, read_workbook,
+    iter_price_file,
+)
+from .cache import PriceListCache
+from .sections import NO_SECTION, SectionTotals, locate_sections, assign_sections, section_rows, section_statistics, changed_rows, iter_changed_rows
+from .export import EXPORT_FORMATS, EXPORT_SCHEMA, DiffExporter, export_diff, export_file_name
+from .fuzzy import DEFAULT_FUZZY_CONFIDENCE, article_keys, fuzzy_pairs, match_fuzzy
+from .incremental import run_manifest_file, build_run_manifest, load_run_manifest, unchanged_sides, is_up_to_date
+from .instrumentation import STAGES, StageMonitor, configure_logging, frame_memory_mb
+
+# Режимы, которые нужны не при каждом запуске (потоковое и многоверсионное сравнение, история цен,
+# пакетный режим, наблюдение за папками, HTTP-сервис), импортируются при первом обращении к их именам
+LAZY_EXPORTS = {
+    'streaming': ['build_price_index', 'compare_streaming'],
+    'multiway': ['MultiComparison', 'compare_many', 'compare_many_loaded'],
+    'history': ['PriceHistory', 'ingest_price_list', 'compare_versions', 'compare_many_versions'],
+    'batch': ['find_pairs', 'read_manifest', 'run_batch'],
+    'watch': ['watch'],
+    'server': ['ComparisonService', 'serve'],
+}
+LAZY_MODULES = {name: module for module, names in LAZY_EXPORTS.items() for name in names}
+
+def __getattr__(name):
+    if name not in LAZY_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{LAZY_MODULES[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_MODULES))
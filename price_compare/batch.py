@@ -0,0 +1,141 @@
+# Пакетное сравнение многих пар прайс-листов в пуле процессов
+import os
+import re
+import csv
+import glob
+import time
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .pipeline import run_comparison
+from .readers import DEFAULT_CHUNK_ROWS
+from .writer import EXCEL_MAX_ROWS
+from .changes import DEFAULT_CHANGE_THRESHOLD
+
+
+# Формируем название выходного файла по имени прайса следующего года
+def default_output_file(input_file_new, result_dir='result'):
+    return os.path.join(result_dir, f'Сравнение прайсов ({os.path.basename(input_file_new)}).xlsx')
+
+# Ключ для сопоставления файлов по имени: без расширения, регистра, годов и разделителей,
+# чтобы "Прайс 2024.xls" и "прайс_2025.xlsx" попали в одну пару
+def pair_key(path):
+    name = os.path.splitext(os.path.basename(path))[0].lower()
+    name = re.sub(r'(?<!\d)(19|20)\d{2}(?!\d)', '', name)
+    return re.sub(r'[\s_\-.()]+', ' ', name).strip()
+
+# Подбираем пары прайсов из папок old и new по совпадающим именам файлов
+def find_pairs(old_dir, new_dir):
+    old_files = {}
+    for path in sorted(glob.glob(os.path.join(old_dir, '*.*'))):
+        old_files.setdefault(pair_key(path), path)
+    
+    pairs = []
+    for path in sorted(glob.glob(os.path.join(new_dir, '*.*'))):
+        old_path = old_files.get(pair_key(path))
+        if old_path is None:
+            print(f"Пропускаем {path}: в папке '{old_dir}' нет прайса с таким же именем")
+            continue
+        pairs.append((old_path, path, default_output_file(path)))
+    return pairs
+
+# Читаем пары из CSV-манифеста с колонками old, new и необязательной output.
+# Разделитель (запятая, точка с запятой или табуляция) определяется автоматически,
+# относительные пути считаются от папки манифеста
+def read_manifest(manifest_file):
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    with open(manifest_file, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        rows = list(csv.DictReader(f, dialect=dialect))
+    
+    pairs = []
+    for row in rows:
+        if not row.get('old') or not row.get('new'):
+            continue
+        old_path = os.path.join(base_dir, row['old'].strip())
+        new_path = os.path.join(base_dir, row['new'].strip())
+        output = (row.get('output') or '').strip()
+        pairs.append((old_path, new_path, os.path.join(base_dir, output) if output else default_output_file(new_path)))
+    return pairs
+
+# Сравнение одной пары в рабочем процессе. Вывод сравнения пишется в лог рядом с результатом,
+# ошибка не пробрасывается наружу, а возвращается в строке сводки
+def compare_pair(input_file_old, input_file_new, output_file, issues_sheet=False, cache=None, reader='auto',
+                 profile_stages=(), trace_memory=False, streaming=False, chunk_rows=DEFAULT_CHUNK_ROWS, force=False,
+                 history=None, fuzzy=None, export_format=None, xlsx=True, max_rows=EXCEL_MAX_ROWS,
+                 change_threshold=DEFAULT_CHANGE_THRESHOLD, changes_only=None):
+    row = {
+        'Прайс предыдущего года': input_file_old,
+        'Прайс следующего года': input_file_new,
+        'Результат': output_file,
+    }
+    started = time.perf_counter()
+    log_file = os.path.splitext(output_file)[0] + '.log'
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(log_file, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            # Пары уже сравниваются параллельно, поэтому файлы внутри пары читаются по очереди
+            row.update(run_comparison(input_file_old, input_file_new, output_file, issues_sheet, cache,
+                                      parallel_load=False, reader=reader, profile_stages=profile_stages,
+                                      trace_memory=trace_memory, streaming=streaming, chunk_rows=chunk_rows,
+                                      force=force, history=history, fuzzy=fuzzy, export_format=export_format,
+                                      xlsx=xlsx, max_rows=max_rows, change_threshold=change_threshold,
+                                      changes_only=changes_only))
+            row['Статус'] = 'OK'
+        except Exception as e:
+            traceback.print_exc(file=log)
+            row['Статус'] = 'Ошибка'
+            row['Ошибка'] = str(e)
+    row['Время, с'] = round(time.perf_counter() - started, 1)
+    return row
+
+# Сравниваем пары прайсов параллельно в пуле процессов и сохраняем сводную таблицу
+# (без summary_file - только выводим). Одна неудачная пара (включая аварийное завершение процесса)
+# не прерывает остальные. executor - готовый пул процессов (режим наблюдения держит его между запусками)
+def run_batch(pairs, workers=None, issues_sheet=False, summary_file=os.path.join('result', 'Сводка сравнения прайсов.xlsx'),
+              cache=None, reader='auto', profile_stages=(), trace_memory=False, streaming=False,
+              chunk_rows=DEFAULT_CHUNK_ROWS, force=False, executor=None, history=None, fuzzy=None, export_format=None,
+              xlsx=True, max_rows=EXCEL_MAX_ROWS, change_threshold=DEFAULT_CHANGE_THRESHOLD, changes_only=None):
+    print(f"Пакетное сравнение: {len(pairs)} пар, процессов: {workers or os.cpu_count()}")
+    rows = [None] * len(pairs)
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        futures = {
+            executor.submit(compare_pair, old, new, output, issues_sheet, cache, reader, profile_stages, trace_memory,
+                            streaming, chunk_rows, force, history, fuzzy, export_format, xlsx, max_rows,
+                            change_threshold, changes_only): index
+            for index, (old, new, output) in enumerate(pairs)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            old, new, output = pairs[index]
+            try:
+                rows[index] = future.result()
+            except Exception as e:
+                rows[index] = {
+                    'Прайс предыдущего года': old,
+                    'Прайс следующего года': new,
+                    'Результат': output,
+                    'Статус': 'Ошибка',
+                    'Ошибка': f"Процесс сравнения завершился аварийно: {e}",
+                }
+            print(f"[{done}/{len(pairs)}] {rows[index]['Статус']}: {new}")
+    
+    # Пары и статус - в начале таблицы, ошибки и время выполнения - после статистики
+    summary = pd.DataFrame(rows).convert_dtypes()
+    head_columns = ['Прайс предыдущего года', 'Прайс следующего года', 'Статус']
+    tail_columns = [column for column in ['Ошибка', 'Время, с'] if column in summary.columns]
+    stats_columns = [column for column in summary.columns if column not in head_columns + tail_columns + ['Результат']]
+    summary = summary[head_columns + stats_columns + tail_columns + ['Результат']]
+    print("\nСводка пакетного сравнения:")
+    print(summary.drop(columns=['Результат']).to_string(index=False))
+    if summary_file is not None:
+        summary.to_excel(summary_file, index=False)
+        print(f"\nСводка сохранена в файл '{summary_file}'")
+    return summary
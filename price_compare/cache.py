@@ -0,0 +1,177 @@
+# Кэш разобранных прайс-листов на диске: очищенный DataFrame и таблица проблем
+# хранятся в Parquet и ищутся по хэшу содержимого файла и настройкам разбора
+import os
+import json
+import uuid
+import hashlib
+import datetime
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .cleaning import TEXT_DTYPE
+
+# Строковые колонки Arrow восстанавливаются в TEXT_DTYPE без промежуточных объектов Python
+TEXT_TYPES = {pa.string(): TEXT_DTYPE, pa.large_string(): TEXT_DTYPE}
+
+# Версия формата записей кэша: при изменении очистки или формата старые записи просто не находятся
+CACHE_VERSION = 4
+
+DEFAULT_CACHE_DIR = 'cache'
+DEFAULT_CACHE_SIZE_MB = 500
+
+# Типы значений, которые могут встретиться в текстовых колонках Excel,
+# и их преобразование в строку и обратно (для колонок со значениями разных типов)
+VALUE_TYPES = [
+    ('bool', bool, str, lambda text: text == 'True'),
+    ('int', int, str, int),
+    ('float', float, repr, float),
+    ('str', str, str, str),
+    ('datetime', datetime.datetime, lambda value: value.isoformat(), datetime.datetime.fromisoformat),
+    ('time', datetime.time, lambda value: value.isoformat(), datetime.time.fromisoformat),
+]
+VALUE_DECODERS = {name: decode for name, _, _, decode in VALUE_TYPES}
+
+# Хэш содержимого файла (читаем блоками, чтобы не держать файл в памяти)
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Значение колонки со смешанными типами в виде пары (тип, строка)
+def encode_value(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return 'null', ''
+    for name, kind, encode, _ in VALUE_TYPES:
+        if isinstance(value, kind):
+            return name, encode(value)
+    raise TypeError(f"Значение типа {type(value).__name__} не поддерживается кэшем")
+
+# Parquet хранит в колонке значения одного типа, поэтому колонки, где вперемешку
+# числа и строки (например, артикулы), сохраняем как строки с отдельной колонкой типов
+def encode_frame(df):
+    columns = {}
+    layout = []
+    for position, (name, values) in enumerate(df.items()):
+        column = f'c{position}'
+        mixed = values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty')
+        if mixed:
+            kinds, texts = zip(*map(encode_value, values)) if len(values) else ((), ())
+            columns[column] = pa.array(texts, type=pa.string())
+            columns[column + '_type'] = pa.array(kinds, type=pa.string()).dictionary_encode()
+        else:
+            columns[column] = values.reset_index(drop=True)
+        layout.append({'name': encode_value(name), 'column': column, 'mixed': mixed, 'object': values.dtype == object,
+                       'text': isinstance(values.dtype, pd.StringDtype)})
+    table = pa.table(columns) if columns else pa.table({})
+    return table.replace_schema_metadata({'price_compare': json.dumps(layout, ensure_ascii=False)})
+
+# Восстанавливаем DataFrame в том виде, в котором он был до сохранения
+def decode_frame(table):
+    layout = json.loads(table.schema.metadata[b'price_compare'])
+    data = {}
+    for position, item in enumerate(layout):
+        if item.get('text'):
+            data[position] = table.column(item['column']).to_pandas(types_mapper=TEXT_TYPES.get).array
+            continue
+        texts = table.column(item['column']).to_pandas()
+        if item['mixed']:
+            kinds = table.column(item['column'] + '_type').to_pandas().astype(str)
+            values = np.full(len(texts), np.nan, dtype=object)
+            for kind in kinds.unique():
+                if kind != 'null':
+                    selected = (kinds == kind).to_numpy()
+                    values[selected] = [VALUE_DECODERS[kind](text) for text in texts[selected]]
+        elif item['object']:
+            # Пропуски в текстовых колонках read_excel возвращает как NaN, а не None
+            values = texts.astype(object).where(texts.notna(), np.nan).to_numpy(dtype=object)
+        else:
+            values = texts.to_numpy()
+        data[position] = values
+    df = pd.DataFrame(data, index=pd.RangeIndex(table.num_rows))
+    df.columns = [
+        np.nan if item['name'][0] == 'null' else VALUE_DECODERS[item['name'][0]](item['name'][1])
+        for item in layout
+    ]
+    return df
+
+# Кэш разобранных прайсов с ограничением общего размера: при переполнении
+# удаляются записи, которые дольше всего не использовались (время изменения
+# файла обновляется при каждом попадании)
+class PriceListCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_CACHE_SIZE_MB):
+        self.directory = directory
+        self.max_size = max_size_mb * 1024 * 1024
+    
+    # Ключ записи: содержимое файла и все настройки, от которых зависит результат разбора
+    def key(self, path, settings):
+        settings = dict(settings, cache_version=CACHE_VERSION, pandas=pd.__version__)
+        digest = hashlib.sha256(file_hash(path).encode())
+        digest.update(json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str).encode())
+        return digest.hexdigest()
+    
+    def paths(self, key):
+        return os.path.join(self.directory, f'{key}.parquet'), os.path.join(self.directory, f'{key}.issues.parquet')
+    
+    # Возвращаем (DataFrame, проблемы) или None, если записи нет или она повреждена
+    def get(self, key):
+        data_path, issues_path = self.paths(key)
+        try:
+            df = decode_frame(pq.read_table(data_path))
+            issues = decode_frame(pq.read_table(issues_path))
+            os.utime(data_path)
+            os.utime(issues_path)
+        except (OSError, ValueError, KeyError, pa.ArrowException):
+            return None
+        return df, issues
+    
+    # Сохраняем запись (через временные файлы, чтобы параллельные процессы не увидели
+    # недописанный файл) и освобождаем место. Ошибка записи в кэш не мешает сравнению
+    def put(self, key, df, issues):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            for path, frame in zip(self.paths(key), (df, issues)):
+                temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+                pq.write_table(encode_frame(frame), temp_path)
+                os.replace(temp_path, path)
+        except (OSError, TypeError, pa.ArrowException) as e:
+            print(f"Не удалось сохранить прайс в кэш: {e}")
+            return
+        self.evict()
+    
+    # Удаляем самые давно использованные записи, пока кэш не уложится в ограничение
+    def evict(self):
+        entries = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.parquet'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            key = name.split('.')[0]
+            size, used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+        
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda entry: entry[1][1]):
+            if total <= self.max_size:
+                break
+            for path in self.paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+    
+    # Полная очистка кэша
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(('.parquet', '.tmp')):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,58 @@
+# Расчет изменения цен и его категории
+import pandas as pd
+import numpy as np
+
+from .cleaning import round_values
+
+# Категории изменения цены: повышение и снижение больше порога (по умолчанию 5%),
+# небольшое изменение и цена без изменений
+CHANGE_CATEGORIES = ['up', 'down', 'small', 'none']
+DEFAULT_CHANGE_THRESHOLD = 5.0
+
+# Вычисляем процентное изменение цен для колонок целиком (с округлением до 0.1%).
+# Изменение не считается, если нет одной из цен или старая цена равна нулю
+def calculate_price_changes(prices_old, prices_new):
+    prices_old = np.asarray(prices_old, dtype='float64')
+    prices_new = np.asarray(prices_new, dtype='float64')
+    change = np.full(len(prices_old), np.nan)
+    valid = ~np.isnan(prices_old) & ~np.isnan(prices_new) & (prices_old != 0)
+    change[valid] = round_values((prices_new[valid] - prices_old[valid]) / prices_old[valid] * 100, 1)
+    return change
+
+# Форматируем процентное изменение для отображения: "+4.0%", "-3.5%", пустая строка без значения
+def format_changes(change):
+    change = np.asarray(change, dtype='float64')
+    text = np.full(len(change), '', dtype=object)
+    valid = ~np.isnan(change)
+    # np.char.mod на пустом массиве возвращает float, а не строки
+    if not valid.any():
+        return text
+    signs = np.where(change[valid] > 0, '+', '')
+    text[valid] = np.char.add(signs, np.char.mod('%.1f%%', change[valid]))
+    return text
+
+# Определяем категорию изменения цены (CHANGE_CATEGORIES) для колонки целиком;
+# threshold - порог значительного изменения, %
+def classify_changes(change, threshold=DEFAULT_CHANGE_THRESHOLD):
+    change = np.asarray(change, dtype='float64')
+    categories = np.select(
+        [change > threshold, change < -threshold, change != 0],  # Значительное повышение, снижение, небольшое изменение
+        ['up', 'down', 'small'],
+        default='none'
+    ).astype(object)
+    categories[np.isnan(change)] = np.nan
+    return pd.Categorical(categories, categories=CHANGE_CATEGORIES)
+
+# Названия показателей статистики по категориям изменения при пороге threshold
+# ("Повышений более 5%" и т.д.)
+def category_titles(threshold=DEFAULT_CHANGE_THRESHOLD):
+    return {
+        'up': f'Повышений более {threshold:g}%',
+        'down': f'Снижений более {threshold:g}%',
+        'small': f'Изменений в пределах ±{threshold:g}%',
+        'none': 'Цен без изменений',
+    }
+
+# Статистика по категориям изменения: counts - число изменений каждой категории
+def category_stats(counts, threshold=DEFAULT_CHANGE_THRESHOLD):
+    return {title: int(counts[category]) for category, title in category_titles(threshold).items()}
@@ -0,0 +1,170 @@
+# Очистка и проверка цен прайс-листа
+import pandas as pd
+import numpy as np
+
+# Преобразуем значение цены в числовой формат (поэлементная версия).
+# Оставлена как эталон: normalize_prices должна возвращать те же значения.
+def clean_price(value):
+    if pd.isna(value):
+        return value
+    try:
+        # Если значение уже числовое, просто округляем и возвращаем
+        if isinstance(value, (int, float)):
+            return round(float(value), 2)
+        
+        # Преобразуем в строку и очищаем
+        value_str = str(value)
+        # Проверяем, является ли значение числом в научной нотации
+        if 'e' in value_str.lower():
+            return float(value_str)
+        # Удаляем все пробелы (в начале, в конце и в середине)
+        value_str = ''.join(value_str.split())
+        # Удаляем апостроф в начале, если он есть
+        value_str = value_str.lstrip("'")
+        # Заменяем запятые на точки
+        value_str = value_str.replace(',', '.')
+        # Пробуем преобразовать в число
+        if value_str:
+            num = float(value_str)
+            # Округляем до 2 знаков после запятой для устранения ошибок округления
+            return round(num, 2)
+        return None
+    except (ValueError, TypeError):
+        # Нераспознанные значения собирает normalize_prices и выводит report_unparsed
+        return None
+
+# Компактный строковый тип для артикулов и наименований: строки хранятся в буферах Arrow,
+# а не отдельными объектами Python (в несколько раз меньше памяти на больших прайсах)
+TEXT_DTYPE = pd.StringDtype('pyarrow')
+
+# Артикул строкой: числовые артикулы из Excel приходят как int или float (1000001.0 -> '1000001')
+def article_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+# Приводим артикулы к строкам (TEXT_DTYPE) один раз при загрузке, чтобы дальше
+# не преобразовывать колонку при каждом сопоставлении; пропуски остаются пропусками
+def normalize_articles(values):
+    if isinstance(values.dtype, pd.StringDtype) or pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+        return values.astype(TEXT_DTYPE)
+    if pd.api.types.is_float_dtype(values):
+        numbers = values.to_numpy()
+        text = np.full(len(numbers), None, dtype=object)
+        integer = np.isfinite(numbers) & (numbers == np.round(numbers))
+        text[integer] = numbers[integer].astype('int64').astype(str)
+        other = ~np.isnan(numbers) & ~integer
+        text[other] = [str(number) for number in numbers[other]]
+        return pd.Series(text, index=values.index, dtype=TEXT_DTYPE)
+    return values.map(article_text, na_action='ignore').astype(TEXT_DTYPE)
+
+# Таблица для очистки строковых цен: все пробельные символы (как в str.split()) удаляются,
+# запятая заменяется на точку
+PRICE_TRANSLATION = {code: None for code in range(0x3001) if chr(code).isspace()}
+PRICE_TRANSLATION[ord(',')] = '.'
+
+# Округляем массив так же, как встроенный round() (по умолчанию до 2 знаков).
+# np.round умножает на 10**decimals, из-за чего значения вроде 2.675 могут округлиться иначе,
+# поэтому значения около середины между соседними результатами досчитываем через round()
+def round_values(values, decimals=2):
+    values = np.asarray(values, dtype='float64')
+    rounded = np.round(values, decimals)
+    scaled = np.abs(values * 10 ** decimals)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < scaled * 1e-13 + 1e-9
+    if near_half.any():
+        rounded[near_half] = [round(float(value), decimals) for value in values[near_half]]
+    return rounded
+
+# Строки, которые не разобрал pd.to_numeric, разбираем встроенным float() по одной, как clean_price:
+# он понимает и то, чего не понимает pandas ('1_000', цифры других алфавитов - '１２', '٣').
+# Таких значений обычно единицы, поэтому поэлементный разбор не замедляет очистку
+def parse_floats(strings):
+    def parse(value):
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+    return np.array([parse(value) for value in strings], dtype='float64')
+
+# Векторизованная очистка колонки цен (те же правила, что и в clean_price).
+# Возвращает очищенную колонку float и исходные значения, которые не удалось преобразовать.
+def normalize_prices(values):
+    # Колонка уже числовая - достаточно округлить
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return pd.Series(round_values(values), index=values.index), values.iloc[0:0]
+    
+    raw = values.to_numpy(dtype=object)
+    result = np.full(len(raw), np.nan)
+    present = pd.notna(raw)
+    is_str = (values.map(type) == str).to_numpy()
+    
+    # Числа (int/float) просто округляем
+    numbers = present & ~is_str
+    result[numbers] = round_values(pd.to_numeric(raw[numbers], errors='coerce'))
+    
+    str_positions = np.flatnonzero(is_str)
+    strings = pd.Series(raw[str_positions], dtype=object)
+    # Научная нотация преобразуется как есть, без очистки и округления
+    sci = strings.str.contains('e', case=False, regex=False).to_numpy()
+    sci_values = pd.to_numeric(strings[sci].str.strip(), errors='coerce').to_numpy(dtype='float64')
+    sci_failed = np.isnan(sci_values)
+    sci_values[sci_failed] = parse_floats(strings[sci][sci_failed])
+    result[str_positions[sci]] = sci_values
+    
+    # Строки, которые уже являются корректными числами, не требуют очистки
+    plain = strings[~sci]
+    parsed = pd.to_numeric(plain, errors='coerce').to_numpy(dtype='float64')
+    dirty = np.isnan(parsed)
+    # Удаляем все пробелы (включая неразрывные), заменяем запятые на точки, убираем апострофы в начале
+    cleaned = plain[dirty].str.translate(PRICE_TRANSLATION).str.lstrip("'")
+    cleaned_values = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype='float64')
+    failed = np.isnan(cleaned_values) & (cleaned != '').to_numpy()
+    cleaned_values[failed] = parse_floats(cleaned[failed])
+    parsed[dirty] = cleaned_values
+    result[str_positions[~sci]] = round_values(parsed)
+    
+    # Пустые после очистки значения - это отсутствие цены, а не ошибка
+    blank = np.zeros(len(raw), dtype=bool)
+    blank[str_positions[~sci][dirty]] = (cleaned == '').to_numpy()
+    
+    unparsed = values[present & ~blank & np.isnan(result)]
+    return pd.Series(result, index=values.index), unparsed
+
+# Выводим сводку по значениям, которые не удалось преобразовать в число
+def report_unparsed(unparsed, column, limit=10):
+    if unparsed.empty:
+        return
+    print(f"\nНе удалось преобразовать {len(unparsed)} значений в колонке '{column}':")
+    counts = unparsed.astype(str).value_counts()
+    for value, count in counts.head(limit).items():
+        print(f"  '{value}' - {count} шт.")
+    if len(counts) > limit:
+        print(f"  ... и еще {len(counts) - limit} различных значений")
+
+# Проверяем позиции прайса одним векторизованным проходом и возвращаем таблицу проблем
+# (прайс, артикул, наименование, тип проблемы): позиции с артикулом, но без цены,
+# в том числе с ценой, которую не удалось распознать
+def validate_prices(df, price_column, unparsed, price_list):
+    articles = df['Артикул'].astype(TEXT_DTYPE).fillna('')
+    missing = (articles.str.strip() != '') & df[price_column].isna()
+    problems = pd.Series('Отсутствует цена', index=df.index)
+    problems[df.index.isin(unparsed.index)] = 'Цена не распознана'
+    issues = pd.DataFrame({
+        'Прайс': price_list,
+        'Артикул': articles[missing],
+        'Наименование услуги': df.loc[missing, 'Наименование услуги'].fillna('Нет названия'),
+        'Проблема': problems[missing],
+    })
+    return issues.reset_index(drop=True)
+
+# Выводим найденные проблемы: количество по типам и первые позиции
+def report_issues(issues, limit=20):
+    if issues.empty:
+        print("Проблем не найдено")
+        return
+    for (price_list, problem), count in issues.groupby(['Прайс', 'Проблема']).size().items():
+        print(f"Прайс {price_list}: {problem} - {count} поз.")
+    for price_list, article, name, problem in issues.head(limit).itertuples(index=False, name=None):
+        print(f"ВНИМАНИЕ: {problem} для артикула {article} ({name}), прайс {price_list}")
+    if len(issues) > limit:
+        print(f"... и еще {len(issues) - limit} поз.")
@@ -0,0 +1,330 @@
+# Интерфейс командной строки: тонкая обертка над конвейером сравнения
+import os
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .pipeline import run_comparison, report_stats
+from .batch import default_output_file
+from .cache import PriceListCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB
+from .readers import READERS, DEFAULT_CHUNK_ROWS
+from .instrumentation import STAGES, configure_logging
+from .fuzzy import DEFAULT_FUZZY_CONFIDENCE
+from .export import EXPORT_FORMATS
+from .writer import EXCEL_MAX_ROWS, MIN_SHEET_ROWS
+from .changes import DEFAULT_CHANGE_THRESHOLD
+from .history import DEFAULT_HISTORY_DB, MOVER_ORDER
+from .server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_QUEUE, DEFAULT_TIMEOUT, DEFAULT_MAX_UPLOAD_MB
+from .watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, DEFAULT_HEARTBEAT, DEFAULT_STATUS_FILE, is_temporary
+# Сами режимы (история цен, сравнение нескольких версий, пакетный режим, наблюдение, HTTP-сервис)
+# импортируются в ветках, которые их запускают: разовое сравнение и --help их не загружают
+
+# Разбираем список этапов для профилирования: "load,render" или "all"
+def profile_stages(value):
+    if value == 'all':
+        return list(STAGES)
+    stages = [stage.strip() for stage in value.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"неизвестные этапы: {', '.join(unknown)} (доступны: {', '.join(STAGES)})")
+    return stages
+
+# Пара для сравнения одной пары: первый файл в input/old и первый в input/new
+# (без временных файлов и блокировок Excel). Возвращаем [(old, new, результат)] или пустой список
+def first_pair():
+    input_files_old = [path for path in glob.glob('input/old/*.*') if not is_temporary(os.path.basename(path))]
+    input_files_new = [path for path in glob.glob('input/new/*.*') if not is_temporary(os.path.basename(path))]
+    
+    # Проверяем наличие входных файлов
+    if not input_files_old:
+        print("Ошибка: В папке 'input/old' отсутствуют файлы прайс-листа предыдущего года")
+        return []
+    
+    if not input_files_new:
+        print("Ошибка: В папке 'input/new' отсутствуют файлы прайс-листа следующего года")
+        return []
+    
+    # Выбираем первый файл в каждой директории
+    return [(input_files_old[0], input_files_new[0], default_output_file(input_files_new[0]))]
+
+# Режим наблюдения: при запуске и после каждого изменения в input/old и input/new пары сравниваются
+# в пуле процессов, который живет все время работы (процессы не импортируют библиотеки заново).
+# Неизмененные пары пропускаются по манифесту запуска
+def run_watch(args, cache, history=None):
+    from .batch import find_pairs, read_manifest, run_batch
+    from .watch import watch
+    
+    workers = args.workers or min(2, os.cpu_count() or 1)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    
+    def run_cycle():
+        nonlocal executor
+        if args.manifest:
+            pairs = read_manifest(args.manifest)
+        elif args.batch:
+            pairs = find_pairs('input/old', 'input/new')
+        else:
+            pairs = first_pair()
+        if not pairs:
+            print("Нет пар прайсов для сравнения")
+            return {'pairs': 0, 'errors': 0}
+        
+        batch_settings = dict(
+            workers=workers, issues_sheet=args.issues_sheet, cache=cache, reader=args.reader,
+            profile_stages=args.profile, trace_memory=args.trace_memory, streaming=args.streaming,
+            chunk_rows=args.chunk_rows, force=args.force, history=history, fuzzy=args.fuzzy,
+            export_format=args.export, xlsx=not args.no_xlsx, max_rows=args.max_rows,
+            change_threshold=args.change_threshold, changes_only=args.changes_only,
+        )
+        if not (args.batch or args.manifest):
+            batch_settings['summary_file'] = None
+        try:
+            summary = run_batch(pairs, executor=executor, **batch_settings)
+        except BrokenProcessPool:
+            # Процесс пула завершился аварийно в прошлый раз: пул пересоздается
+            executor = ProcessPoolExecutor(max_workers=workers)
+            summary = run_batch(pairs, executor=executor, **batch_settings)
+        return {'pairs': len(summary), 'errors': int((summary['Статус'] != 'OK').sum())}
+    
+    try:
+        watch(['input/old', 'input/new'], run_cycle, args.debounce, args.poll_interval, args.heartbeat,
+              args.status_file, args.poll)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+# Сравнение нескольких прайсов в одной таблице: result/Сравнение прайсов (первая - последняя версия).xlsx
+def run_compare_many(args, cache):
+    from .multiway import version_labels, compare_many, report_totals
+    
+    labels = version_labels(args.compare_many, args.labels)
+    output_file = os.path.join('result', f'Сравнение прайсов ({labels[0]} - {labels[-1]}).xlsx')
+    report_totals(compare_many(args.compare_many, labels, output_file, args.issues_sheet, cache, reader=args.reader,
+                               change_threshold=args.change_threshold))
+    print(f"\nАнализ завершен. Результат сохранен в файл '{output_file}'")
+
+# Команды истории цен: загрузка прайсов, список версий, сравнение двух версий,
+# история артикула и самые большие изменения. Возвращаем True, если команда была
+def run_history(args, history, cache):
+    from .history import ingest_price_list, compare_versions, compare_many_versions
+    from .multiway import report_totals
+    
+    if args.ingest:
+        if args.version_name and len(args.ingest) > 1:
+            raise ValueError("--version-name можно указать только для одного файла")
+        for path in args.ingest:
+            ingest_price_list(history, path, args.version_name, cache, args.reader)
+    elif args.versions:
+        print(history.versions().to_string(index=False))
+    elif args.compare_versions:
+        versions = args.compare_versions
+        if len(versions) < 2:
+            raise ValueError("--compare-versions: нужно не меньше двух версий")
+        output_file = os.path.join('result', f'Сравнение прайсов ({versions[0]} - {versions[-1]}).xlsx')
+        if len(versions) == 2:
+            report_stats(compare_versions(history, versions[0], versions[1], output_file, args.issues_sheet,
+                                          fuzzy=args.fuzzy, change_threshold=args.change_threshold,
+                                          changes_only=args.changes_only))
+        else:
+            report_totals(compare_many_versions(history, versions, output_file, args.issues_sheet,
+                                                change_threshold=args.change_threshold))
+        print(f"\nАнализ завершен. Результат сохранен в файл '{output_file}'")
+    elif args.article_history:
+        print(history.article_history(args.article_history).to_string(index=False))
+    elif args.top_movers:
+        print(history.top_movers(*args.top_movers, args.limit, args.direction).to_string(index=False))
+    else:
+        return False
+    return True
+
+# Точка входа командной строки: одна пара прайсов из input/old и input/new,
+# пакетное сравнение многих пар или наблюдение за папками
+def main():
+    # Разбираем параметры командной строки
+    parser = argparse.ArgumentParser(description='Сравнение прайс-листов предыдущего и следующего года')
+    parser.add_argument('--issues-sheet', action='store_true',
+                        help='добавить в результат лист "Проблемы" с позициями без цен')
+    parser.add_argument('--fuzzy', type=float, nargs='?', const=DEFAULT_FUZZY_CONFIDENCE, default=None,
+                        metavar='MIN_CONFIDENCE',
+                        help='сопоставить позиции, не найденные по точному артикулу, по нормализованному артикулу '
+                             'и похожести наименований (лист "Сопоставленные позиции"); значение - минимальная '
+                             f'уверенность от 0 до 1 (по умолчанию - {DEFAULT_FUZZY_CONFIDENCE})')
+    parser.add_argument('--export', choices=list(EXPORT_FORMATS),
+                        help='выгрузить таблицу различий (артикул, наименование, цены, изменение, категория, статус) '
+                             'рядом с результатом в Parquet, CSV или JSON Lines, итоги - в <результат>.summary.json')
+    parser.add_argument('--no-xlsx', action='store_true',
+                        help='не формировать Excel, только выгрузка --export (намного быстрее на больших прайсах)')
+    parser.add_argument('--max-rows', type=int, default=EXCEL_MAX_ROWS,
+                        help='сколько строк помещать на лист Excel: более длинная таблица продолжается на следующих '
+                             'листах, а легенда и итоги - на листе "Итоги" (по умолчанию - предел Excel, '
+                             f'{EXCEL_MAX_ROWS})')
+    parser.add_argument('--change-threshold', type=float, default=DEFAULT_CHANGE_THRESHOLD, metavar='PERCENT',
+                        help='порог значительного изменения цены в процентах: изменения больше него выделяются цветом '
+                             'и считаются повышениями и снижениями в статистике '
+                             f'(по умолчанию - {DEFAULT_CHANGE_THRESHOLD:g})')
+    parser.add_argument('--changes-only', type=float, nargs='?', const=0.0, default=None, metavar='MIN_CHANGE',
+                        help='в Excel только позиции, цена которых изменилась больше чем на MIN_CHANGE процентов '
+                             '(по умолчанию - любое изменение), и заголовки их разделов; статистика и выгрузка '
+                             '--export - по всем позициям')
+    parser.add_argument('--batch', action='store_true',
+                        help='сравнить все пары прайсов из input/old и input/new, подобранные по именам файлов')
+    parser.add_argument('--manifest',
+                        help='CSV-файл со списком пар (колонки old, new и необязательная output); включает пакетный режим')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='число параллельных процессов в пакетном режиме (по умолчанию - число ядер)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='не использовать кэш разобранных прайсов (файлы разбираются заново)')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='очистить кэш разобранных прайсов перед сравнением')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'папка кэша разобранных прайсов (по умолчанию - {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f'максимальный размер кэша в МБ (по умолчанию - {DEFAULT_CACHE_SIZE_MB})')
+    parser.add_argument('--reader', choices=['auto'] + list(READERS), default='auto',
+                        help='движок чтения файлов (по умолчанию - самый быстрый из установленных для формата файла)')
+    parser.add_argument('--profile', type=profile_stages, nargs='?', const=list(STAGES), default=[], metavar='STAGES',
+                        help='профилировать этапы через cProfile (список через запятую из '
+                             f'{", ".join(STAGES)}; без значения - все этапы); профиль сохраняется рядом с результатом')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='замерять пиковую память этапов через tracemalloc (точнее, но замедляет этапы)')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING'], default='INFO',
+                        help='уровень подробности вывода: DEBUG добавляет колонки файлов, уникальные цены '
+                             'и списки артикулов (по умолчанию - INFO)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='потоковое сравнение для прайсов, не помещающихся в память: новый прайс читается '
+                             'и записывается частями (кэш не используется)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'размер части прайса в потоковом режиме, строк (по умолчанию - {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--force', action='store_true',
+                        help='сравнить заново, даже если входные файлы, настройки и результат не изменились '
+                             'с прошлого запуска')
+    parser.add_argument('--watch', action='store_true',
+                        help='не завершаться, а следить за input/old и input/new и пересчитывать результат '
+                             'после каждого изменения (вместе с --batch - для всех пар)')
+    parser.add_argument('--poll', action='store_true',
+                        help='в режиме наблюдения опрашивать папки вместо inotify (для сетевых папок и Docker Desktop)')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f'интервал опроса папок, с (по умолчанию - {DEFAULT_POLL_INTERVAL})')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help='сравнение начинается, когда файлы не менялись столько секунд '
+                             f'(по умолчанию - {DEFAULT_DEBOUNCE})')
+    parser.add_argument('--heartbeat', type=float, default=DEFAULT_HEARTBEAT,
+                        help=f'как часто обновлять файл состояния, с (по умолчанию - {DEFAULT_HEARTBEAT})')
+    parser.add_argument('--status-file', default=DEFAULT_STATUS_FILE,
+                        help=f'файл состояния режима наблюдения (по умолчанию - {DEFAULT_STATUS_FILE})')
+    parser.add_argument('--serve', action='store_true',
+                        help='запустить HTTP-сервис: прайсы загружаются формой, в ответ - Excel или JSON со статистикой')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f'адрес HTTP-сервиса (по умолчанию - {DEFAULT_HOST}; в Docker - 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'порт HTTP-сервиса (по умолчанию - {DEFAULT_PORT})')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help='сколько запросов может ждать свободного процесса, остальные получают 503 '
+                             f'(по умолчанию - {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'максимальное время одного сравнения в HTTP-сервисе, с (по умолчанию - {DEFAULT_TIMEOUT:g})')
+    parser.add_argument('--max-upload-mb', type=int, default=DEFAULT_MAX_UPLOAD_MB,
+                        help=f'максимальный размер загружаемых файлов, МБ (по умолчанию - {DEFAULT_MAX_UPLOAD_MB})')
+    parser.add_argument('--history-db', default=DEFAULT_HISTORY_DB,
+                        help=f'файл базы истории цен SQLite (по умолчанию - {DEFAULT_HISTORY_DB})')
+    parser.add_argument('--store-history', action='store_true',
+                        help='сохранять очищенные прайсы каждого сравнения в историю цен (версия - имя файла)')
+    parser.add_argument('--ingest', nargs='+', metavar='FILE',
+                        help='загрузить прайс-файлы в историю цен без сравнения')
+    parser.add_argument('--version-name', help='название версии для --ingest (по умолчанию - имя файла без расширения)')
+    parser.add_argument('--versions', action='store_true', help='показать версии прайсов в истории цен')
+    parser.add_argument('--compare-versions', nargs='+', metavar='VERSION',
+                        help='сравнить версии из истории цен без чтения Excel (две версии - как два прайса, '
+                             'больше - в одной таблице по порядку)')
+    parser.add_argument('--article-history', metavar='ARTICLE', help='показать историю цены артикула по всем версиям')
+    parser.add_argument('--top-movers', nargs=2, metavar=('OLD', 'NEW'),
+                        help='показать артикулы с самым большим изменением цены между двумя версиями')
+    parser.add_argument('--limit', type=int, default=20, help='сколько артикулов показывать в --top-movers (по умолчанию - 20)')
+    parser.add_argument('--direction', choices=list(MOVER_ORDER), default='both',
+                        help='для --top-movers: up - повышения, down - снижения, both - по модулю (по умолчанию)')
+    parser.add_argument('--compare-many', nargs='+', metavar='FILE',
+                        help='сравнить несколько прайсов (по порядку от старого к новому) в одной таблице: '
+                             'цены всех версий, изменения соседних версий и накопленные от первой')
+    parser.add_argument('--labels', nargs='+', metavar='LABEL',
+                        help='названия версий для --compare-many (по умолчанию - имена файлов без расширения)')
+    args = parser.parse_args()
+    if args.no_xlsx and not args.export:
+        parser.error('--no-xlsx используется вместе с --export')
+    if not MIN_SHEET_ROWS <= args.max_rows <= EXCEL_MAX_ROWS:
+        parser.error(f'--max-rows должен быть от {MIN_SHEET_ROWS} до {EXCEL_MAX_ROWS}')
+    if args.change_threshold < 0 or (args.changes_only is not None and args.changes_only < 0):
+        parser.error('--change-threshold и --changes-only не могут быть отрицательными')
+    configure_logging(args.log_level)
+    
+    # Создаем директории, если они не существуют
+    os.makedirs('input/old', exist_ok=True)
+    os.makedirs('input/new', exist_ok=True)
+    os.makedirs('result', exist_ok=True)
+    
+    # Кэш разобранных прайсов: повторно используемые файлы не разбираются заново
+    cache = PriceListCache(args.cache_dir, args.cache_size)
+    if args.clear_cache:
+        cache.clear()
+        print(f"Кэш разобранных прайсов очищен: {args.cache_dir}")
+    if args.no_cache:
+        cache = None
+    
+    # База истории цен открывается только для команд истории и --store-history
+    history = None
+    if (args.ingest or args.versions or args.compare_versions or args.article_history or args.top_movers
+            or args.store_history):
+        from .history import PriceHistory
+        history = PriceHistory(args.history_db)
+    try:
+        if history is not None and run_history(args, history, cache):
+            return
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        exit(1)
+    if not args.store_history:
+        history = None
+    
+    if args.compare_many:
+        try:
+            run_compare_many(args, cache)
+        except Exception as e:
+            print(f"Ошибка при сравнении прайсов: {e}")
+            exit(1)
+        return
+    
+    if args.serve:
+        from .server import serve
+        serve(args.host, args.port, args.workers, args.max_queue, args.timeout, args.max_upload_mb, cache)
+        return
+    
+    if args.watch:
+        run_watch(args, cache, history)
+        return
+    
+    if args.batch or args.manifest:
+        from .batch import find_pairs, read_manifest, run_batch
+        pairs = read_manifest(args.manifest) if args.manifest else find_pairs('input/old', 'input/new')
+        if not pairs:
+            print("Ошибка: не найдено ни одной пары прайсов для сравнения")
+            exit(1)
+        summary = run_batch(pairs, args.workers, args.issues_sheet, cache=cache, reader=args.reader,
+                            profile_stages=args.profile, trace_memory=args.trace_memory, streaming=args.streaming,
+                            chunk_rows=args.chunk_rows, force=args.force, history=history, fuzzy=args.fuzzy,
+                            export_format=args.export, xlsx=not args.no_xlsx, max_rows=args.max_rows,
+                            change_threshold=args.change_threshold, changes_only=args.changes_only)
+        exit(0 if (summary['Статус'] == 'OK').all() else 1)
+    
+    # Находим первый файл в директории old и new
+    pairs = first_pair()
+    if not pairs:
+        exit(1)
+    input_file_old, input_file_new, output_file = pairs[0]
+    
+    try:
+        run_comparison(input_file_old, input_file_new, output_file, args.issues_sheet, cache,
+                       reader=args.reader, profile_stages=args.profile, trace_memory=args.trace_memory,
+                       streaming=args.streaming, chunk_rows=args.chunk_rows, force=args.force, history=history,
+                       fuzzy=args.fuzzy, export_format=args.export, xlsx=not args.no_xlsx, max_rows=args.max_rows,
+                       change_threshold=args.change_threshold, changes_only=args.changes_only)
+    except Exception as e:
+        print(f"Ошибка при сравнении прайсов: {e}")
+        exit(1)
@@ -0,0 +1,166 @@
+# Выгрузка результата сравнения для других программ (импорт в ERP, дашборды): таблица различий
+# в Parquet, CSV или JSON Lines - по строке на позицию с артикулом, ценами, изменением, категорией
+# и статусом (added, removed, changed, unchanged), и итоговая запись в JSON рядом с ней.
+# Таблица пишется частями, поэтому в потоковом режиме она не собирается в памяти целиком
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .cleaning import TEXT_DTYPE
+from .matching import article_mask, article_positions
+from .changes import DEFAULT_CHANGE_THRESHOLD, classify_changes
+from .sections import assign_sections
+
+# Форматы выгрузки и расширения файлов
+EXPORT_FORMATS = {'parquet': '.parquet', 'csv': '.csv', 'jsonl': '.jsonl'}
+
+# Колонки таблицы различий и их типы (одинаковые во всех форматах)
+EXPORT_SCHEMA = pa.schema([
+    ('article', pa.string()),
+    ('name', pa.string()),
+    ('section', pa.string()),
+    ('old_price', pa.float64()),
+    ('new_price', pa.float64()),
+    ('change_percent', pa.float64()),
+    ('category', pa.string()),
+    ('status', pa.string()),
+])
+EXPORT_STATUSES = ['added', 'removed', 'changed', 'unchanged']
+
+# CSV и JSON Lines формируются текстом в памяти, поэтому большие части пишутся порциями по столько строк
+TEXT_WRITE_ROWS = 50000
+
+# Файл выгрузки рядом с результатом: <результат>.parquet (.csv, .jsonl) и итоговая запись <результат>.summary.json
+def export_file_name(output_file, export_format):
+    return os.path.splitext(output_file)[0] + EXPORT_FORMATS[export_format]
+
+def summary_file_name(export_file):
+    return os.path.splitext(export_file)[0] + '.summary.json'
+
+# Формат выгрузки по расширению файла
+def export_format(export_file):
+    extension = os.path.splitext(export_file)[1].lower()
+    for name, format_extension in EXPORT_FORMATS.items():
+        if extension == format_extension:
+            return name
+    raise ValueError(f"Неизвестный формат выгрузки: '{export_file}' (расширения: {', '.join(EXPORT_FORMATS.values())})")
+
+# Строки таблицы различий для части результата (df_result или часть из потокового режима):
+# позиции с артикулами, их разделы и статус. added - артикулы нового прайса, которых нет в старом (added_articles),
+# changed и unchanged - по ценам (позиция, у которой есть только одна цена, считается измененной).
+# threshold - порог значительного изменения цены для категорий, %
+def diff_rows(df, sections, price_column, added_articles, threshold=DEFAULT_CHANGE_THRESHOLD):
+    rows = article_mask(df['Артикул'])
+    df = df[rows]
+    prices_old = df['Стоимость услуг предыдущий год'].to_numpy(dtype='float64')
+    prices_new = df[price_column].to_numpy(dtype='float64')
+    change = df['Изменение цены %'].to_numpy(dtype='float64')
+    categories = pd.Series(classify_changes(change, threshold))
+    
+    same = (prices_old == prices_new) | (np.isnan(prices_old) & np.isnan(prices_new))
+    status = np.where(same, 'unchanged', 'changed').astype(object)
+    status[article_positions(df['Артикул'], added_articles) >= 0] = 'added'
+    return pd.DataFrame({
+        'article': df['Артикул'].astype(TEXT_DTYPE).to_numpy(dtype=object, na_value=None),
+        'name': df['Наименование услуги'].astype(TEXT_DTYPE).to_numpy(dtype=object, na_value=None),
+        'section': sections.to_numpy(dtype=object)[rows],
+        'old_price': prices_old,
+        'new_price': prices_new,
+        'change_percent': change,
+        'category': categories.astype(object).where(categories.notna(), None).to_numpy(),
+        'status': status,
+    })
+
+# Строки таблицы различий для удаленных позиций (matching.article_rows - все позиции старого прайса,
+# артикулов которых нет в новом, в том числе без номера или цены)
+def removed_rows(removed_positions):
+    return pd.DataFrame({
+        'article': removed_positions['Артикул'].astype(TEXT_DTYPE).to_numpy(dtype=object, na_value=None),
+        'name': removed_positions['Наименование услуги'].astype(TEXT_DTYPE).to_numpy(dtype=object, na_value=None),
+        'section': None,
+        'old_price': removed_positions['Цена'].to_numpy(dtype='float64'),
+        'new_price': np.nan,
+        'change_percent': np.nan,
+        'category': None,
+        'status': 'removed',
+    })
+
+# Запись таблицы различий частями в выбранном формате; число строк по статусам копится для итоговой записи
+class DiffExporter:
+    def __init__(self, path):
+        self.path = path
+        self.export_format = export_format(path)
+        self.rows = 0
+        self.statuses = dict.fromkeys(EXPORT_STATUSES, 0)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if self.export_format == 'parquet':
+            self.writer = pq.ParquetWriter(path, EXPORT_SCHEMA)
+        else:
+            self.file = open(path, 'w', encoding='utf-8', newline='')
+        if self.export_format == 'csv':
+            pd.DataFrame(columns=EXPORT_SCHEMA.names).to_csv(self.file, index=False)
+    
+    def write(self, rows):
+        if self.export_format == 'parquet':
+            self.writer.write_table(pa.Table.from_pandas(rows, schema=EXPORT_SCHEMA, preserve_index=False))
+        else:
+            for start in range(0, len(rows), TEXT_WRITE_ROWS):
+                part = rows.iloc[start:start + TEXT_WRITE_ROWS]
+                if self.export_format == 'csv':
+                    part.to_csv(self.file, index=False, header=False)
+                else:
+                    part.to_json(self.file, orient='records', lines=True, force_ascii=False)
+        self.rows += len(rows)
+        for status, count in rows['status'].value_counts().items():
+            self.statuses[status] += int(count)
+    
+    def close(self):
+        if self.export_format == 'parquet':
+            self.writer.close()
+        else:
+            self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Итоговая запись выгрузки: файл, формат, число строк по статусам, статистика сравнения и суммы по общим позициям
+def write_export_summary(exporter, comparison):
+    summary = {
+        'file': exporter.path,
+        'format': exporter.export_format,
+        'rows': exporter.rows,
+        'statuses': exporter.statuses,
+        'stats': comparison.stats,
+        'totals': {
+            'old_common': float(comparison.total_old_common),
+            'new_common': float(comparison.total_new_common),
+            'common_positions': comparison.common_positions,
+        },
+    }
+    with open(summary_file_name(exporter.path), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+# Выгружаем таблицу различий в export_file (формат - по расширению): позиции нового прайса по порядку
+# (df_result или части результата в потоковом режиме), затем удаленные позиции. Статусы added и removed
+# берутся из результата сопоставления (comparison.added_articles, removed_positions), а не из списков отчета,
+# в которые не попадают позиции без номера или цены. Возвращаем итоговую запись
+def export_diff(comparison, chunks, price_column, export_file):
+    section = None
+    with DiffExporter(export_file) as exporter:
+        for chunk in [chunks] if isinstance(chunks, pd.DataFrame) else chunks:
+            # Раздел переходит из части в часть, как в итогах по разделам
+            sections = assign_sections(chunk, price_column, section)
+            if len(sections):
+                section = sections.iloc[-1]
+            exporter.write(diff_rows(chunk, sections, price_column, comparison.added_articles,
+                                     comparison.change_threshold))
+        exporter.write(removed_rows(comparison.removed_positions))
+    return write_export_summary(exporter, comparison)
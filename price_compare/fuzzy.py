@@ -0,0 +1,238 @@
+# Нечеткое сопоставление позиций, которые не нашлись по точному артикулу (поставщик переформатировал
+# коды: ведущие нули, "A-102" и "A102", число 102.0, прочитанное как строка). Сначала позиции
+# сопоставляются по нормализованному артикулу, оставшиеся - по похожести наименований.
+# Похожесть считается по символьным триграммам (коэффициент Дайса), но не для всех пар:
+# кандидаты подбираются по инвертированному индексу редких слов и триграмм (блокирование),
+# поэтому десятки тысяч несопоставленных позиций с каждой стороны обрабатываются за секунды
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .cleaning import TEXT_DTYPE
+from .changes import calculate_price_changes
+from .matching import SERVICE_COLUMNS, PriceLookup
+
+# Минимальная уверенность, с которой сопоставление принимается
+DEFAULT_FUZZY_CONFIDENCE = 0.8
+
+# Длина n-грамм наименований
+GRAM_SIZE = 3
+
+# Слово или триграмма, которые встречаются больше чем у BLOCK_SIZE позиций одной из сторон, слишком
+# общие ("прием", "усл") и не используются для подбора кандидатов (триграммы учитываются в похожести)
+BLOCK_SIZE = 64
+
+# Длина наименования, по которой считается похожесть (символы после нее не учитываются)
+MAX_NAME_LENGTH = 200
+
+# Сколько кандидатов с наибольшим числом общих редких слов и триграмм проверяется для каждой новой позиции
+CANDIDATES = 5
+
+# Уверенность сопоставления по нормализованному артикулу: от 0.5 (наименования совсем разные)
+# до 1 (наименования совпадают). Совпадение ключей само по себе не проходит порог уверенности:
+# при пороге 0.8 наименования должны быть похожи хотя бы на 0.6
+KEY_CONFIDENCE = 0.5
+
+# Нормализованный артикул: верхний регистр, без ".0" в конце, без ведущих нулей в группах цифр
+# и без разделителей - "a-0102", "A102" и "102.0"/"102" дают одинаковые ключи. Ведущие нули убираются
+# только у групп цифр в начале артикула, после буквы или дефиса: "1.05" и "15" остаются разными
+def article_keys(articles):
+    keys = pd.Series(articles, dtype=TEXT_DTYPE).str.upper()
+    keys = keys.str.replace(r'\.0+$', '', regex=True)
+    keys = keys.str.replace(r'(^|[A-ZА-ЯЁ-])0+([0-9])', r'\1\2', regex=True)
+    return keys.str.replace(r'[^0-9A-ZА-ЯЁ]', '', regex=True)
+
+# Наименование для сравнения: нижний регистр, ё -> е, все кроме букв и цифр -> пробел (\w в регулярных
+# выражениях Arrow не включает кириллицу), пробел в начале и в конце (чтобы у первого и последнего слова
+# были свои триграммы). Для похожести берутся первые MAX_NAME_LENGTH символов
+def normalize_names(names):
+    names = pd.Series(names, dtype=TEXT_DTYPE).fillna('').str.lower().str.replace('ё', 'е')
+    names = names.str.replace(r'[^0-9a-zа-я]+', ' ', regex=True).str.strip().str.slice(0, MAX_NAME_LENGTH - 2)
+    return pa.array(' ' + names + ' ', type=pa.large_string())
+
+# Слова наименований (нормализованный текст из normalize_names): пары (строка, код слова),
+# коды одинаковых слов совпадают во всех строках. Пустые слова (от пробелов в начале и в конце)
+# не учитываются. Возвращаем (rows, codes, размер словаря кодов)
+def name_tokens(text):
+    tokens = pc.utf8_split_whitespace(text)
+    words = pc.list_flatten(tokens)
+    nonempty = pc.not_equal(words, '')
+    rows = pc.filter(pc.list_parent_indices(tokens), nonempty).to_numpy().astype(np.int64)
+    codes = pc.dictionary_encode(pc.filter(words, nonempty)).indices.to_numpy().astype(np.int64)
+    return rows, codes, int(codes.max(initial=0)) + 1
+
+# Триграммы наименований: пары (строка, код триграммы) без повторов, отсортированные по строке и коду.
+# Наименования раскладываются в матрицу символов (UTF-32), символы кодируются номерами в алфавите
+# встретившихся символов, и код триграммы - число в системе счисления по размеру алфавита.
+# Возвращаем (rows, codes, размер словаря кодов)
+def name_grams(text):
+    names = np.array(text.to_numpy(zero_copy_only=False), dtype=str)
+    width = names.dtype.itemsize // 4
+    if width < GRAM_SIZE:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 1
+    chars = names.view(np.uint32).reshape(len(names), width)
+    present = np.zeros(int(chars.max(initial=0)) + 1, dtype=bool)
+    present[chars] = True
+    letters = (np.cumsum(present) - 1)[chars]
+    size = int(present.sum())
+    
+    codes = np.zeros((len(names), width - GRAM_SIZE + 1), dtype=np.int64)
+    for offset in range(GRAM_SIZE):
+        codes = codes * size + letters[:, offset:offset + codes.shape[1]]
+    valid = np.arange(codes.shape[1]) <= (np.char.str_len(names) - GRAM_SIZE)[:, None]
+    vocabulary = size ** GRAM_SIZE
+    pairs = np.unique(np.nonzero(valid)[0] * vocabulary + codes[valid])
+    return pairs // vocabulary, pairs % vocabulary, vocabulary
+
+# Индекс триграмм (или ключей блокирования) одной стороны: пары (строка, код), отсортированные
+# по строке и коду - коды каждой строки идут подряд
+class GramIndex:
+    def __init__(self, rows, codes, size):
+        self.rows, self.codes = rows, codes
+        self.counts = np.bincount(self.rows, minlength=size)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+    
+    # Триграммы строк selected подряд и номер элемента selected для каждой триграммы
+    def expand(self, selected):
+        counts = self.counts[selected]
+        owners = np.repeat(np.arange(len(selected)), counts)
+        starts = np.repeat(self.offsets[selected] - np.cumsum(counts) + counts, counts)
+        return self.codes[starts + np.arange(len(owners))], owners
+
+# Коэффициент Дайса по триграммам для пар строк (new_rows[i], old_rows[i]):
+# 2 * общих триграмм / (триграмм первой строки + триграмм второй)
+def name_similarity(index_new, index_old, new_rows, old_rows, vocabulary):
+    if not len(new_rows):
+        return np.empty(0)
+    codes, owners = index_new.expand(new_rows)
+    old_keys = index_old.rows * vocabulary + index_old.codes  # Отсортированы (строка, триграмма)
+    if not len(old_keys):
+        return np.zeros(len(new_rows))
+    keys = old_rows[owners] * vocabulary + codes
+    found = np.searchsorted(old_keys, keys)
+    shared = (found < len(old_keys)) & (old_keys[np.minimum(found, len(old_keys) - 1)] == keys)
+    common = np.bincount(owners[shared], minlength=len(new_rows))
+    total = index_new.counts[new_rows] + index_old.counts[old_rows]
+    return np.where(total > 0, 2 * common / np.maximum(total, 1), 0.0)
+
+# Кандидаты для строк new по индексу слов и триграмм: для каждой новой строки - до CANDIDATES старых строк
+# с наибольшим числом общих редких ключей. Возвращаем (new_rows, old_rows)
+def name_candidates(index_new, index_old, new_selected, old_selected, vocabulary):
+    old_mask = np.zeros(len(index_old.counts), dtype=bool)
+    old_mask[old_selected] = True
+    new_mask = np.zeros(len(index_new.counts), dtype=bool)
+    new_mask[new_selected] = True
+    old_pairs = old_mask[index_old.rows]
+    new_pairs = new_mask[index_new.rows]
+    
+    # Блокирование: только слова и триграммы, которые есть не больше чем у BLOCK_SIZE строк с каждой стороны
+    frequency_old = np.bincount(index_old.codes[old_pairs], minlength=vocabulary)
+    frequency_new = np.bincount(index_new.codes[new_pairs], minlength=vocabulary)
+    rare = (frequency_old > 0) & (frequency_old <= BLOCK_SIZE) & (frequency_new > 0) & (frequency_new <= BLOCK_SIZE)
+    old_pairs &= rare[index_old.codes]
+    new_pairs &= rare[index_new.codes]
+    
+    old_grams = pd.DataFrame({'code': index_old.codes[old_pairs], 'old': index_old.rows[old_pairs]})
+    new_grams = pd.DataFrame({'code': index_new.codes[new_pairs], 'new': index_new.rows[new_pairs]})
+    candidates = new_grams.merge(old_grams, on='code').groupby(['new', 'old'], sort=False).size().rename('shared')
+    candidates = candidates.reset_index().sort_values(['new', 'shared'], ascending=[True, False], kind='stable')
+    candidates = candidates.groupby('new', sort=False).head(CANDIDATES)
+    return candidates['new'].to_numpy(), candidates['old'].to_numpy()
+
+# Пары один к одному: по убыванию уверенности каждая строка участвует не больше одного раза
+def best_pairs(pairs):
+    pairs = pairs.sort_values('confidence', ascending=False, kind='stable')
+    return pairs.drop_duplicates('new').drop_duplicates('old')
+
+# Сопоставляем несопоставленные позиции: removed - удаленные позиции старого прайса, added - новые
+# позиции нового прайса (списки collect_services). Возвращаем DataFrame пар с уверенностью не ниже
+# min_confidence: строки в removed и added, способ и уверенность
+def fuzzy_pairs(removed, added, min_confidence=DEFAULT_FUZZY_CONFIDENCE):
+    empty = pd.DataFrame({'old': pd.Series(dtype='int64'), 'new': pd.Series(dtype='int64'),
+                          'method': pd.Series(dtype=object), 'confidence': pd.Series(dtype='float64')})
+    if removed.empty or added.empty:
+        return empty
+    
+    # Триграммы обеих сторон с общими кодами (для похожести) и ключи блокирования - слова и триграммы
+    text = normalize_names(pd.concat([removed['Наименование услуги'], added['Наименование услуги']], ignore_index=True))
+    rows, codes, vocabulary = name_grams(text)
+    token_rows, token_codes, tokens = name_tokens(text)
+    key_vocabulary = vocabulary + tokens
+    keys = np.unique(np.concatenate([rows * key_vocabulary + codes, token_rows * key_vocabulary + token_codes + vocabulary]))
+    key_rows, key_codes = keys // key_vocabulary, keys % key_vocabulary
+    
+    def split(rows, codes):
+        is_old = rows < len(removed)
+        return (GramIndex(rows[is_old], codes[is_old], len(removed)),
+                GramIndex(rows[~is_old] - len(removed), codes[~is_old], len(added)))
+    index_old, index_new = split(rows, codes)
+    keys_index_old, keys_index_new = split(key_rows, key_codes)
+    
+    # 1. Нормализованный артикул: только ключи, которые однозначны с обеих сторон
+    keys_old = pd.DataFrame({'key': article_keys(removed['Артикул']), 'old': np.arange(len(removed))})
+    keys_new = pd.DataFrame({'key': article_keys(added['Артикул']), 'new': np.arange(len(added))})
+    keys_old = keys_old[keys_old['key'].ne('').fillna(False) & ~keys_old['key'].duplicated(keep=False)]
+    keys_new = keys_new[keys_new['key'].ne('').fillna(False) & ~keys_new['key'].duplicated(keep=False)]
+    by_key = keys_new.merge(keys_old, on='key')[['old', 'new']]
+    by_key['method'] = 'артикул'
+    by_key['confidence'] = KEY_CONFIDENCE + (1 - KEY_CONFIDENCE) * name_similarity(
+        index_new, index_old, by_key['new'].to_numpy(), by_key['old'].to_numpy(), vocabulary)
+    
+    by_key = best_pairs(by_key[by_key['confidence'] >= min_confidence])
+    
+    # 2. Похожесть наименований для оставшихся позиций (и пар по артикулу, отклоненных по наименованию)
+    old_left = np.setdiff1d(np.arange(len(removed)), by_key['old'].to_numpy())
+    new_left = np.setdiff1d(np.arange(len(added)), by_key['new'].to_numpy())
+    new_rows, old_rows = name_candidates(keys_index_new, keys_index_old, new_left, old_left, key_vocabulary)
+    by_name = pd.DataFrame({'old': old_rows, 'new': new_rows, 'method': 'наименование',
+                            'confidence': name_similarity(index_new, index_old, new_rows, old_rows, vocabulary)})
+    by_name = best_pairs(by_name[by_name['confidence'] >= min_confidence])
+    
+    pairs = pd.concat([by_key, by_name], ignore_index=True)
+    return pairs if len(pairs) else empty
+
+# Этап fuzzy: сопоставляем удаленные и новые позиции после точного сопоставления по артикулу.
+# Принятые пары (уверенность не ниже min_confidence) считаются одной позицией: в новый прайс
+# подставляется старая цена, из списков удаленных и новых позиций они убираются,
+# а сами пары с уверенностью сохраняются в comparison.fuzzy_matches (отдельный лист результата)
+def match_fuzzy(comparison, min_confidence=DEFAULT_FUZZY_CONFIDENCE):
+    removed = pd.DataFrame(comparison.removed_services, columns=SERVICE_COLUMNS)
+    added = pd.DataFrame(comparison.new_services, columns=SERVICE_COLUMNS)
+    pairs = fuzzy_pairs(removed, added, min_confidence)
+    old, new = removed.iloc[pairs['old']].reset_index(drop=True), added.iloc[pairs['new']].reset_index(drop=True)
+    
+    comparison.fuzzy_matches = pd.DataFrame({
+        'Артикул в старом прайсе': old['Артикул'],
+        'Артикул в новом прайсе': new['Артикул'],
+        'Наименование в старом прайсе': old['Наименование услуги'],
+        'Наименование в новом прайсе': new['Наименование услуги'],
+        'Цена предыдущего года': old['Цена'].astype('float64'),
+        'Цена нового прайса': new['Цена'].astype('float64'),
+        'Изменение цены %': calculate_price_changes(old['Цена'], new['Цена']),
+        'Сопоставлено по': pairs['method'].to_numpy(),
+        'Уверенность': pairs['confidence'].round(2).to_numpy(),
+    })
+    
+    if len(pairs):
+        # Старая цена для строк нового прайса с сопоставленными артикулами
+        df_new = comparison.df_new
+        matched_prices = PriceLookup(new['Артикул'], old['Цена'].astype('float64')).get(df_new['Артикул'])
+        matched = ~np.isnan(matched_prices)
+        df_new.loc[matched, 'Стоимость услуг предыдущий год'] = matched_prices[matched]
+        
+        matched_old, matched_new = set(old['Артикул']), set(new['Артикул'])
+        comparison.removed_services = [service for service in comparison.removed_services if service[1] not in matched_old]
+        comparison.new_services = [service for service in comparison.new_services if service[1] not in matched_new]
+        # Для выгрузки таблицы различий сопоставленные позиции больше не новые и не удаленные
+        removed_positions = comparison.removed_positions
+        if removed_positions is not None:
+            comparison.removed_positions = removed_positions[~removed_positions['Артикул'].isin(matched_old)]
+        if comparison.added_articles is not None:
+            comparison.added_articles = comparison.added_articles.difference(pd.Index(list(matched_new)), sort=False)
+    
+    by_method = comparison.fuzzy_matches['Сопоставлено по'].value_counts()
+    print(f"\nНечеткое сопоставление (уверенность не ниже {min_confidence:g}): "
+          f"по нормализованному артикулу - {by_method.get('артикул', 0)}, "
+          f"по наименованию - {by_method.get('наименование', 0)}")
+    return comparison
@@ -0,0 +1,299 @@
+# История цен: очищенные прайсы всех лет хранятся в одной базе SQLite (версия = один прайс).
+# Любые две версии можно сравнить без повторного разбора Excel, а по индексу (артикул, версия)
+# за миллисекунды отвечают запросы "история цены артикула" и "самые большие изменения между версиями"
+import os
+import sqlite3
+import datetime
+import contextlib
+
+import pandas as pd
+
+from .cleaning import TEXT_DTYPE
+from .matching import article_mask
+from .cache import file_hash
+from .changes import DEFAULT_CHANGE_THRESHOLD
+from .instrumentation import StageMonitor
+from .pipeline import (
+    OLD_YEAR, NEW_YEAR, PRICE_COLUMN_OLD, PRICE_COLUMN_NEW, Comparison, compare_loaded, prepare_price_list,
+)
+
+DEFAULT_HISTORY_DB = os.path.join('history', 'prices.sqlite')
+
+SCHEMA = """
+-- Порядок версий во времени - порядок id: версии нумеруются по мере сохранения
+-- (прайс предыдущего года сохраняется раньше следующего), замененная версия сохраняет свой id
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source TEXT,
+    file_hash TEXT,
+    row_count INTEGER NOT NULL,
+    added TEXT NOT NULL
+);
+-- Прайс целиком в исходном порядке строк (вместе с заголовками разделов) - для повторного сравнения.
+-- У номера услуги нет типа: в прайсах встречаются и числа, и строки
+CREATE TABLE IF NOT EXISTS price_rows (
+    version_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    number,
+    article TEXT,
+    name TEXT,
+    price REAL,
+    PRIMARY KEY (version_id, position)
+) WITHOUT ROWID;
+-- Цена артикула в версии (для повторяющихся артикулов - последняя, как при сравнении).
+-- Первичный ключ (артикул, версия) - индекс для истории артикула
+CREATE TABLE IF NOT EXISTS prices (
+    article TEXT NOT NULL,
+    version_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    price REAL,
+    name TEXT,
+    PRIMARY KEY (article, version_id)
+) WITHOUT ROWID;
+-- Цены версии по артикулам - индекс для сравнения двух версий
+CREATE INDEX IF NOT EXISTS prices_by_version ON prices (version_id, article, price);
+-- Изменения цен между парами версий (считаются при первом запросе к паре);
+-- индекс по изменению отдает самые большие повышения и снижения без сортировки всех артикулов
+CREATE TABLE IF NOT EXISTS changes (
+    old_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    new_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    article TEXT NOT NULL,
+    change REAL NOT NULL,
+    PRIMARY KEY (old_id, new_id, article)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS changes_by_size ON changes (old_id, new_id, change);
+CREATE TABLE IF NOT EXISTS compared (
+    old_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    new_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    PRIMARY KEY (old_id, new_id)
+) WITHOUT ROWID;
+-- Проблемы с ценами, найденные при очистке прайса
+CREATE TABLE IF NOT EXISTS issues (
+    version_id INTEGER NOT NULL REFERENCES versions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    article TEXT,
+    name TEXT,
+    problem TEXT,
+    PRIMARY KEY (version_id, position)
+) WITHOUT ROWID;
+"""
+
+# Направления запроса самых больших изменений: порядок обхода индекса changes_by_size
+MOVER_ORDER = {
+    'up': ['DESC'],
+    'down': ['ASC'],
+    'both': ['DESC', 'ASC'],
+}
+
+# Название версии по имени файла прайса: "Прайс 2025.xlsx" -> "Прайс 2025"
+def version_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+# Значения колонки для SQLite: пропуски (NaN, pd.NA) - NULL, числа numpy - числа Python
+def sql_values(values):
+    return values.astype(object).where(values.notna(), None).tolist()
+
+# Хранилище истории цен в файле SQLite. Соединение открывается на каждую операцию,
+# поэтому объект можно передавать в процессы пакетного режима (запись ждет освобождения базы)
+class PriceHistory:
+    def __init__(self, path=DEFAULT_HISTORY_DB):
+        self.path = path
+    
+    @contextlib.contextmanager
+    def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            connection.execute('PRAGMA foreign_keys = ON')
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.executescript(SCHEMA)
+            yield connection
+        finally:
+            connection.close()
+    
+    # Сохраняем очищенный прайс как версию name. Если версия с таким именем уже есть,
+    # она заменяется на том же месте в порядке версий, а если у нее тот же хэш файла - остается как есть
+    # (возвращаем False)
+    def add_version(self, name, df, price_column, issues=None, source=None, file_hash=None):
+        with self.connect() as connection, connection:
+            existing = connection.execute('SELECT id, file_hash FROM versions WHERE name = ?', (name,)).fetchone()
+            if existing is not None and file_hash is not None and existing[1] == file_hash:
+                return False
+            if existing is not None:
+                connection.execute('DELETE FROM versions WHERE id = ?', (existing[0],))
+            
+            version_id = connection.execute(
+                'INSERT INTO versions (id, name, source, file_hash, row_count, added) VALUES (?, ?, ?, ?, ?, ?)',
+                (existing[0] if existing is not None else None, name, source, file_hash, len(df),
+                 datetime.datetime.now().isoformat(timespec='seconds')),
+            ).lastrowid
+            connection.executemany(
+                'INSERT INTO price_rows (version_id, position, number, article, name, price) VALUES (?, ?, ?, ?, ?, ?)',
+                zip([version_id] * len(df), range(len(df)), sql_values(df['№ услуги']), sql_values(df['Артикул']),
+                    sql_values(df['Наименование услуги']), sql_values(df[price_column])),
+            )
+            
+            priced = df[article_mask(df['Артикул'], strip=True)]
+            priced = priced[~priced['Артикул'].duplicated(keep='last')]
+            connection.executemany(
+                'INSERT INTO prices (article, version_id, price, name) VALUES (?, ?, ?, ?)',
+                zip(sql_values(priced['Артикул']), [version_id] * len(priced), sql_values(priced[price_column]),
+                    sql_values(priced['Наименование услуги'])),
+            )
+            
+            if issues is not None and len(issues):
+                connection.executemany(
+                    'INSERT INTO issues (version_id, position, article, name, problem) VALUES (?, ?, ?, ?, ?)',
+                    zip([version_id] * len(issues), range(len(issues)), sql_values(issues['Артикул']),
+                        sql_values(issues['Наименование услуги']), sql_values(issues['Проблема'])),
+                )
+        return True
+    
+    # Список версий в порядке сохранения (от старых к новым)
+    def versions(self):
+        with self.connect() as connection:
+            return pd.read_sql_query(
+                'SELECT name AS "Версия", row_count AS "Строк", source AS "Файл", added AS "Добавлена" '
+                'FROM versions ORDER BY id', connection)
+    
+    def version_id(self, connection, name):
+        row = connection.execute('SELECT id FROM versions WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            raise ValueError(f"Версия '{name}' не найдена в истории цен ({self.path})")
+        return row[0]
+    
+    # Прайс версии в том же виде, что и после загрузки и очистки файла: (DataFrame, проблемы)
+    def load_version(self, name, price_column, price_list):
+        with self.connect() as connection:
+            version_id = self.version_id(connection, name)
+            df = pd.read_sql_query(
+                'SELECT number, article, name, price FROM price_rows WHERE version_id = ? ORDER BY position',
+                connection, params=(version_id,))
+            issues = pd.read_sql_query(
+                'SELECT article, name, problem FROM issues WHERE version_id = ? ORDER BY position',
+                connection, params=(version_id,))
+        
+        df = pd.DataFrame({
+            '№ услуги': df['number'].infer_objects(),
+            'Артикул': df['article'].astype(TEXT_DTYPE),
+            'Наименование услуги': df['name'].astype(TEXT_DTYPE),
+            price_column: df['price'].astype('float64'),
+        })
+        issues = pd.DataFrame({
+            'Прайс': price_list,
+            'Артикул': issues['article'].astype(TEXT_DTYPE),
+            'Наименование услуги': issues['name'],
+            'Проблема': issues['problem'],
+        })
+        return df, issues
+    
+    # История цены артикула по всем версиям (запрос по первичному ключу) с изменением
+    # относительно предыдущей версии, где артикул был
+    def article_history(self, article):
+        with self.connect() as connection:
+            history = pd.read_sql_query(
+                'SELECT v.name AS "Версия", p.price AS "Цена", p.name AS "Наименование услуги" '
+                'FROM prices p JOIN versions v ON v.id = p.version_id WHERE p.article = ? ORDER BY v.id',
+                connection, params=(str(article),))
+        history['Изменение цены %'] = (history['Цена'].pct_change(fill_method=None) * 100).round(1)
+        return history
+    
+    # Изменения цен общих артикулов двух версий: считаются один раз (версия old читается по индексу
+    # prices_by_version, цена в new ищется по первичному ключу) и сохраняются в таблицу changes
+    def ensure_changes(self, connection, id_old, id_new):
+        if connection.execute('SELECT 1 FROM compared WHERE old_id = ? AND new_id = ?', (id_old, id_new)).fetchone():
+            return
+        with connection:
+            connection.execute(
+                'INSERT INTO changes (old_id, new_id, article, change) '
+                'SELECT old.version_id, new.version_id, old.article, (new.price - old.price) / old.price '
+                'FROM prices old JOIN prices new ON new.article = old.article AND new.version_id = ? '
+                'WHERE old.version_id = ? AND old.price > 0 AND new.price > 0',
+                (id_new, id_old))
+            connection.execute('INSERT INTO compared (old_id, new_id) VALUES (?, ?)', (id_old, id_new))
+    
+    # Артикулы с самым большим изменением цены между версиями: direction - 'up' (повышения),
+    # 'down' (снижения) или 'both' (по модулю изменения). Первый запрос к паре версий считает
+    # изменения всех общих артикулов, следующие читают limit строк с краев индекса changes_by_size
+    def top_movers(self, version_old, version_new, limit=20, direction='both'):
+        with self.connect() as connection:
+            id_old, id_new = self.version_id(connection, version_old), self.version_id(connection, version_new)
+            self.ensure_changes(connection, id_old, id_new)
+            movers = pd.concat([pd.read_sql_query(
+                'SELECT c.article, new.name, old.price AS price_old, new.price AS price_new, c.change FROM '
+                f'(SELECT article, change FROM changes WHERE old_id = ? AND new_id = ? ORDER BY change {order} LIMIT ?) c '
+                'JOIN prices old ON old.article = c.article AND old.version_id = ? '
+                'JOIN prices new ON new.article = c.article AND new.version_id = ?',
+                connection, params=(id_old, id_new, limit, id_old, id_new)) for order in MOVER_ORDER[direction]],
+                ignore_index=True)
+        # Для 'both' берем по limit строк с обоих краев индекса и оставляем самые большие по модулю
+        movers = movers.drop_duplicates('article')
+        order = movers['change'].abs() if direction == 'both' else movers['change']
+        movers = movers.loc[order.sort_values(ascending=direction == 'down', kind='stable').index[:limit]].reset_index(drop=True)
+        return pd.DataFrame({
+            'Артикул': movers['article'],
+            'Наименование услуги': movers['name'],
+            f'Цена ({version_old})': movers['price_old'],
+            f'Цена ({version_new})': movers['price_new'],
+            'Изменение цены %': (movers['change'] * 100).round(1),
+        })
+
+# Сохраняем оба очищенных прайса сравнения в историю (после обычного сравнения файлов).
+# Если у файлов одинаковые имена (input/old/Прайс.xlsx и input/new/Прайс.xlsx), к версии
+# добавляется имя папки: "old/Прайс" и "new/Прайс".
+# hashes - хэши содержимого файлов: повторный запуск с теми же файлами ничего не добавляет
+def store_comparison(history, comparison, input_file_old, input_file_new, hashes=(None, None)):
+    issues = comparison.issues
+    names = [version_name(input_file_old), version_name(input_file_new)]
+    if names[0] == names[1]:
+        names = [f'{os.path.basename(os.path.dirname(os.path.abspath(path)))}/{name}'
+                 for path, name in zip((input_file_old, input_file_new), names)]
+    sides = [
+        (input_file_old, names[0], comparison.df_old, PRICE_COLUMN_OLD, OLD_YEAR, hashes[0]),
+        (input_file_new, names[1], comparison.df_new, PRICE_COLUMN_NEW, NEW_YEAR, hashes[1]),
+    ]
+    for path, name, df, price_column, price_list, file_hash in sides:
+        if history.add_version(name, df, price_column, issues[issues['Прайс'] == price_list], path, file_hash):
+            print(f"Прайс сохранен в историю цен как версия '{name}'")
+
+# Загружаем прайс-файл в историю без сравнения (например, прайсы прошлых лет).
+# Через кэш разобранных прайсов уже разобранный файл не читается заново
+def ingest_price_list(history, path, name=None, cache=None, reader='auto'):
+    name = name or version_name(path)
+    df, issues, _ = prepare_price_list(path, PRICE_COLUMN_NEW, NEW_YEAR, cache=cache, reader=reader)
+    if history.add_version(name, df, PRICE_COLUMN_NEW, issues, path, file_hash(path)):
+        print(f"Прайс сохранен в историю цен как версия '{name}' ({len(df)} строк)")
+    else:
+        print(f"Версия '{name}' уже есть в истории цен с тем же файлом")
+    return name
+
+# Сравнение двух версий из истории цен: прайсы читаются из базы уже очищенными,
+# дальше идут те же этапы, что и при сравнении файлов
+def compare_versions(history, version_old, version_new, output_file=None, issues_sheet=False, monitor=None, fuzzy=None,
+                     change_threshold=DEFAULT_CHANGE_THRESHOLD, changes_only=None):
+    monitor = monitor or StageMonitor()
+    with monitor.stage('load') as record:
+        df_old, issues_old = history.load_version(version_old, PRICE_COLUMN_OLD, OLD_YEAR)
+        df_new, issues_new = history.load_version(version_new, PRICE_COLUMN_NEW, NEW_YEAR)
+        record['rows_out'] = len(df_old) + len(df_new)
+    print(f"\nСравниваем версии '{version_old}' и '{version_new}' из истории цен ({history.path})")
+    comparison = Comparison(df_old, df_new, pd.concat([issues_old, issues_new], ignore_index=True), cleaned=True)
+    return compare_loaded(comparison, output_file, issues_sheet, monitor, fuzzy, change_threshold=change_threshold,
+                          changes_only=changes_only)
+
+# Сравнение нескольких версий из истории цен в одной таблице (по порядку от старой к новой)
+def compare_many_versions(history, versions, output_file=None, issues_sheet=False, monitor=None,
+                          change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    # Сравнение нескольких версий нужно только этой команде, поэтому multiway подключается здесь
+    from .multiway import MultiComparison, price_column, compare_many_loaded
+    
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Версии для сравнения должны различаться: {', '.join(versions)}")
+    monitor = monitor or StageMonitor()
+    with monitor.stage('load') as record:
+        loaded = [history.load_version(version, price_column(version), version) for version in versions]
+        record['rows_out'] = sum(len(df) for df, _ in loaded)
+    print(f"\nСравниваем версии {' → '.join(versions)} из истории цен ({history.path})")
+    comparison = MultiComparison(list(versions), [df for df, _ in loaded],
+                                 pd.concat([issues for _, issues in loaded], ignore_index=True))
+    return compare_many_loaded(comparison, output_file, issues_sheet, monitor, change_threshold)
@@ -0,0 +1,82 @@
+# Повторный запуск без лишней работы: рядом с результатом сохраняется манифест запуска
+# (хэши входных файлов, настройки, версия кода и хэш результата). Если при следующем запуске
+# ничего из этого не изменилось, сравнение пропускается целиком, а если изменился только
+# один прайс, второй берется из кэша разобранных прайсов (см. PriceListCache)
+import os
+import json
+import uuid
+import glob
+import hashlib
+
+import pandas as pd
+
+from .cache import file_hash
+
+# Версия формата манифеста: манифесты другой версии считаются устаревшими
+RUN_MANIFEST_VERSION = 1
+
+# Названия прайсов для сообщений в консоли
+SIDE_TITLES = {'old': 'прайс предыдущего года', 'new': 'прайс следующего года'}
+
+# Файл манифеста рядом с результатом: <результат>.manifest.json
+def run_manifest_file(output_file):
+    return os.path.splitext(output_file)[0] + '.manifest.json'
+
+# Версия кода сравнения: хэш исходников пакета и версия pandas. После обновления
+# программы результат пересчитывается, даже если входные файлы не менялись
+def code_version():
+    digest = hashlib.sha256(pd.__version__.encode())
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+# Манифест текущего запуска (без результата - он добавляется после сравнения)
+def build_run_manifest(input_file_old, input_file_new, settings):
+    return {
+        'version': RUN_MANIFEST_VERSION,
+        'code': code_version(),
+        'inputs': {
+            'old': {'path': input_file_old, 'hash': file_hash(input_file_old)},
+            'new': {'path': input_file_new, 'hash': file_hash(input_file_new)},
+        },
+        'settings': settings,
+    }
+
+# Манифест прошлого запуска или None, если его нет или он поврежден
+def load_run_manifest(manifest_file):
+    try:
+        with open(manifest_file, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != RUN_MANIFEST_VERSION:
+        return None
+    return manifest
+
+# Прайсы, которые не изменились с прошлого запуска ('old', 'new'). Если изменились
+# настройки или версия кода, прошлый запуск не учитывается
+def unchanged_sides(previous, manifest):
+    if previous is None or previous.get('code') != manifest['code'] or previous.get('settings') != manifest['settings']:
+        return []
+    return [side for side in ('old', 'new')
+            if previous.get('inputs', {}).get(side, {}).get('hash') == manifest['inputs'][side]['hash']]
+
+# Результат прошлого запуска актуален: входные файлы, настройки и версия кода те же,
+# а файл результата на месте и не изменялся после сравнения
+def is_up_to_date(previous, manifest, output_file):
+    if len(unchanged_sides(previous, manifest)) < 2 or 'stats' not in previous:
+        return False
+    try:
+        return previous.get('output', {}).get('hash') == file_hash(output_file)
+    except OSError:
+        return False
+
+# Сохраняем манифест вместе с хэшем результата и итоговой статистикой (она возвращается,
+# когда сравнение пропускается). Запись через временный файл, чтобы не оставить недописанный манифест
+def save_run_manifest(manifest_file, manifest, output_file, stats):
+    manifest = dict(manifest, output={'path': output_file, 'hash': file_hash(output_file)}, stats=stats)
+    temp_path = f'{manifest_file}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, manifest_file)
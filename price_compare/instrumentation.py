@@ -0,0 +1,136 @@
+# Замеры этапов сравнения: время, процессорное время, пиковая память и число строк
+# на входе и выходе каждого этапа, профилирование выбранных этапов и настройка логов
+import os
+import io
+import sys
+import time
+import pstats
+import logging
+import cProfile
+import resource
+import platform
+import contextlib
+import tracemalloc
+
+import pandas as pd
+
+# Этапы конвейера, которые можно профилировать (--profile); stream - обработка нового прайса
+# частями в потоковом режиме (там load - построение индекса старого прайса)
+STAGES = ['load', 'clean', 'match', 'fuzzy', 'diff', 'stats', 'render', 'export', 'stream']
+
+# Обработчик логов, который пишет в текущий sys.stdout: сообщения попадают туда же, куда print,
+# в том числе в перехваченный вывод (лог пары в пакетном режиме, загрузка в отдельном процессе)
+class StdoutHandler(logging.Handler):
+    def emit(self, record):
+        print(self.format(record))
+
+# Настраиваем уровень логов пакета: подробные отладочные выводы (колонки файлов, уникальные цены,
+# списки артикулов) показываются только на уровне DEBUG
+def configure_logging(level='INFO'):
+    logger = logging.getLogger('price_compare')
+    logger.setLevel(level)
+    if not any(isinstance(handler, StdoutHandler) for handler in logger.handlers):
+        handler = StdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.propagate = False
+
+# Сбрасываем пиковый RSS процесса (Linux): после этого VmHWM показывает пик только текущего этапа
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+# Пиковый RSS процесса в МБ: VmHWM из /proc (сбрасывается между этапами),
+# иначе ru_maxrss - максимум за все время работы процесса
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == 'darwin' else maxrss / 1024
+
+# Процессорное время процесса и завершившихся дочерних процессов (параллельная загрузка)
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+# Замеры этапов одного сравнения. Каждый этап оборачивается в monitor.stage(...),
+# после чего записи доступны в monitor.stages и попадают в отчет о запуске
+class StageMonitor:
+    def __init__(self, trace_memory=False, profile_stages=()):
+        self.trace_memory = trace_memory
+        self.profile_stages = set(profile_stages)
+        self.profiler = cProfile.Profile() if self.profile_stages else None
+        self.stages = []
+    
+    def profiling(self, name):
+        return name in self.profile_stages
+    
+    # Замер этапа: rows_in задается при входе, rows_out - через возвращаемую запись
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        per_stage_rss = reset_peak_rss()
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        profiler = self.profiler if self.profiling(name) else None
+        started, cpu_started = time.perf_counter(), cpu_seconds()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['seconds'] = round(time.perf_counter() - started, 4)
+            record['cpu_seconds'] = round(cpu_seconds() - cpu_started, 4)
+            record['peak_rss_mb'] = round(peak_rss_mb(), 1)
+            record['peak_rss_per_stage'] = per_stage_rss
+            if self.trace_memory:
+                record['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+                tracemalloc.stop()
+            self.stages.append(record)
+    
+    def total_seconds(self):
+        return round(sum(record['seconds'] for record in self.stages), 4)
+    
+    # Краткая таблица этапов для консоли
+    def summary(self):
+        summary = pd.DataFrame(self.stages)[['stage', 'seconds', 'cpu_seconds', 'peak_rss_mb', 'rows_in', 'rows_out']]
+        return summary.astype({'rows_in': 'Int64', 'rows_out': 'Int64'})
+    
+    # Сохраняем профиль: двоичный файл для pstats/snakeviz и текстовую сводку самых дорогих функций
+    def save_profile(self, path, limit=40):
+        if self.profiler is None:
+            return None
+        self.profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats('cumulative').print_stats(limit)
+        text_path = os.path.splitext(path)[0] + '.txt'
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+        return text_path
+
+# Память, занимаемая таблицей (вместе со строками), в МБ; None - таблицы нет (потоковый режим)
+def frame_memory_mb(df):
+    if df is None:
+        return None
+    return round(df.memory_usage(deep=True).sum() / 1024 / 1024, 2)
+
+# Сведения об окружении для отчета о запуске
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
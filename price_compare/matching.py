@@ -0,0 +1,88 @@
+# Сопоставление позиций прайсов по артикулам (артикулы уже приведены к строкам при загрузке)
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Строим индекс "артикул -> первая строка прайса" для поиска позиций за O(1)
+def build_article_index(df):
+    articles = df['Артикул']
+    first = ~articles.duplicated()
+    return df[first].set_index(pd.Index(articles[first], name=None))
+
+# Маска строк с непустым артикулом (strip - не считать артикулом строку из одних пробелов)
+def article_mask(articles, strip=False):
+    if strip:
+        articles = articles.str.strip()
+    return articles.ne('').fillna(False).to_numpy(dtype=bool)
+
+# Позиции артикулов в списке уникальных артикулов (-1 - нет в списке). Поиск идет хэш-таблицей
+# Arrow прямо по строковым буферам: pandas для строк Arrow сначала копирует их в объекты Python
+def article_positions(articles, unique):
+    positions = pc.index_in(pa.array(articles, type=pa.large_string()), value_set=pa.array(unique, type=pa.large_string()))
+    return positions.fill_null(-1).to_numpy()
+
+# Артикулы из articles, которых нет среди other (оба - уникальные артикулы)
+def missing_articles(articles, other):
+    return articles[article_positions(articles, other) < 0]
+
+# Уникальные непустые артикулы прайса
+def unique_articles(df):
+    articles = df['Артикул']
+    return pd.Index(articles[article_mask(articles)].unique(), name=None)
+
+# Индекс цен "артикул -> цена" на массивах: уникальные артикулы (pd.Index с хэш-таблицей)
+# и массив цен в том же порядке. Для повторяющихся артикулов берется последняя цена
+class PriceLookup:
+    def __init__(self, articles, prices):
+        articles = pd.Index(articles, name=None)
+        last = ~articles.duplicated(keep='last')
+        self.articles = articles[last]
+        self.prices = np.asarray(prices, dtype='float64')[last]
+    
+    # Индекс по колонкам прайса; строки без артикула (или с артикулом из пробелов) пропускаются
+    @classmethod
+    def from_frame(cls, df, price_column):
+        valid = article_mask(df['Артикул'], strip=True)
+        return cls(df['Артикул'][valid], df[price_column].to_numpy()[valid])
+    
+    def __len__(self):
+        return len(self.articles)
+    
+    # Цены для артикулов (NaN - артикула нет в индексе)
+    def get(self, articles):
+        if not len(self.articles):
+            return np.full(len(articles), np.nan)
+        positions = article_positions(articles, self.articles)
+        return np.where(positions >= 0, self.prices[positions], np.nan)
+
+# Ключ сортировки позиций по номеру услуги (нечисловые номера - в конец)
+def service_number_key(service):
+    number = str(service[0]).replace(',', '.')
+    return float(number) if number.replace('.', '').isdigit() else float('inf')
+
+# Колонки позиций, найденных по списку артикулов (article_rows, списки collect_services)
+SERVICE_COLUMNS = ['№ услуги', 'Артикул', 'Цена', 'Наименование услуги']
+
+# Все позиции прайса по списку артикулов (первая строка каждого артикула) в порядке прайса,
+# без фильтров списков отчета: позиции без номера, наименования или цены тоже входят.
+# Используется для выгрузки таблицы различий (удаленные позиции)
+def article_rows(article_index, articles, price_column):
+    rows = article_index.iloc[np.sort(article_positions(list(articles), article_index.index))]
+    return pd.DataFrame({
+        '№ услуги': rows['№ услуги'].to_numpy(dtype=object),
+        'Артикул': rows.index.to_numpy(dtype=object),
+        'Цена': rows[price_column].to_numpy(dtype='float64'),
+        'Наименование услуги': rows['Наименование услуги'].to_numpy(dtype=object),
+    })
+
+# Собираем позиции по списку артикулов в виде (№ услуги, артикул, цена, наименование),
+# пропуская пустые артикулы и позиции с неполными данными
+def collect_services(article_index, articles, price_column):
+    articles = [article for article in sorted(articles) if article.strip()]
+    rows = article_index.iloc[article_positions(articles, article_index.index)]
+    rows = rows[rows['№ услуги'].notna() & rows['Наименование услуги'].notna() & rows[price_column].notna()]
+    services = list(zip(rows['№ услуги'], rows.index, rows[price_column], rows['Наименование услуги']))
+    # Сортируем список по номеру услуги
+    services.sort(key=service_number_key)
+    return services
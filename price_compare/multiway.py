@@ -0,0 +1,234 @@
+# Сравнение нескольких версий прайса (N прайсов по порядку, от самого старого к самому новому)
+# в одной таблице: цена в каждой версии, изменения между соседними версиями и накопленные
+# изменения от первой версии, с той же цветовой индикацией, что и при сравнении двух прайсов.
+# Все версии соединяются по артикулу за один проход: артикулы всех прайсов кодируются одной
+# хэш-таблицей (pd.factorize), и цены раскладываются в матрицу "артикул x версия". Каждый прайс
+# читается один раз, а добавление версии добавляет колонку, а не еще одно попарное сравнение
+import os
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import report_issues
+from .matching import article_mask, article_positions
+from .changes import DEFAULT_CHANGE_THRESHOLD, calculate_price_changes, classify_changes, category_titles, category_stats
+from .writer import write_multiway_result
+from .instrumentation import StageMonitor
+from .pipeline import prepare_price_list, prepare_price_list_captured
+
+# Колонка цены версии и колонка изменения цены между двумя версиями
+def price_column(label):
+    return f'Стоимость услуг ({label})'
+
+def change_column(label_from, label_to):
+    return f'Изменение {label_from} → {label_to}, %'
+
+# Название версии: имя файла без расширения, для DataFrame - номер по порядку
+def version_label(source, number):
+    if isinstance(source, pd.DataFrame):
+        return f'Прайс {number}'
+    return os.path.splitext(os.path.basename(source))[0]
+
+# Названия версий для колонок: заданные labels или имена файлов. Названия должны различаться
+def version_labels(sources, labels=None):
+    if len(sources) < 2:
+        raise ValueError("Для сравнения нужно не меньше двух прайсов")
+    labels = list(labels) if labels else [version_label(source, number) for number, source in enumerate(sources, 1)]
+    if len(labels) != len(sources):
+        raise ValueError(f"Названий версий ({len(labels)}) должно быть столько же, сколько прайсов ({len(sources)})")
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"Названия версий должны различаться: {', '.join(labels)}")
+    return labels
+
+# Пары версий для колонок изменений: соседние версии, затем накопленные изменения от первой
+# версии к третьей и следующим (от первой ко второй - это уже изменение соседних версий)
+def change_pairs(count):
+    return [(index, index + 1) for index in range(count - 1)] + [(0, index) for index in range(2, count)]
+
+# Состояние сравнения нескольких версий
+@dataclass
+class MultiComparison:
+    labels: list
+    frames: list
+    issues: pd.DataFrame = None
+    articles: pd.Index = None  # Уникальные артикулы всех версий
+    prices: np.ndarray = None  # Цены: строка - артикул из articles, колонка - версия
+    present: np.ndarray = None  # Есть ли артикул в версии
+    numbers: np.ndarray = None  # Номер услуги и наименование из последней версии, где есть артикул
+    names: np.ndarray = None
+    df_result: pd.DataFrame = None
+    absent_positions: int = 0  # Артикулы прежних версий, которых нет в последней
+    totals: list = field(default_factory=list)  # Итоги по каждой паре версий (change_pairs)
+    stats: dict = field(default_factory=dict)
+    change_threshold: float = DEFAULT_CHANGE_THRESHOLD  # Порог значительного изменения цены, %
+    stages: list = field(default_factory=list)
+
+# Загружаем и очищаем все версии (в пуле процессов, если ядер больше одного;
+# с кэшем разобранных прайсов уже встречавшиеся файлы не разбираются заново)
+def load_versions(sources, labels, cache=None, parallel=True, reader='auto'):
+    arguments = [(source, price_column(label), label, None, cache, reader) for source, label in zip(sources, labels)]
+    from_files = not any(isinstance(source, pd.DataFrame) for source in sources)
+    workers = min(len(sources), os.cpu_count() or 1)
+    if parallel and from_files and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            prepared = list(executor.map(prepare_price_list_captured, *zip(*arguments)))
+        for *_, log in prepared:
+            print(log, end='')
+    else:
+        prepared = [prepare_price_list(*args) for args in arguments]
+    frames = [df for df, *_ in prepared]
+    issues = pd.concat([issues for _, issues, *_ in prepared], ignore_index=True)
+    return frames, issues
+
+# Соединяем версии по артикулу: для каждой версии берутся позиции с артикулами (для повторяющихся -
+# последняя, как при сравнении двух прайсов), артикулы всех версий кодируются одним вызовом
+# pd.factorize, и цены версий записываются в свои колонки матрицы по кодам артикулов
+def join_versions(comparison):
+    labels = comparison.labels
+    keyed = []
+    for df in comparison.frames:
+        rows = df[article_mask(df['Артикул'], strip=True)]
+        keyed.append(rows[~rows['Артикул'].duplicated(keep='last')])
+    codes, articles = pd.factorize(pd.concat([rows['Артикул'] for rows in keyed], ignore_index=True))
+    
+    prices = np.full((len(articles), len(labels)), np.nan)
+    present = np.zeros((len(articles), len(labels)), dtype=bool)
+    numbers = np.full(len(articles), None, dtype=object)
+    names = np.full(len(articles), None, dtype=object)
+    offset = 0
+    for version, (rows, label) in enumerate(zip(keyed, labels)):
+        positions = codes[offset:offset + len(rows)]
+        offset += len(rows)
+        prices[positions, version] = rows[price_column(label)].to_numpy(dtype='float64', na_value=np.nan)
+        present[positions, version] = True
+        numbers[positions] = rows['№ услуги'].to_numpy(dtype=object)
+        names[positions] = rows['Наименование услуги'].to_numpy(dtype=object)
+    
+    comparison.articles = pd.Index(articles, name=None)
+    comparison.prices, comparison.present = prices, present
+    comparison.numbers, comparison.names = numbers, names
+    
+    print(f"\nКоличество уникальных артикулов:")
+    for label, column in zip(labels, present.T):
+        print(f"{label}: {int(column.sum())}")
+    print(f"Во всех версиях вместе: {len(articles)}")
+    return comparison
+
+# Итоговая таблица: строки последней версии в ее порядке (с заголовками разделов) и цены
+# прежних версий по артикулу, затем раздел с позициями прежних версий, которых нет в последней.
+# Изменения цен считаются для всех пар из change_pairs
+def build_table(comparison):
+    labels, latest = comparison.labels, comparison.frames[-1]
+    
+    # Заголовки разделов и позиции с артикулами (как при сравнении двух прайсов)
+    rows = latest[latest['Артикул'].isna().to_numpy() | article_mask(latest['Артикул'])]
+    positions = article_positions(rows['Артикул'], comparison.articles)
+    prices = np.where((positions >= 0)[:, None], comparison.prices[positions], np.nan)
+    prices[:, -1] = rows[price_column(labels[-1])].to_numpy(dtype='float64', na_value=np.nan)
+    
+    numbers = rows['№ услуги'].to_numpy(dtype=object)
+    articles = rows['Артикул'].to_numpy(dtype=object)
+    names = rows['Наименование услуги'].to_numpy(dtype=object)
+    
+    absent = np.flatnonzero(~comparison.present[:, -1])
+    comparison.absent_positions = len(absent)
+    if len(absent):
+        title = np.array([None, None, f"Позиции, отсутствующие в прайсе {labels[-1]}"], dtype=object)
+        numbers = np.concatenate([numbers, title[:1], comparison.numbers[absent]])
+        articles = np.concatenate([articles, title[1:2], comparison.articles[absent].to_numpy(dtype=object)])
+        names = np.concatenate([names, title[2:], comparison.names[absent]])
+        prices = np.vstack([prices, np.full((1, len(labels)), np.nan), comparison.prices[absent]])
+    
+    columns = {'№ услуги': numbers, 'Артикул': articles, 'Наименование услуги': names}
+    columns.update((price_column(label), prices[:, version]) for version, label in enumerate(labels))
+    columns.update((change_column(labels[first], labels[second]), calculate_price_changes(prices[:, first], prices[:, second]))
+                   for first, second in change_pairs(len(labels)))
+    comparison.df_result = pd.DataFrame(columns)
+    return comparison
+
+# Итоги по каждой паре версий: общее изменение цен по общим позициям (цены есть в обеих версиях)
+# и число изменений по категориям
+def calculate_totals(comparison):
+    labels, df_result = comparison.labels, comparison.df_result
+    comparison.totals = []
+    comparison.stats = {'Версий': len(labels), 'Артикулов во всех версиях': len(comparison.articles)}
+    for label, df in zip(labels, comparison.frames):
+        comparison.stats[f'Позиций в прайсе {label}'] = len(df)
+    comparison.stats[f'Отсутствуют в прайсе {labels[-1]}'] = comparison.absent_positions
+    
+    for first, second in change_pairs(len(labels)):
+        prices_from = df_result[price_column(labels[first])]
+        prices_to = df_result[price_column(labels[second])]
+        common = prices_from.notna() & prices_to.notna() & (prices_from > 0) & (prices_to > 0)
+        total_from, total_to = prices_from[common].sum(), prices_to[common].sum()
+        total_change_percent = (total_to - total_from) / total_from * 100 if total_from > 0 else 0
+        change = df_result[change_column(labels[first], labels[second])]
+        counts = pd.Series(classify_changes(change, comparison.change_threshold)).value_counts()
+        
+        pair = f'{labels[first]} → {labels[second]}'
+        comparison.totals.append({
+            'Изменение': pair,
+            'Общих позиций': int(common.sum()),
+            'Сумма цен до': float(total_from),
+            'Сумма цен после': float(total_to),
+            'Общее изменение, %': round(float(total_change_percent), 1),
+            **category_stats(counts, comparison.change_threshold),
+        })
+        comparison.stats[f'{pair}: общее изменение, %'] = round(float(total_change_percent), 1)
+    return comparison
+
+# Выводим итоги по парам версий в консоль
+def report_totals(comparison):
+    titles, threshold = category_titles(comparison.change_threshold), comparison.change_threshold
+    print(f"\nПозиций прежних версий, отсутствующих в прайсе {comparison.labels[-1]}: {comparison.absent_positions}")
+    for total in comparison.totals:
+        change = total['Общее изменение, %']
+        print(f"\n{total['Изменение']}: общее изменение цен {'+' if change > 0 else ''}{change:.1f}% "
+              f"(общих позиций: {total['Общих позиций']})")
+        print(f"Повышений более {threshold:g}%: {total[titles['up']]}, снижений более {threshold:g}%: {total[titles['down']]}, "
+              f"в пределах ±{threshold:g}%: {total[titles['small']]}, без изменений: {total[titles['none']]}")
+
+# Сравнение уже загруженных и очищенных версий (из файлов или из истории цен).
+# change_threshold - порог значительного изменения цены (цвета, легенда, итоги), %
+def compare_many_loaded(comparison, output_file=None, issues_sheet=False, monitor=None,
+                        change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    monitor = monitor or StageMonitor()
+    comparison.change_threshold = change_threshold
+    rows = sum(len(df) for df in comparison.frames)
+    print("\nПроверка цен в прайсах (после очистки):")
+    report_issues(comparison.issues)
+    with monitor.stage('match', rows) as record:
+        join_versions(comparison)
+        record['rows_out'] = len(comparison.articles)
+    with monitor.stage('diff', len(comparison.frames[-1])) as record:
+        build_table(comparison)
+        record['rows_out'] = len(comparison.df_result)
+    with monitor.stage('stats', len(comparison.df_result)) as record:
+        calculate_totals(comparison)
+        record['rows_out'] = len(comparison.totals)
+    if output_file is not None:
+        with monitor.stage('render', len(comparison.df_result)) as record:
+            write_multiway_result(output_file, comparison.df_result, [price_column(label) for label in comparison.labels],
+                                  [change_column(comparison.labels[first], comparison.labels[second])
+                                   for first, second in change_pairs(len(comparison.labels))],
+                                  comparison.totals, comparison.issues if issues_sheet else None, change_threshold)
+            record['rows_out'] = len(comparison.df_result)
+    comparison.stages = monitor.stages
+    return comparison
+
+# Сравнение нескольких версий прайса (пути к файлам или DataFrame) по порядку от старой к новой.
+# labels - названия версий для колонок (по умолчанию - имена файлов без расширения)
+def compare_many(sources, labels=None, output_file=None, issues_sheet=False, cache=None, parallel_load=True,
+                 reader='auto', monitor=None, change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    labels = version_labels(sources, labels)
+    monitor = monitor or StageMonitor()
+    if monitor.profiling('load'):
+        parallel_load = False
+    print(f"\nСравниваем версии прайса: {' → '.join(labels)}")
+    with monitor.stage('load') as record:
+        frames, issues = load_versions(sources, labels, cache, parallel_load, reader)
+        record['rows_out'] = sum(len(df) for df in frames)
+    return compare_many_loaded(MultiComparison(labels, frames, issues), output_file, issues_sheet, monitor,
+                               change_threshold)
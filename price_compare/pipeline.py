@@ -0,0 +1,625 @@
+# Конвейер сравнения прайс-листов: load -> clean -> match -> diff -> stats -> render.
+# Каждый этап можно вызвать отдельно из Python с путями к файлам или готовыми DataFrame
+import io
+import os
+import json
+import time
+import logging
+import contextlib
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import TEXT_DTYPE, normalize_articles, normalize_prices, report_unparsed, validate_prices, report_issues
+from .matching import (
+    build_article_index, article_mask, missing_articles, unique_articles, collect_services, article_rows,
+    PriceLookup,
+)
+from .changes import (
+    DEFAULT_CHANGE_THRESHOLD, calculate_price_changes, format_changes, classify_changes, category_titles, category_stats,
+)
+from .writer import EXCEL_MAX_ROWS, write_result
+from .fuzzy import match_fuzzy
+from .sections import locate_sections, section_rows, section_statistics, section_records, changed_rows
+from .export import export_diff, export_file_name, summary_file_name
+from .readers import READ_SETTINGS, DEFAULT_CHUNK_ROWS, read_price_file, select_reader
+from .instrumentation import StageMonitor, environment, frame_memory_mb
+from .incremental import (
+    SIDE_TITLES, run_manifest_file, build_run_manifest, load_run_manifest, unchanged_sides, is_up_to_date, save_run_manifest,
+)
+
+# Подробные отладочные выводы (колонки файлов, уникальные цены, списки артикулов) - на уровне DEBUG
+logger = logging.getLogger(__name__)
+
+# Подписи годов для имен колонок и таблицы проблем
+OLD_YEAR = "предыдущий год"
+NEW_YEAR = "следующий год"
+
+# Колонки с ценами после приведения прайсов к общему виду
+PRICE_COLUMN_OLD = f'Стоимость услуг {OLD_YEAR}'
+PRICE_COLUMN_NEW = f'Стоимость услуг {NEW_YEAR}'
+
+# Состояние сравнения, которое этапы конвейера заполняют по очереди
+@dataclass
+class Comparison:
+    df_old: pd.DataFrame
+    df_new: pd.DataFrame
+    issues: pd.DataFrame = None
+    cleaned: bool = False
+    articles_old: pd.Index = None
+    articles_new: pd.Index = None
+    removed_services: list = field(default_factory=list)
+    new_services: list = field(default_factory=list)
+    # Результат сопоставления для выгрузки таблицы различий (без фильтров списков отчета):
+    # все позиции старого прайса, артикулов которых нет в новом, и артикулы нового прайса, которых нет в старом
+    removed_positions: pd.DataFrame = None
+    added_articles: pd.Index = None
+    df_result: pd.DataFrame = None
+    df_report: pd.DataFrame = None  # Строки для Excel: df_result целиком или только изменения
+    total_old_common: float = 0.0
+    total_new_common: float = 0.0
+    total_change_percent: float = 0.0
+    common_positions: int = 0
+    stats: dict = field(default_factory=dict)
+    stages: list = field(default_factory=list)
+    reused: list = field(default_factory=list)  # Прайсы ('old', 'new'), взятые из кэша разобранных прайсов
+    fuzzy_matches: pd.DataFrame = None  # Нечетко сопоставленные позиции (если этап fuzzy выполнялся)
+    section_stats: pd.DataFrame = None  # Итоги по разделам прайса
+    change_threshold: float = DEFAULT_CHANGE_THRESHOLD  # Порог значительного изменения цены, %
+
+# Загружаем прайс из файла или копируем готовый DataFrame и приводим колонки к общему виду:
+# первые три - номер, артикул и наименование, последняя - цена.
+# parallel - читать листы книги одновременно в отдельных процессах
+def load_price_list(source, price_column, title=None, reader='auto', parallel=True):
+    df = source.copy() if isinstance(source, pd.DataFrame) else read_price_file(source, reader, parallel)
+    
+    # Выводим информацию о столбцах для отладки
+    if title:
+        logger.debug("\nСтолбцы в %s:\n%s", title, '\n'.join(f"- {col}" for col in df.columns))
+    return standard_columns(df, price_column)
+
+# Переименовываем колонки прайса: первые три - номер, артикул и наименование, последняя - цена.
+# Артикулы один раз приводятся к строкам, артикулы и наименования хранятся в компактном
+# строковом типе (TEXT_DTYPE)
+def standard_columns(df, price_column):
+    column_names = {
+        df.columns[0]: '№ услуги',
+        df.columns[1]: 'Артикул',
+        df.columns[2]: 'Наименование услуги',
+        df.columns[-1]: price_column
+    }
+    df = df.rename(columns=column_names, copy=False)
+    df['Артикул'] = normalize_articles(df['Артикул'])
+    df['Наименование услуги'] = df['Наименование услуги'].astype(TEXT_DTYPE)
+    return df
+
+# Приводим цены к числам, собираем таблицу проблем и удаляем пустые строки без вывода в консоль
+# (используется и для прайса целиком, и для его частей в потоковом режиме).
+# Возвращаем (очищенный DataFrame, проблемы, нераспознанные цены)
+def clean_prices(df, price_column, price_list):
+    # Применяем очистку к колонке с ценами
+    df[price_column], unparsed = normalize_prices(df[price_column])
+    issues = validate_prices(df, price_column, unparsed, price_list)
+    
+    # Удаляем пустые строки
+    # Строка считается пустой, если все значения в ней NaN или пустые строки
+    df = df.dropna(how='all').reset_index(drop=True)
+    
+    # Удаляем строки, где все значения - пустые строки (по колонкам, без копии всей таблицы
+    # в виде строк; в числовой колонке пустых строк не бывает)
+    blank = np.ones(len(df), dtype=bool)
+    for _, values in df.items():
+        if not blank.any():
+            break
+        if pd.api.types.is_numeric_dtype(values):
+            blank[:] = False
+        else:
+            blank &= values.eq('').fillna(False).to_numpy(dtype=bool)
+    df = df[~blank].reset_index(drop=True)
+    
+    # НЕ фильтруем строки без артикулов, чтобы сохранить заголовки разделов
+    # Заголовки разделов могут не иметь артикулов, но быть нужными для структуры прайса
+    return df, issues, unparsed
+
+# Очищаем один прайс: приводим цены к числам, собираем таблицу проблем
+# и удаляем пустые строки. Возвращаем (очищенный DataFrame, проблемы)
+def clean_price_list(df, price_column, price_list):
+    # Выводим уникальные значения для отладки (unique() на больших прайсах дорогой,
+    # поэтому считается только при включенном уровне DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("\nУникальные значения в колонке цен (%s):\n%s", price_list, df[price_column].unique())
+    
+    df, issues, unparsed = clean_prices(df, price_column, price_list)
+    report_unparsed(unparsed, price_column)
+    
+    # Выводим результаты преобразования для проверки
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("\nПосле преобразования, уникальные значения в колонке цен (%s):\n%s", price_list,
+                     df[price_column].unique())
+    return df, issues
+
+# Загрузка и очистка одного прайса с использованием кэша: при попадании
+# разбор Excel и очистка цен пропускаются полностью.
+# Возвращаем (очищенный DataFrame, проблемы, взят ли прайс из кэша)
+def prepare_price_list(source, price_column, price_list, title=None, cache=None, reader='auto', parallel=True):
+    key = None
+    if cache is not None and not isinstance(source, pd.DataFrame):
+        settings = dict(READ_SETTINGS, reader=select_reader(source, reader), price_column=price_column, price_list=price_list)
+        key = cache.key(source, settings)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"\nПрайс ({price_list}) загружен из кэша: {source}")
+            return cached + (True,)
+    
+    df, issues = clean_price_list(load_price_list(source, price_column, title, reader, parallel), price_column,
+                                  price_list)
+    if key is not None:
+        cache.put(key, df, issues)
+    return df, issues, False
+
+# prepare_price_list в отдельном процессе: вывод собирается в строку и возвращается вместе
+# с результатом, чтобы сообщения двух прайсов не перемешивались в консоли. Файлы уже читаются
+# в пуле, поэтому листы книги внутри процесса читаются по очереди
+def prepare_price_list_captured(*args):
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        prepared = prepare_price_list(*args, parallel=False)
+    return prepared + (log.getvalue(),)
+
+# Загружаем и очищаем оба файла одновременно в двух процессах (разбор Excel
+# выполняется на чистом Python и держит GIL, поэтому потоки здесь не помогают)
+def prepare_concurrently(source_old, source_new, cache=None, reader='auto'):
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        future_old = executor.submit(prepare_price_list_captured, source_old, PRICE_COLUMN_OLD, OLD_YEAR, "старом прайсе",
+                                     cache, reader)
+        future_new = executor.submit(prepare_price_list_captured, source_new, PRICE_COLUMN_NEW, NEW_YEAR, "новом прайсе",
+                                     cache, reader)
+        *prepared_old, log_old = future_old.result()
+        *prepared_new, log_new = future_new.result()
+    print(log_old, end='')
+    print(log_new, end='')
+    return tuple(prepared_old), tuple(prepared_new)
+
+# Этап load: загружаем оба прайса. Файлы (parallel=True, если ядер больше одного)
+# загружаются и очищаются одновременно в двух процессах, а с кэшем (PriceListCache) берутся из кэша
+# или сохраняются в него - в этих случаях этап clean ничего не делает. Листы книги из нескольких листов
+# при parallel=True тоже читаются одновременно.
+# reader - движок чтения файлов ('auto' - самый быстрый из установленных для формата файла)
+def load(source_old, source_new, cache=None, parallel=True, reader='auto'):
+    from_files = not isinstance(source_old, pd.DataFrame) and not isinstance(source_new, pd.DataFrame)
+    if parallel and from_files and (os.cpu_count() or 1) > 1:
+        (df_old, issues_old, cached_old), (df_new, issues_new, cached_new) = prepare_concurrently(
+            source_old, source_new, cache, reader)
+        comparison = Comparison(df_old, df_new, pd.concat([issues_old, issues_new], ignore_index=True), cleaned=True)
+        comparison.reused = [side for side, cached in (('old', cached_old), ('new', cached_new)) if cached]
+    elif cache is not None:
+        df_old, issues_old, cached_old = prepare_price_list(source_old, PRICE_COLUMN_OLD, OLD_YEAR, "старом прайсе",
+                                                            cache, reader, parallel)
+        df_new, issues_new, cached_new = prepare_price_list(source_new, PRICE_COLUMN_NEW, NEW_YEAR, "новом прайсе",
+                                                            cache, reader, parallel)
+        comparison = Comparison(df_old, df_new, pd.concat([issues_old, issues_new], ignore_index=True), cleaned=True)
+        comparison.reused = [side for side, cached in (('old', cached_old), ('new', cached_new)) if cached]
+    else:
+        df_old = load_price_list(source_old, PRICE_COLUMN_OLD, "старом прайсе", reader, parallel)
+        df_new = load_price_list(source_new, PRICE_COLUMN_NEW, "новом прайсе", reader, parallel)
+        comparison = Comparison(df_old, df_new)
+    
+    print(f"\nИспользуем колонки:")
+    print(f"Предыдущий год: {PRICE_COLUMN_OLD}")
+    print(f"Следующий год: {PRICE_COLUMN_NEW}")
+    return comparison
+
+# Этап clean: очищаем цены обоих прайсов (если они еще не очищены) и выводим найденные проблемы
+def clean(comparison):
+    if not comparison.cleaned:
+        comparison.df_old, issues_old = clean_price_list(comparison.df_old, PRICE_COLUMN_OLD, OLD_YEAR)
+        comparison.df_new, issues_new = clean_price_list(comparison.df_new, PRICE_COLUMN_NEW, NEW_YEAR)
+        comparison.issues = pd.concat([issues_old, issues_new], ignore_index=True)
+        comparison.cleaned = True
+    
+    # Проверяем наличие цен в обоих прайсах
+    print("\nПроверка цен в прайсах (после очистки):")
+    report_issues(comparison.issues)
+    
+    # Выводим статистику по количеству позиций
+    print("\nСтатистика по количеству позиций:")
+    print(f"Количество позиций в прайсе предыдущего года: {len(comparison.df_old)}")
+    print(f"Количество позиций в прайсе следующего года: {len(comparison.df_new)}")
+    return comparison
+
+# Этап match: сопоставляем позиции по артикулам, находим удаленные и новые
+# и подставляем в новый прайс цены предыдущего года
+def match(comparison):
+    df_old, df_new = comparison.df_old, comparison.df_new
+    
+    # Подсчитываем уникальные артикулы (строками с момента загрузки)
+    # Исключаем заголовки разделов из сравнения артикулов
+    articles_old = unique_articles(df_old)
+    articles_new = unique_articles(df_new)
+    
+    print(f"\nКоличество уникальных артикулов:")
+    print(f"Прайс предыдущего года: {len(articles_old)}")
+    print(f"Прайс следующего года: {len(articles_new)}")
+    
+    # Анализируем разницу по артикулам
+    missing_in_new = missing_articles(articles_old, articles_new)
+    new_in_new = missing_articles(articles_new, articles_old)
+    
+    # Индексы артикулов строим один раз, вместо поиска по всей колонке для каждого артикула
+    article_index_old = build_article_index(df_old)
+    article_index_new = build_article_index(df_new)
+    
+    # Списки артикулов выводятся только на уровне DEBUG: на больших прайсах это тысячи строк
+    print(f"\nАнализ изменений по артикулам:")
+    print(f"Услуг, отсутствующих в новом прайсе: {len(missing_in_new)}")
+    if len(missing_in_new) > 0 and logger.isEnabledFor(logging.DEBUG):
+        rows = article_index_old.loc[sorted(missing_in_new)]
+        logger.debug("\nСписок артикулов, отсутствующих в новом прайсе:\n%s", '\n'.join(
+            f"Артикул: {article}, Цена предыдущего года: {price} руб., Услуга: {service}"
+            for article, service, price in zip(rows.index, rows['Наименование услуги'], rows[PRICE_COLUMN_OLD])))
+    
+    print(f"\nНовых услуг в новом прайсе: {len(new_in_new)}")
+    if len(new_in_new) > 0 and logger.isEnabledFor(logging.DEBUG):
+        rows = article_index_new.loc[sorted(new_in_new)]
+        logger.debug("\nСписок новых артикулов в новом прайсе:\n%s", '\n'.join(
+            f"Артикул: {article}, Цена нового прайса: {price} руб., Услуга: {service}"
+            for article, service, price in zip(rows.index, rows['Наименование услуги'], rows[PRICE_COLUMN_NEW])))
+    
+    # Сохраняем списки удаленных и новых позиций для добавления в конец документа
+    comparison.removed_services = collect_services(article_index_old, missing_in_new, PRICE_COLUMN_OLD)
+    comparison.new_services = collect_services(article_index_new, new_in_new, PRICE_COLUMN_NEW)
+    comparison.removed_positions = article_rows(article_index_old, missing_in_new, PRICE_COLUMN_OLD)
+    comparison.added_articles = new_in_new
+    
+    # Индекс цен предыдущего года на массивах для быстрого поиска по артикулу
+    # (записи без артикулов и пустые артикулы отфильтровываются)
+    prices_old = PriceLookup.from_frame(df_old, PRICE_COLUMN_OLD)
+    
+    # Добавляем колонку с ценами предыдущего года, используя артикул для сопоставления
+    df_new['Стоимость услуг предыдущий год'] = prices_old.get(df_new['Артикул'])
+    
+    comparison.articles_old, comparison.articles_new = articles_old, articles_new
+    return comparison
+
+# Процентное изменение, его текст и категория для всех строк прайса с уже подставленными
+# ценами предыдущего года; колонка старой цены переносится перед колонкой новой.
+# threshold - порог значительного изменения цены для категорий, %
+def add_price_changes(df_new, threshold=DEFAULT_CHANGE_THRESHOLD):
+    # Вычисляем процентное изменение, его текстовое представление и категорию изменения
+    # сразу для всех строк
+    df_new['Изменение цены %'] = calculate_price_changes(df_new['Стоимость услуг предыдущий год'], df_new[PRICE_COLUMN_NEW])
+    df_new['Изменение цены % (текст)'] = format_changes(df_new['Изменение цены %'])
+    df_new['Категория изменения'] = classify_changes(df_new['Изменение цены %'], threshold)
+    
+    # Переупорядочиваем колонки
+    columns = list(df_new.columns)
+    price_new_index = columns.index(PRICE_COLUMN_NEW)
+    columns.remove('Стоимость услуг предыдущий год')
+    columns.insert(price_new_index, 'Стоимость услуг предыдущий год')
+    return df_new[columns]
+
+# Этап diff: процентное изменение, его текст и категория для всех строк,
+# порядок колонок и итоговая таблица. changes_only - минимальное изменение цены, %, для отчета
+# "только изменения": в Excel попадают только позиции с таким изменением и заголовки их разделов
+# (None - все строки)
+def diff(comparison, changes_only=None):
+    df_new = add_price_changes(comparison.df_new, comparison.change_threshold)
+    
+    # ВАЖНОЕ ИСПРАВЛЕНИЕ: Копируем DataFrame вместо создания нового
+    df_result = df_new.copy(deep=True)
+    
+    # Фильтруем результат, оставляя только:
+    # 1. Строки без артикулов (заголовки)
+    # 2. Строки с артикулами, которые есть в новом прайсе - это все непустые артикулы
+    #    (articles_new собраны из этой же таблицы), поэтому проверка идет по маске без поиска
+    df_result = df_result[df_result['Артикул'].isna().to_numpy() | article_mask(df_result['Артикул'])]
+    
+    # Строки отчета отбираются векторно до формирования Excel; статистика и выгрузка считаются по всей таблице
+    comparison.df_report = df_result
+    if changes_only is not None:
+        comparison.df_report = df_result[changed_rows(df_result, PRICE_COLUMN_NEW, changes_only)[0]]
+        print(f"\nОтчет только по изменениям (больше {changes_only:g}%): {len(comparison.df_report)} строк "
+              f"из {len(df_result)}")
+    
+    comparison.df_new, comparison.df_result = df_new, df_result
+    return comparison
+
+# Этап stats: общее изменение цен по общим позициям, итоги по разделам и итоговая статистика сравнения
+def calculate_stats(comparison):
+    df_old, df_new = comparison.df_old, comparison.df_new
+    
+    # Используем только те позиции, которые есть в обоих прайсах (исключаем строки с NaN в ценах)
+    df_common = df_new[
+        (df_new['Стоимость услуг предыдущий год'].notna()) &
+        (df_new[PRICE_COLUMN_NEW].notna()) &
+        (df_new['Стоимость услуг предыдущий год'] > 0) &
+        (df_new[PRICE_COLUMN_NEW] > 0)
+    ]
+    
+    # Считаем общие суммы для позиций, которые есть в обоих прайсах
+    total_old_common = df_common['Стоимость услуг предыдущий год'].sum()
+    total_new_common = df_common[PRICE_COLUMN_NEW].sum()
+    
+    # Вычисляем процент изменения для общих позиций
+    total_change_percent = ((total_new_common - total_old_common) / total_old_common * 100) if total_old_common > 0 else 0
+    
+    # Выводим информацию о количестве позиций для проверки
+    print(f"\nКоличество позиций для расчета изменения по общим позициям: {len(df_common)}")
+    print(f"Количество позиций в старом прайсе с ценами: {len(df_old[PRICE_COLUMN_OLD].dropna())}")
+    print(f"Количество позиций в новом прайсе с ценами: {len(df_new[PRICE_COLUMN_NEW].dropna())}")
+    
+    # Распределение изменений цен по категориям
+    category_counts = df_new['Категория изменения'].value_counts()
+    
+    # Итоги по разделам: раздел каждой строки результата - по последнему заголовку раздела над ней
+    df_result = comparison.df_result
+    comparison.section_stats = section_statistics(
+        section_rows(df_result, *locate_sections(df_result, PRICE_COLUMN_NEW), PRICE_COLUMN_NEW))
+    
+    comparison.total_old_common = total_old_common
+    comparison.total_new_common = total_new_common
+    comparison.total_change_percent = total_change_percent
+    comparison.common_positions = len(df_common)
+    comparison.stats = {
+        'Позиций в старом прайсе': len(df_old),
+        'Позиций в новом прайсе': len(df_new),
+        'Удаленных позиций': len(comparison.removed_services),
+        'Новых позиций': len(comparison.new_services),
+        **category_stats(category_counts, comparison.change_threshold),
+        'Общее изменение, %': round(float(total_change_percent), 1),
+        'Разделов': len(comparison.section_stats),
+    }
+    if comparison.fuzzy_matches is not None:
+        comparison.stats['Сопоставлено нечетко'] = len(comparison.fuzzy_matches)
+    return comparison
+
+# Этап render: сохраняем результат с форматированием за один проход
+# (таблица длиннее max_rows строк продолжается на следующих листах)
+def render(comparison, output_file, issues_sheet=False, max_rows=EXCEL_MAX_ROWS):
+    write_result(output_file, comparison.df_report, PRICE_COLUMN_NEW, comparison.removed_services,
+                 comparison.new_services, comparison.total_change_percent, comparison.total_old_common,
+                 comparison.total_new_common, comparison.issues if issues_sheet else None, comparison.fuzzy_matches,
+                 comparison.section_stats, max_rows, comparison.change_threshold)
+    return comparison
+
+# Этап export: таблица различий для других программ в export_file (Parquet, CSV или JSON Lines -
+# по расширению) и итоговая запись рядом с ней
+def export(comparison, export_file):
+    summary = export_diff(comparison, comparison.df_result, PRICE_COLUMN_NEW, export_file)
+    print(f"\nТаблица различий ({summary['rows']} строк) выгружена в файл '{export_file}', "
+          f"итоги - в '{summary_file_name(export_file)}'")
+    return summary
+
+# Выводим итоговую статистику сравнения в консоль
+def report_stats(comparison):
+    total_change_percent = comparison.total_change_percent
+    print(f"\nОбщее изменение цен (только по общим позициям): {'+' if total_change_percent > 0 else ''}{total_change_percent:.1f}%")
+    print(f"Сумма цен предыдущего года (только общие позиции): {comparison.total_old_common:,.2f} руб.")
+    print(f"Сумма цен следующего года (только общие позиции): {comparison.total_new_common:,.2f} руб.")
+    
+    stats, titles, threshold = comparison.stats, category_titles(comparison.change_threshold), comparison.change_threshold
+    print(f"\nПовышений цены более чем на {threshold:g}%: {stats[titles['up']]}")
+    print(f"Снижений цены более чем на {threshold:g}%: {stats[titles['down']]}")
+    print(f"Изменений цены в пределах ±{threshold:g}%: {stats[titles['small']]}")
+    print(f"Цен без изменений: {stats[titles['none']]}")
+    
+    # Итоги по разделам - на отдельном листе и в отчете о запуске, в консоли - только на уровне DEBUG
+    print(f"\nРазделов в прайсе: {stats['Разделов']} (итоги по разделам - на листе 'Итоги по разделам')")
+    if comparison.section_stats is not None and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("\nИтоги по разделам:\n%s", comparison.section_stats.to_string(index=False))
+    
+    # Дополнительная статистика по новым и удаленным позициям
+    print(f"\nСтатистика по изменениям в прайсе:")
+    print(f"Количество удаленных позиций: {stats['Удаленных позиций']}")
+    print(f"Количество новых позиций: {stats['Новых позиций']}")
+    if 'Сопоставлено нечетко' in stats:
+        print(f"Сопоставлено нечетко (лист 'Сопоставленные позиции'): {stats['Сопоставлено нечетко']}")
+    
+    # Если есть новые позиции, выводим их общую стоимость
+    if comparison.new_services:
+        total_new_services_cost = sum(price for _, _, price, _ in comparison.new_services)
+        print(f"Общая стоимость новых позиций: {total_new_services_cost:,.2f} руб.")
+
+# Полное сравнение двух прайсов (пути к файлам или DataFrame).
+# Если output_file не указан, Excel не формируется - результат остается в объекте Comparison.
+# cache (PriceListCache) позволяет не разбирать повторно уже встречавшиеся файлы,
+# parallel_load - загружать оба файла одновременно, reader - движок чтения файлов.
+# monitor (StageMonitor) замеряет время, память и число строк каждого этапа, записи этапов
+# сохраняются в comparison.stages. fuzzy - минимальная уверенность нечеткого сопоставления
+# позиций, не найденных по точному артикулу (None - без нечеткого сопоставления).
+# export_file - файл таблицы различий (.parquet, .csv или .jsonl), выгружается вместе с Excel или без него.
+# max_rows - лимит строк на листе Excel, change_threshold - порог значительного изменения цены, %,
+# changes_only - минимальное изменение цены, %, для отчета "только изменения" (None - все строки)
+def compare(source_old, source_new, output_file=None, issues_sheet=False, cache=None, parallel_load=True,
+            reader='auto', monitor=None, fuzzy=None, export_file=None, max_rows=EXCEL_MAX_ROWS,
+            change_threshold=DEFAULT_CHANGE_THRESHOLD, changes_only=None):
+    monitor = monitor or StageMonitor()
+    # Профилировщик видит только текущий процесс, поэтому профилируемая загрузка идет без пула
+    if monitor.profiling('load'):
+        parallel_load = False
+    
+    with monitor.stage('load') as record:
+        comparison = load(source_old, source_new, cache, parallel_load, reader)
+        record['rows_out'] = len(comparison.df_old) + len(comparison.df_new)
+        record['reused'] = comparison.reused
+    return compare_loaded(comparison, output_file, issues_sheet, monitor, fuzzy, export_file, max_rows, change_threshold,
+                          changes_only)
+
+# Этапы clean -> match -> (fuzzy) -> diff -> stats -> render -> (export) для уже загруженных прайсов
+# (из файлов или из хранилища истории цен, где прайсы хранятся уже очищенными)
+def compare_loaded(comparison, output_file=None, issues_sheet=False, monitor=None, fuzzy=None, export_file=None,
+                   max_rows=EXCEL_MAX_ROWS, change_threshold=DEFAULT_CHANGE_THRESHOLD, changes_only=None):
+    monitor = monitor or StageMonitor()
+    comparison.change_threshold = change_threshold
+    with monitor.stage('clean', len(comparison.df_old) + len(comparison.df_new)) as record:
+        clean(comparison)
+        record['rows_out'] = len(comparison.df_old) + len(comparison.df_new)
+    with monitor.stage('match', len(comparison.df_new)) as record:
+        match(comparison)
+        record['rows_out'] = int(comparison.df_new['Стоимость услуг предыдущий год'].notna().sum())
+    if fuzzy is not None:
+        with monitor.stage('fuzzy', len(comparison.removed_services) + len(comparison.new_services)) as record:
+            match_fuzzy(comparison, fuzzy)
+            record['rows_out'] = len(comparison.fuzzy_matches)
+    with monitor.stage('diff', len(comparison.df_new)) as record:
+        diff(comparison, changes_only)
+        record['rows_out'] = len(comparison.df_report)
+    with monitor.stage('stats', len(comparison.df_new)) as record:
+        calculate_stats(comparison)
+        record['rows_out'] = comparison.common_positions
+    if output_file is not None:
+        with monitor.stage('render', len(comparison.df_report)) as record:
+            render(comparison, output_file, issues_sheet, max_rows)
+            record['rows_out'] = len(comparison.df_report) + len(comparison.removed_services) + len(comparison.new_services)
+    if export_file is not None:
+        with monitor.stage('export', len(comparison.df_result)) as record:
+            record['rows_out'] = export(comparison, export_file)['rows']
+    comparison.stages = monitor.stages
+    return comparison
+
+# Отчет о запуске в JSON: входные файлы, настройки, итоговая статистика и замеры этапов
+def write_run_report(report_file, comparison, input_file_old, input_file_new, output_file, settings, export_file=None):
+    report = {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'inputs': {
+            'old': {'path': input_file_old, 'size': os.path.getsize(input_file_old)},
+            'new': {'path': input_file_new, 'size': os.path.getsize(input_file_new)},
+        },
+        'output': output_file,
+        'export': export_file,
+        'settings': settings,
+        'stats': comparison.stats,
+        'sections': section_records(comparison.section_stats) if comparison.section_stats is not None else [],
+        'totals': {
+            'old_common': float(comparison.total_old_common),
+            'new_common': float(comparison.total_new_common),
+            'common_positions': comparison.common_positions,
+        },
+        'memory_mb': {
+            'old': frame_memory_mb(comparison.df_old),
+            'new': frame_memory_mb(comparison.df_new),
+            'result': frame_memory_mb(comparison.df_result),
+        },
+        'stages': comparison.stages,
+        'total_seconds': round(sum(record['seconds'] for record in comparison.stages), 4),
+        'environment': environment(),
+    }
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+# Сравниваем два прайс-листа, сохраняем отформатированный результат в output_file
+# и выводим статистику. Рядом с результатом сохраняется отчет о запуске (<результат>.json),
+# а при profile_stages - профиль выбранных этапов (<результат>.prof и текстовая сводка <результат>.txt).
+# streaming - потоковое сравнение частями по chunk_rows строк для прайсов, не помещающихся в память
+# (кэш и параллельная загрузка при этом не используются).
+# Рядом с результатом хранится манифест запуска (<результат>.manifest.json): если входные файлы,
+# настройки и результат не изменились, сравнение пропускается (кроме force и замеров - profile_stages
+# и trace_memory). export_format (parquet, csv, jsonl) - выгрузить таблицу различий рядом с результатом
+# (<результат>.parquet и т.д.), xlsx=False - только выгрузка, без Excel. max_rows - лимит строк на листе Excel.
+# change_threshold - порог значительного изменения цены (цвета, легенда, статистика), %;
+# changes_only - в Excel только позиции с изменением цены больше этого значения, % (и заголовки их разделов).
+# Возвращаем итоговую статистику сравнения (используется в сводке пакетного режима)
+def run_comparison(input_file_old, input_file_new, output_file, issues_sheet=False, cache=None, parallel_load=True,
+                   reader='auto', profile_stages=(), trace_memory=False, streaming=False, chunk_rows=DEFAULT_CHUNK_ROWS,
+                   force=False, history=None, fuzzy=None, export_format=None, xlsx=True, max_rows=EXCEL_MAX_ROWS,
+                   change_threshold=DEFAULT_CHANGE_THRESHOLD, changes_only=None):
+    export_file = export_file_name(output_file, export_format) if export_format else None
+    if not xlsx and export_file is None:
+        raise ValueError("Без Excel нужен формат выгрузки таблицы различий")
+    # Файл, по которому проверяется актуальность результата: Excel или, без него, выгрузка
+    result_file = output_file if xlsx else export_file
+    
+    # Выводим информацию о файлах
+    print(f"Используем файлы:")
+    print(f"Прайс предыдущего года: {input_file_old}")
+    print(f"Прайс следующего года: {input_file_new}")
+    if xlsx:
+        print(f"Результат будет сохранен в: {output_file}")
+    if export_file is not None:
+        print(f"Таблица различий будет выгружена в: {export_file}")
+    
+    # Сравниваем с прошлым запуском: в манифест входят только настройки, от которых зависит результат
+    manifest_file = run_manifest_file(output_file)
+    manifest = build_run_manifest(input_file_old, input_file_new, {
+        'issues_sheet': issues_sheet,
+        'reader': reader,
+        'history': history.path if history is not None else None,
+        'fuzzy': fuzzy,
+        'export': export_format,
+        'xlsx': xlsx,
+        'max_rows': max_rows,
+        'change_threshold': change_threshold,
+        'changes_only': changes_only,
+    })
+    previous = load_run_manifest(manifest_file)
+    if (not (force or profile_stages or trace_memory) and is_up_to_date(previous, manifest, result_file)
+            and (export_file is None or os.path.exists(export_file))):
+        print("\nВходные файлы, настройки и результат не изменились с прошлого запуска - "
+              "сравнение пропущено (повторно использованы все этапы)")
+        print(f"Результат: '{result_file}'")
+        return previous['stats']
+    unchanged = unchanged_sides(previous, manifest)
+    if len(unchanged) == 2:
+        print("\nВходные файлы и настройки не изменились с прошлого запуска, но результат пересчитывается "
+              "(файл результата изменен или удален, либо включены замеры или --force)")
+    elif unchanged:
+        print(f"\nС прошлого запуска изменился только {SIDE_TITLES[({'old', 'new'} - set(unchanged)).pop()]}")
+    
+    monitor = StageMonitor(trace_memory, profile_stages)
+    if streaming:
+        # Модуль streaming сам импортирует pipeline, поэтому подключается здесь
+        from .streaming import compare_streaming
+        if fuzzy is not None:
+            print("\nВ потоковом режиме нечеткое сопоставление не выполняется")
+        comparison = compare_streaming(input_file_old, input_file_new, output_file if xlsx else None, issues_sheet,
+                                       chunk_rows, reader, monitor, export_file, max_rows, change_threshold,
+                                       changes_only)
+    else:
+        comparison = compare(input_file_old, input_file_new, output_file if xlsx else None, issues_sheet, cache,
+                             parallel_load, reader, monitor, fuzzy, export_file, max_rows, change_threshold, changes_only)
+    report_stats(comparison)
+    
+    # Очищенные прайсы сохраняются в историю цен (PriceHistory) как версии с именами файлов
+    if history is not None:
+        if streaming:
+            print("\nВ потоковом режиме прайсы не сохраняются в историю цен (загрузите их через --ingest)")
+        else:
+            from .history import store_comparison
+            print()
+            store_comparison(history, comparison, input_file_old, input_file_new,
+                             (manifest['inputs']['old']['hash'], manifest['inputs']['new']['hash']))
+    
+    print("\nЭтапы сравнения:")
+    print(monitor.summary().to_string(index=False))
+    for side in comparison.reused:
+        print(f"Повторно использованы этапы load и clean: {SIDE_TITLES[side]} взят из кэша разобранных прайсов")
+    
+    base_name = os.path.splitext(output_file)[0]
+    settings = {
+        'issues_sheet': issues_sheet,
+        'cache': cache is not None,
+        'parallel_load': parallel_load,
+        'reader': reader,
+        'profile_stages': sorted(profile_stages),
+        'trace_memory': trace_memory,
+        'streaming': streaming,
+        'chunk_rows': chunk_rows if streaming else None,
+        'force': force,
+        'history': history.path if history is not None else None,
+        'fuzzy': fuzzy,
+        'export': export_format,
+        'xlsx': xlsx,
+        'max_rows': max_rows,
+        'change_threshold': change_threshold,
+        'changes_only': changes_only,
+    }
+    write_run_report(base_name + '.json', comparison, input_file_old, input_file_new, output_file if xlsx else None,
+                     settings, export_file)
+    save_run_manifest(manifest_file, manifest, result_file, comparison.stats)
+    profile_summary = monitor.save_profile(base_name + '.prof')
+    if profile_summary:
+        print(f"\nПрофиль этапов {', '.join(sorted(profile_stages))} сохранен в файлы '{base_name}.prof' и '{profile_summary}'")
+    
+    print(f"\nАнализ завершен. Результат сохранен в файл '{result_file}'")
+    return comparison.stats
@@ -0,0 +1,316 @@
+# Чтение прайс-листов разными движками. Формат файла определяется по его содержимому
+# (сигнатуре), а не по расширению, движок выбирается из доступных для этого формата.
+# Из книг Excel и OpenDocument читаются все листы с прайсом (одновременно, в отдельных процессах)
+import io
+import os
+import csv
+import codecs
+import zipfile
+import itertools
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Настройки чтения (входят в ключ кэша разобранных прайсов)
+READ_SETTINGS = {
+    'na_values': ['', ' ', None],  # Считаем пустые строки и пробелы как NaN
+    'keep_default_na': True,
+}
+
+# Сигнатуры форматов
+OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # Excel 97-2003 (.xls)
+ZIP_SIGNATURE = b'PK\x03\x04'  # Excel 2007+ (.xlsx) и OpenDocument (.ods)
+PARQUET_SIGNATURE = b'PAR1'
+
+# Кодировки текстовых прайсов: выгрузки обычно в UTF-8 или Windows-1251
+CSV_ENCODINGS = ['utf-8-sig', 'cp1251']
+
+# Размер части прайса (строк) при потоковом чтении
+DEFAULT_CHUNK_ROWS = 50000
+
+# Колонка с названием листа, из которого взята строка (если прайс занимает несколько листов книги)
+SHEET_COLUMN = 'Лист'
+
+# Наименьшее число колонок листа с прайсом: номер, артикул, наименование и цена
+MIN_PRICE_COLUMNS = 4
+
+# Листы с прайсом: с тем же числом колонок, что и первый лист, где их не меньше MIN_PRICE_COLUMNS.
+# widths - пары (название листа, число колонок); остальные непустые листы (инструкции, справочники)
+# пропускаются с сообщением
+def price_sheets(widths):
+    width = next((count for _, count in widths if count >= MIN_PRICE_COLUMNS), 0)
+    if not width:
+        return []
+    selected = []
+    for name, count in widths:
+        if count == width:
+            selected.append(name)
+        elif count:
+            print(f"Лист '{name}' пропущен: колонок {count}, а на листе с прайсом {width}")
+    return selected
+
+# Строки одного листа из прайса на нескольких листах: колонки получают названия колонок первого листа,
+# пустые строки удаляются, перед последней колонкой (ценой) добавляется название листа
+def sheet_rows(df, sheet_name, columns):
+    df = df.set_axis(columns, axis=1).dropna(how='all')
+    df.insert(len(columns) - 1, SHEET_COLUMN, sheet_name)
+    return df
+
+# Совпадает ли первая строка листа (values) с заголовком первого листа с прайсом
+def is_header_row(values, header):
+    return [str(value).strip() for value in values] == [str(value).strip() for value in header]
+
+def report_headerless_sheet(sheet_name):
+    print(f"Лист '{sheet_name}' без строки заголовка: первая строка листа считается строкой прайса")
+
+# Объединяем листы книги (название листа -> DataFrame) в один прайс. Прайс на одном листе
+# возвращается как есть, на нескольких - строками всех листов с колонкой SHEET_COLUMN.
+# Листы читаются с заголовком в первой строке; лист-продолжение, первая строка которого не совпадает
+# с заголовком первого листа (заголовок не повторен), перечитывается функцией read_headerless(название листа)
+# без заголовка, чтобы его первая строка не потерялась
+def combine_sheets(frames, read_headerless=None):
+    names = price_sheets([(name, len(df.columns)) for name, df in frames.items()])
+    if len(names) <= 1:
+        return frames[names[0] if names else next(iter(frames))]
+    columns = frames[names[0]].columns
+    for name in names[1:]:
+        if read_headerless is not None and not is_header_row(frames[name].columns, columns):
+            report_headerless_sheet(name)
+            frames[name] = read_headerless(name)
+    return pd.concat([sheet_rows(frames[name], name, columns) for name in names], ignore_index=True)
+
+# Один лист книги (в процессе пула при параллельном чтении); header=None - лист без строки заголовка
+def read_sheet(path, engine, sheet_name, header=0):
+    return pd.read_excel(path, sheet_name=sheet_name, engine=engine, header=header, **READ_SETTINGS)
+
+# Читаем все листы книги. Если листов несколько и ядер больше одного (parallel=True), листы
+# разбираются одновременно в отдельных процессах: разбор Excel держит GIL, поэтому потоки не помогают.
+# Пул создается только в основном процессе: в процессах пулов (одновременная загрузка файлов, пакетный
+# режим, HTTP-сервис) листы читаются по очереди, иначе пулы вкладываются и процессов становится ядра x ядра
+def read_workbook(path, engine, parallel=True):
+    def read_headerless(sheet_name):
+        return read_sheet(path, engine, sheet_name, header=None)
+    
+    with pd.ExcelFile(path, engine=engine) as workbook:
+        sheet_names = workbook.sheet_names
+        top_level = multiprocessing.parent_process() is None
+        workers = min(len(sheet_names), os.cpu_count() or 1) if parallel and top_level else 1
+        if workers <= 1:
+            return combine_sheets(pd.read_excel(workbook, sheet_name=None, **READ_SETTINGS), read_headerless)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        frames = executor.map(read_sheet, itertools.repeat(path), itertools.repeat(engine), sheet_names)
+        return combine_sheets(dict(zip(sheet_names, frames)), read_headerless)
+
+def read_calamine(path, parallel=True):
+    return read_workbook(path, 'calamine', parallel)
+
+def read_openpyxl(path, parallel=True):
+    return read_workbook(path, 'openpyxl', parallel)
+
+def read_xlrd(path, parallel=True):
+    return read_workbook(path, 'xlrd', parallel)
+
+def read_odf(path, parallel=True):
+    return read_workbook(path, 'odf', parallel)
+
+# CSV: кодировка и разделитель (запятая, точка с запятой или табуляция) определяются автоматически
+def read_csv_file(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    for encoding in CSV_ENCODINGS:
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode(CSV_ENCODINGS[-1], errors='replace')
+    return pd.read_csv(io.StringIO(text), sep=sniff_delimiter(text[:65536]), **READ_SETTINGS)
+
+# Разделитель CSV по началу файла: запятая, точка с запятой или табуляция
+def sniff_delimiter(sample):
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+    except csv.Error:
+        return ','
+
+def read_parquet_file(path):
+    return pd.read_parquet(path)
+
+# Движки чтения: функция чтения и модуль, без которого движок недоступен
+READERS = {
+    'calamine': (read_calamine, 'python_calamine'),
+    'openpyxl': (read_openpyxl, 'openpyxl'),
+    'xlrd': (read_xlrd, 'xlrd'),
+    'odf': (read_odf, 'odf'),
+    'csv': (read_csv_file, None),
+    'parquet': (read_parquet_file, 'pyarrow'),
+}
+
+# Движки для каждого формата в порядке предпочтения: calamine (на Rust) намного быстрее
+# xlrd и openpyxl, поэтому используется везде, где установлен
+FORMAT_READERS = {
+    'xls': ['calamine', 'xlrd'],
+    'xlsx': ['calamine', 'openpyxl'],
+    'ods': ['calamine', 'odf'],
+    'csv': ['csv'],
+    'parquet': ['parquet'],
+}
+
+# Движки, читающие книги из нескольких листов
+WORKBOOK_READERS = {'calamine', 'openpyxl', 'xlrd', 'odf'}
+
+# Проверяем, установлен ли модуль, нужный движку
+def reader_available(name):
+    module = READERS[name][1]
+    return module is None or importlib.util.find_spec(module) is not None
+
+# Определяем формат файла по первым байтам
+def detect_format(path):
+    with open(path, 'rb') as f:
+        header = f.read(8)
+    if header.startswith(OLE2_SIGNATURE):
+        return 'xls'
+    if header.startswith(PARQUET_SIGNATURE):
+        return 'parquet'
+    if header.startswith(ZIP_SIGNATURE):
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+        if 'content.xml' in names:
+            return 'ods'
+        return 'xlsx'
+    return 'csv'
+
+# Выбираем движок для файла: 'auto' - первый доступный для формата файла,
+# иначе указанный движок (если он подходит к формату)
+def select_reader(path, reader='auto'):
+    file_format = detect_format(path)
+    candidates = FORMAT_READERS[file_format]
+    if reader != 'auto':
+        if reader not in candidates:
+            raise ValueError(f"Движок '{reader}' не читает файлы формата {file_format}: {path}")
+        return reader
+    for name in candidates:
+        if reader_available(name):
+            return name
+    raise ValueError(f"Не установлен ни один движок для чтения файлов формата {file_format}: "
+                     f"{', '.join(candidates)}")
+
+# Читаем файл прайса выбранным движком (parallel - читать листы книги одновременно)
+def read_price_file(path, reader='auto', parallel=True):
+    name = select_reader(path, reader)
+    if name in WORKBOOK_READERS:
+        return READERS[name][0](path, parallel)
+    return READERS[name][0](path)
+
+# Строка листа Excel в том виде, в котором ее разбирает read_excel:
+# пустая ячейка - '', целое число с плавающей точкой - int
+def excel_row(values):
+    return ['' if value is None else int(value) if isinstance(value, float) and value.is_integer() else value
+            for value in values]
+
+# Разбиваем строки листа (первая - заголовок) на DataFrame по chunk_rows строк тем же разбором, что и read_excel.
+# Все колонки - object, чтобы типы значений не зависели от того, какие строки попали в часть
+def frames_from_rows(rows, chunk_rows):
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    width = len(header)
+    while True:
+        batch = [(row + [''] * (width - len(row)))[:width] for row in itertools.islice(rows, chunk_rows)]
+        yield TextParser([header] + batch, header=0, dtype=object, **READ_SETTINGS).read()
+        if len(batch) < chunk_rows:
+            return
+
+# Число колонок листа по его первой строке (без пустых ячеек в конце)
+def header_width(ws):
+    header = list(next(ws.iter_rows(values_only=True, max_row=1), ()))
+    while header and header[-1] is None:
+        header.pop()
+    return len(header)
+
+# .xlsx построчно в режиме read_only: в памяти только текущая часть.
+# Листы с прайсом читаются по очереди и объединяются так же, как при чтении книги целиком
+# (первая строка листа-продолжения пропускается, только если она повторяет заголовок первого листа)
+def iter_openpyxl(path, chunk_rows):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        names = price_sheets([(ws.title, header_width(ws)) for ws in wb.worksheets])
+        if len(names) <= 1:
+            ws = wb[names[0]] if names else wb.worksheets[0]
+            yield from frames_from_rows((excel_row(values) for values in ws.iter_rows(values_only=True)), chunk_rows)
+            return
+        width = header_width(wb[names[0]])
+        columns = header = None
+        for name in names:
+            rows = (excel_row(values) for values in wb[name].iter_rows(values_only=True))
+            first = next(rows)
+            if header is None:
+                header = first
+                rows = itertools.chain([header], rows)
+            elif is_header_row((first + [''] * width)[:width], header[:width]):
+                rows = itertools.chain([header], rows)
+            else:
+                report_headerless_sheet(name)
+                rows = itertools.chain([header, first], rows)
+            for frame in frames_from_rows(rows, chunk_rows):
+                if columns is None:
+                    columns = frame.columns[:header_width(wb[name])]
+                yield sheet_rows(frame.iloc[:, :len(columns)], name, columns)
+    finally:
+        wb.close()
+
+# Кодировка CSV: файл проверяется на UTF-8 блоками, без чтения целиком
+def csv_encoding(path, block_size=1 << 20):
+    decoder = codecs.getincrementaldecoder(CSV_ENCODINGS[0])()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+        return CSV_ENCODINGS[0]
+    except UnicodeDecodeError:
+        return CSV_ENCODINGS[-1]
+
+# CSV частями. Артикулы читаются как object: иначе часть, где все артикулы числовые,
+# получила бы их в виде float ('1000001.0')
+def iter_csv_file(path, chunk_rows):
+    encoding = csv_encoding(path)
+    with open(path, encoding=encoding, errors='replace') as f:
+        delimiter = sniff_delimiter(f.read(65536))
+    settings = dict(READ_SETTINGS, sep=delimiter, encoding=encoding, encoding_errors='replace')
+    header = pd.read_csv(path, nrows=0, **settings).columns
+    dtype = {header[1]: object} if len(header) > 1 else None
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtype, **settings)
+
+def iter_parquet_file(path, chunk_rows):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+# Движки потокового чтения: файл читается частями, не загружаясь в память целиком
+STREAM_READERS = {
+    'openpyxl': iter_openpyxl,
+    'csv': iter_csv_file,
+    'parquet': iter_parquet_file,
+}
+
+# Читаем прайс частями по chunk_rows строк. 'auto' - первый доступный потоковый движок для формата
+# файла; для форматов без него (.xls, .ods) или другого указанного движка файл читается целиком
+# и отдается частями
+def iter_price_file(path, chunk_rows=DEFAULT_CHUNK_ROWS, reader='auto'):
+    if reader == 'auto':
+        candidates = FORMAT_READERS[detect_format(path)]
+        reader = next((name for name in candidates if name in STREAM_READERS and reader_available(name)), 'auto')
+    reader = select_reader(path, reader)
+    if reader in STREAM_READERS:
+        yield from STREAM_READERS[reader](path, chunk_rows)
+        return
+    df = READERS[reader][0](path)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
@@ -0,0 +1,184 @@
+# Итоги по разделам прайса: число повышений и снижений, суммы цен до и после, взвешенное и медианное
+# изменение, самое большое повышение и снижение. Раздел каждой строки определяется одним векторным
+# проходом: заголовки разделов (строки без цены с одной заполненной ячейкой, как их находит writer)
+# нумеруются накопленной суммой, и итоги считаются groupby по номеру раздела (разделы с одинаковым
+# названием в разных частях прайса не сливаются). Итоги копятся по частям (SectionTotals),
+# поэтому в потоковом режиме память зависит от числа разделов, а не от числа строк.
+# По тем же заголовкам отбираются строки отчета "только изменения"
+import numpy as np
+import pandas as pd
+
+from .cleaning import TEXT_DTYPE
+from .matching import article_mask
+from .writer import excel_value
+from .readers import SHEET_COLUMN
+
+# Раздел для позиций до первого заголовка раздела
+NO_SECTION = 'Без раздела'
+
+# Заголовки разделов в таблице результата (df_result или часть результата в потоковом режиме):
+# номера строк-заголовков и названия разделов
+def section_headers(df, price_column):
+    # Заголовки ищутся только среди строк без цены; категория изменения в таблицу не выводится,
+    # а название листа (у прайса на нескольких листах) заполнено во всех строках
+    no_price = np.flatnonzero(df[price_column].isna().to_numpy())
+    candidates = df.iloc[no_price]
+    columns = [column for column in candidates.columns if column not in ('Категория изменения', SHEET_COLUMN)]
+    filled = np.zeros((len(columns), len(candidates)), dtype=bool)
+    texts = np.empty((len(columns), len(candidates)), dtype=object)
+    for number, column in enumerate(columns):
+        values = candidates[column]
+        if pd.api.types.is_numeric_dtype(values):
+            # Число в заголовке - так, как его покажет Excel (целые без ".0")
+            filled[number] = (values.notna() & values.ne(0)).to_numpy(dtype=bool)
+            texts[number] = [str(excel_value(value)) for value in values]
+        else:
+            text = values.astype(TEXT_DTYPE).str.strip()
+            filled[number] = text.ne('').fillna(False).to_numpy(dtype=bool)
+            texts[number] = text.to_numpy(dtype=object, na_value=None)
+    
+    # Заголовок - строка, где заполнена ровно одна ячейка; ее текст - название раздела
+    headers = np.flatnonzero(filled.sum(axis=0) == 1)
+    return no_price[headers], texts[filled[:, headers].argmax(axis=0), headers]
+
+# Номер и название раздела каждой строки таблицы результата: (массив номеров, Series названий).
+# previous - (номер, название) раздела, которым закончилась предыдущая часть (для строк до первого
+# заголовка в части); номер 0 - позиции до первого заголовка прайса
+def locate_sections(df, price_column, previous=(0, NO_SECTION)):
+    positions, titles = section_headers(df, price_column)
+    starts = np.zeros(len(df), dtype=np.int64)
+    starts[positions] = 1
+    headers_above = np.cumsum(starts)
+    titles = np.concatenate([np.array([previous[1]], dtype=object), titles.astype(object)])
+    return headers_above + previous[0], pd.Series(titles[headers_above], index=df.index, dtype=object)
+
+# Раздел каждой строки таблицы результата.
+# previous - раздел, которым закончилась предыдущая часть (для строк до первого заголовка в части)
+def assign_sections(df, price_column, previous=None):
+    return locate_sections(df, price_column, (0, previous if previous is not None else NO_SECTION))[1]
+
+# Строки отчета "только изменения": позиции, цена которых изменилась больше чем на min_change %
+# (или появилась, пропала, была нулевой), и заголовки разделов над ними. Заголовки, идущие подряд
+# (раздел и подраздел), остаются вместе, если ниже, до следующего заголовка, есть такая позиция.
+# Возвращаем маску строк и маску заголовков в конце таблицы, под которыми изменений нет
+# (в потоковом режиме изменения под ними могут оказаться в следующей части)
+def changed_rows(df, price_column, min_change=0):
+    prices_old = df['Стоимость услуг предыдущий год'].to_numpy(dtype='float64')
+    prices_new = df[price_column].to_numpy(dtype='float64')
+    same = (prices_old == prices_new) | (np.isnan(prices_old) & np.isnan(prices_new))
+    changed = article_mask(df['Артикул']) & ~same
+    if min_change > 0:
+        # Порог сравнивается с неокругленным изменением (в таблице оно округлено до 0.1%); у появившихся,
+        # пропавших и бывших нулевыми цен изменение не число или бесконечно, и они остаются в отчете
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (prices_new - prices_old) / prices_old * 100
+        changed &= ~(np.abs(change) <= min_change)
+    
+    headers = np.zeros(len(df), dtype=bool)
+    headers[section_headers(df, price_column)[0]] = True
+    # Номер группы заголовков, идущих подряд, для каждой строки (0 - строки до первого заголовка)
+    groups = np.cumsum(headers & ~np.concatenate([[False], headers[:-1]]))
+    with_changes = np.zeros(groups[-1] + 1 if len(groups) else 1, dtype=bool)
+    with_changes[groups[changed]] = True
+    trailing = headers & (groups == groups[-1]) & ~with_changes[groups[-1]] if len(groups) else headers
+    return changed | (headers & with_changes[groups]), trailing
+
+# Отчет "только изменения" по частям результата (потоковый режим): заголовки в конце части,
+# под которыми в ней нет изменений, переносятся в начало следующей части
+def iter_changed_rows(chunks, price_column, min_change=0):
+    pending = None
+    for chunk in chunks:
+        if pending is not None and len(pending):
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        keep, trailing = changed_rows(chunk, price_column, min_change)
+        pending = chunk[trailing]
+        yield chunk[keep]
+
+# Позиции с артикулами и их разделы (номера и названия из locate_sections): компактная таблица
+# для SectionTotals
+def section_rows(df, numbers, sections, price_column):
+    rows = article_mask(df['Артикул'])
+    return pd.DataFrame({
+        'number': np.asarray(numbers)[rows],
+        'section': sections.to_numpy(dtype=object)[rows],
+        'old': df['Стоимость услуг предыдущий год'].to_numpy(dtype='float64')[rows],
+        'new': df[price_column].to_numpy(dtype='float64')[rows],
+        'change': df['Изменение цены %'].to_numpy(dtype='float64')[rows],
+    })
+
+# Итоги по разделам, накопленные по частям таблицы section_rows. Суммы, счетчики, наибольшее
+# повышение и снижение складываются по номеру раздела; для медианы хранится число изменений каждой величины
+# (изменения округлены до 0.1%, поэтому различных величин немного)
+class SectionTotals:
+    def __init__(self):
+        self.totals = None
+        self.changes = None
+    
+    def add(self, rows):
+        common = (rows['old'] > 0) & (rows['new'] > 0)
+        change = rows['change'].where(common)
+        totals = pd.DataFrame({
+            'number': rows['number'],
+            'section': rows['section'],
+            'common': common,
+            'up': change > 0,
+            'down': change < 0,
+            'old': rows['old'].where(common),
+            'new': rows['new'].where(common),
+            'rise': change.where(change > 0),
+            'drop': change.where(change < 0),
+        }).groupby('number', sort=False).agg(
+            section=('section', 'first'), positions=('section', 'size'), common=('common', 'sum'), up=('up', 'sum'),
+            down=('down', 'sum'), old=('old', 'sum'), new=('new', 'sum'), rise=('rise', 'max'), drop=('drop', 'min'),
+        )
+        changes = pd.DataFrame({'number': rows['number'], 'change': change}).dropna().value_counts()
+        if self.totals is not None:
+            # Раздел на границе частей встречается в обеих: складываем его итоги
+            totals = pd.concat([self.totals, totals]).groupby(level=0, sort=False).agg({
+                'section': 'first', 'positions': 'sum', 'common': 'sum', 'up': 'sum', 'down': 'sum',
+                'old': 'sum', 'new': 'sum', 'rise': 'max', 'drop': 'min',
+            })
+            changes = pd.concat([self.changes, changes]).groupby(level=[0, 1]).sum()
+        self.totals, self.changes = totals, changes
+        return self
+    
+    # Медианное изменение каждого раздела по числу изменений каждой величины
+    def medians(self):
+        medians = pd.Series(np.nan, index=self.totals.index)
+        for number, counts in self.changes.groupby(level=0):
+            values = counts.index.get_level_values(1).to_numpy()
+            order = np.argsort(values)
+            values, bounds = values[order], np.cumsum(counts.to_numpy()[order])
+            middle = np.searchsorted(bounds, [(bounds[-1] - 1) // 2, bounds[-1] // 2], side='right')
+            medians[number] = values[middle].mean()
+        return medians
+    
+    # Итоги в порядке разделов в прайсе. Суммы, взвешенное и медианное изменение считаются,
+    # как общее изменение цен, только по общим позициям (цены есть в обоих прайсах и больше нуля)
+    def statistics(self):
+        if self.totals is None:
+            self.add(pd.DataFrame({'number': [], 'section': [], 'old': [], 'new': [], 'change': []}))
+        grouped = self.totals
+        total_old = grouped['old'].where(grouped['old'] > 0)
+        weighted = (grouped['new'] - total_old) / total_old * 100
+        return pd.DataFrame({
+            'Раздел': grouped['section'].to_numpy(dtype=object),
+            'Позиций': grouped['positions'].to_numpy(),
+            'Общих позиций': grouped['common'].to_numpy(),
+            'Повышений': grouped['up'].to_numpy(),
+            'Снижений': grouped['down'].to_numpy(),
+            'Сумма цен предыдущего года': grouped['old'].round(2).to_numpy(),
+            'Сумма цен следующего года': grouped['new'].round(2).to_numpy(),
+            'Изменение (взвешенное), %': weighted.round(1).to_numpy(),
+            'Медианное изменение, %': self.medians().round(1).to_numpy(),
+            'Наибольшее повышение, %': grouped['rise'].to_numpy(),
+            'Наибольшее снижение, %': grouped['drop'].to_numpy(),
+        })
+
+# Итоги по разделам для таблицы section_rows целиком
+def section_statistics(rows):
+    return SectionTotals().add(rows).statistics()
+
+# Итоги по разделам для JSON (отчет о запуске, HTTP-сервис): пропуски - null, а не NaN
+def section_records(section_stats):
+    return section_stats.astype(object).where(section_stats.notna(), None).to_dict('records')
@@ -0,0 +1,279 @@
+# HTTP-сервис сравнения: два прайса загружаются формой (multipart/form-data), в ответ приходит
+# отформатированный Excel или статистика в JSON. Сравнения выполняются в пуле заранее запущенных
+# процессов, в которых pandas и openpyxl уже загружены, поэтому типичный прайс сравнивается
+# быстрее секунды. Одновременно выполняется не больше workers сравнений, еще max_queue ждут
+# в очереди, остальные запросы получают 503; сравнение дольше timeout секунд прерывается (504)
+import io
+import os
+import json
+import math
+import signal
+import tempfile
+import threading
+import contextlib
+import urllib.parse
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from .pipeline import compare
+from .sections import section_records
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MAX_UPLOAD_MB = 100
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Страница с формой загрузки для браузера
+UPLOAD_FORM = """<!DOCTYPE html>
+<html lang="ru">
+<head><meta charset="utf-8"><title>Сравнение прайс-листов</title></head>
+<body>
+<h1>Сравнение прайс-листов</h1>
+<form method="post" action="/compare" enctype="multipart/form-data">
+<p><label>Прайс предыдущего года: <input type="file" name="old" required></label></p>
+<p><label>Прайс следующего года: <input type="file" name="new" required></label></p>
+<p><label><input type="checkbox" name="issues_sheet" value="1"> Лист "Проблемы" с позициями без цен</label></p>
+<p><label>Результат: <select name="format"><option value="xlsx">Excel</option><option value="json">JSON (статистика)</option></select></label></p>
+<p><button type="submit">Сравнить</button></p>
+</form>
+</body>
+</html>
+"""
+
+# Ошибка запроса: код ответа и сообщение для клиента
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# Прогрев процесса пула: библиотеки уже загружены при импорте модуля (или унаследованы при fork),
+# здесь процесс просто запускается заранее, чтобы первый запрос не ждал его старта
+def warm_up(_=None):
+    import openpyxl  # noqa: F401
+    return os.getpid()
+
+def raise_timeout(signum, frame):
+    raise TimeoutError
+
+# Сравнение загруженных прайсов в процессе пула. Файлы сохраняются во временную папку
+# (формат определяется по содержимому), вывод сравнения в консоль подавляется.
+# Время сравнения ограничивается сигналом SIGALRM: зависшее сравнение не занимает процесс навсегда.
+# Возвращаем (статистика, итоги по разделам, содержимое xlsx или None)
+def compare_uploads(old_name, old_data, new_name, new_data, output_format='xlsx', issues_sheet=False, cache=None,
+                    timeout=DEFAULT_TIMEOUT):
+    signal.signal(signal.SIGALRM, raise_timeout)
+    signal.alarm(max(1, math.ceil(timeout)))
+    try:
+        with tempfile.TemporaryDirectory(prefix='price_compare_') as directory:
+            paths = []
+            for prefix, name, data in (('old', old_name, old_data), ('new', new_name, new_data)):
+                path = os.path.join(directory, f'{prefix}_{os.path.basename(name) or prefix}')
+                with open(path, 'wb') as f:
+                    f.write(data)
+                paths.append(path)
+            
+            output = io.BytesIO() if output_format == 'xlsx' else None
+            with contextlib.redirect_stdout(io.StringIO()):
+                comparison = compare(paths[0], paths[1], output, issues_sheet, cache, parallel_load=False)
+    finally:
+        signal.alarm(0)
+    
+    stats = dict(comparison.stats, **{
+        'Сумма цен предыдущего года (общие позиции)': float(comparison.total_old_common),
+        'Сумма цен следующего года (общие позиции)': float(comparison.total_new_common),
+        'Время сравнения, с': round(sum(record['seconds'] for record in comparison.stages), 3),
+    })
+    return stats, section_records(comparison.section_stats), output.getvalue() if output is not None else None
+
+# Разбираем тело multipart/form-data: поле -> (имя файла, содержимое)
+def parse_multipart(content_type, body):
+    message = BytesParser(policy=HTTP).parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode('latin-1') + body)
+    if not message.is_multipart():
+        raise RequestError(400, 'Ожидается multipart/form-data с файлами old и new')
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            fields[name] = (part.get_filename(), part.get_payload(decode=True) or b'')
+    return fields
+
+# Значение флага из формы или строки запроса: 1, true, on, yes
+def flag(value):
+    return str(value).strip().lower() in ('1', 'true', 'on', 'yes')
+
+# Имя файла для заголовка Content-Disposition (RFC 6266): русские буквы - через filename*
+def attachment(filename):
+    fallback = filename.encode('ascii', 'replace').decode('ascii').replace('"', '')
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{urllib.parse.quote(filename)}"
+
+# Пул процессов сравнения и ограничения нагрузки
+class ComparisonService:
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE, timeout=DEFAULT_TIMEOUT,
+                 max_upload_mb=DEFAULT_MAX_UPLOAD_MB, cache=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_upload = max_upload_mb * 1024 * 1024
+        self.cache = cache
+        # Одновременно принимается не больше workers + max_queue запросов: место освобождается,
+        # когда сравнение действительно закончилось (в том числе после таймаута)
+        self.slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.completed = 0
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Запускаем все процессы пула заранее
+        pids = set(self.executor.map(warm_up, range(self.workers)))
+        print(f"Запущено процессов сравнения: {len(pids)}")
+    
+    def release(self, future):
+        with self.lock:
+            self.active -= 1
+            self.completed += 1
+        self.slots.release()
+    
+    # Выполняем сравнение в пуле; запросы сверх лимита получают 503, не уложившиеся во время - 504
+    def run(self, old, new, output_format, issues_sheet):
+        if not self.slots.acquire(blocking=False):
+            raise RequestError(503, 'Сервис занят: очередь сравнений заполнена, повторите запрос позже')
+        with self.lock:
+            self.active += 1
+        try:
+            future = self.executor.submit(compare_uploads, old[0], old[1], new[0], new[1], output_format, issues_sheet,
+                                          self.cache, self.timeout)
+        except Exception:
+            self.release(None)
+            raise
+        future.add_done_callback(self.release)
+        try:
+            # Небольшой запас сверх timeout: внутри процесса сравнение прерывается по SIGALRM
+            return future.result(timeout=self.timeout + 5)
+        except (TimeoutError, FutureTimeoutError):
+            future.cancel()
+            raise RequestError(504, f'Сравнение не уложилось в {self.timeout:g} с')
+        except BrokenProcessPool:
+            self.restart()
+            raise RequestError(500, 'Процесс сравнения завершился аварийно')
+        except Exception as e:
+            # Остальные ошибки сравнения вызваны содержимым загруженных файлов
+            raise RequestError(422, f'Не удалось сравнить прайсы: {e}')
+    
+    # Пул, в котором процесс завершился аварийно (например, по нехватке памяти), больше не принимает
+    # задачи: заменяем его новым
+    def restart(self):
+        with self.lock:
+            executor, self.executor = self.executor, ProcessPoolExecutor(max_workers=self.workers)
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def status(self):
+        with self.lock:
+            return {'workers': self.workers, 'active': self.active, 'completed': self.completed}
+    
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+# Обработчик запросов: GET / - форма загрузки, GET /health - состояние сервиса,
+# POST /compare - сравнение (поля old и new, необязательные format=xlsx|json и issues_sheet)
+class ComparisonHandler(BaseHTTPRequestHandler):
+    service = None
+    protocol_version = 'HTTP/1.1'
+    
+    def send_body(self, status, content_type, body, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_json(self, status, data, headers=()):
+        self.send_body(status, 'application/json; charset=utf-8',
+                       json.dumps(data, ensure_ascii=False, indent=2, default=str).encode('utf-8'), headers)
+    
+    # Ответ с ошибкой. Если тело запроса не прочитано (ошибка в пути или заголовках), оно осталось
+    # в соединении и было бы принято за следующий запрос: такое соединение закрываем
+    def send_error_json(self, status, message, body_read):
+        headers = ()
+        if not body_read:
+            self.close_connection = True
+            headers = [('Connection', 'close')]
+        self.send_json(status, {'error': message}, headers)
+    
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/':
+            self.send_body(200, 'text/html; charset=utf-8', UPLOAD_FORM.encode('utf-8'))
+        elif path == '/health':
+            self.send_json(200, dict(self.service.status(), status='ok'))
+        else:
+            self.send_json(404, {'error': 'Не найдено'})
+    
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        body_read = False
+        try:
+            if url.path != '/compare':
+                raise RequestError(404, 'Не найдено')
+            length = int(self.headers.get('Content-Length') or 0)
+            if length <= 0:
+                raise RequestError(411, 'Нужен заголовок Content-Length')
+            if length > self.service.max_upload:
+                raise RequestError(413, f'Файлы больше {self.service.max_upload // 1024 // 1024} МБ')
+            body = self.rfile.read(length)
+            body_read = True
+            fields = parse_multipart(self.headers.get('Content-Type', ''), body)
+            if not fields.get('old', (None, b''))[1] or not fields.get('new', (None, b''))[1]:
+                raise RequestError(400, 'Нужны два файла: поля old и new')
+            
+            query = dict(urllib.parse.parse_qsl(url.query))
+            output_format = query.get('format') or fields.get('format', (None, b'xlsx'))[1].decode() or 'xlsx'
+            if output_format not in ('xlsx', 'json'):
+                raise RequestError(400, 'format должен быть xlsx или json')
+            issues_sheet = flag(query.get('issues_sheet') or fields.get('issues_sheet', (None, b''))[1].decode())
+            
+            stats, sections, workbook = self.service.run(fields['old'], fields['new'], output_format, issues_sheet)
+        except RequestError as e:
+            self.send_error_json(e.status, str(e), body_read)
+            return
+        except Exception as e:
+            self.send_error_json(500, f'Ошибка при сравнении прайсов: {e}', body_read)
+            return
+        
+        if output_format == 'json':
+            self.send_json(200, {'stats': stats, 'sections': sections})
+        else:
+            new_name = os.path.basename(fields['new'][0] or 'new.xlsx')
+            self.send_body(200, XLSX_CONTENT_TYPE, workbook,
+                           [('Content-Disposition', attachment(f'Сравнение прайсов ({new_name}).xlsx'))])
+    
+    # Журнал запросов - одной строкой в консоль
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+# Запускаем HTTP-сервис и обслуживаем запросы до Ctrl+C или SIGTERM
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_queue=DEFAULT_MAX_QUEUE, timeout=DEFAULT_TIMEOUT,
+          max_upload_mb=DEFAULT_MAX_UPLOAD_MB, cache=None):
+    service = ComparisonService(workers, max_queue, timeout, max_upload_mb, cache)
+    handler = type('Handler', (ComparisonHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    
+    print(f"Сервис сравнения прайсов: http://{host}:{port}/ (процессов: {service.workers}, очередь: {max_queue}, "
+          f"таймаут: {timeout:g} с)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nСервис остановлен")
+    finally:
+        server.server_close()
+        service.shutdown()
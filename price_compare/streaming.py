@@ -0,0 +1,235 @@
+# Потоковое сравнение прайсов, которые не помещаются в память. Из старого прайса строится только
+# индекс "артикул -> цена" (и позиции с артикулами для списка удаленных), новый прайс читается
+# частями, и каждая часть проходит очистку, сопоставление и расчет изменений.
+# Готовые части складываются во временные Parquet-файлы и затем потоком пишутся в Excel:
+# ширину колонок в режиме write_only нужно задать до записи строк, а она зависит от того,
+# есть ли удаленные позиции - это известно только после чтения всего нового прайса
+import os
+import tempfile
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .cleaning import report_unparsed, report_issues
+from .matching import (
+    build_article_index, article_mask, article_positions, unique_articles, collect_services, article_rows, PriceLookup,
+)
+from .changes import CHANGE_CATEGORIES, DEFAULT_CHANGE_THRESHOLD, category_stats
+from .writer import EXCEL_MAX_ROWS, write_result
+from .readers import DEFAULT_CHUNK_ROWS, iter_price_file
+from .cache import encode_frame, decode_frame
+from .instrumentation import StageMonitor
+from .sections import NO_SECTION, SectionTotals, locate_sections, section_rows, iter_changed_rows
+from .export import export_diff, summary_file_name
+from .pipeline import (
+    OLD_YEAR, NEW_YEAR, PRICE_COLUMN_OLD, PRICE_COLUMN_NEW, Comparison, standard_columns, clean_prices, add_price_changes,
+)
+
+# Колонки старого прайса, которые остаются в памяти после его чтения
+INDEX_COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', PRICE_COLUMN_OLD]
+
+# Индекс старого прайса
+@dataclass
+class PriceIndex:
+    positions: pd.DataFrame  # Позиции с артикулами - для списка удаленных
+    prices: PriceLookup  # Артикул -> цена (для повторяющихся артикулов - последняя, как в match)
+    articles: pd.Index  # Уникальные непустые артикулы
+    rows: int = 0
+    priced: int = 0
+    issues: pd.DataFrame = None
+    unparsed: pd.Series = None
+
+# Итоги потоковой обработки нового прайса
+@dataclass
+class StreamTotals:
+    rows: int = 0
+    priced: int = 0
+    result_rows: int = 0
+    common_positions: int = 0
+    total_old_common: float = 0.0
+    total_new_common: float = 0.0
+    category_counts: pd.Series = field(default_factory=lambda: pd.Series(0, index=CHANGE_CATEGORIES))
+    seen: np.ndarray = None  # Какие артикулы старого прайса встретились в новом
+    new_positions: list = field(default_factory=list)  # Позиции с артикулами, которых нет в старом прайсе
+    issues: list = field(default_factory=list)
+    unparsed: list = field(default_factory=list)
+    spool: list = field(default_factory=list)  # Временные файлы с готовыми частями результата
+    sections: SectionTotals = field(default_factory=SectionTotals)  # Итоги по разделам, накопленные по частям
+    last_section: tuple = (0, NO_SECTION)  # Номер и название раздела, которым закончилась предыдущая часть
+
+# Читаем старый прайс частями и строим его индекс
+def build_price_index(source, chunk_rows=DEFAULT_CHUNK_ROWS, reader='auto'):
+    parts, issues, unparsed = [], [], []
+    rows = priced = 0
+    for chunk in iter_price_file(source, chunk_rows, reader):
+        df, chunk_issues, chunk_unparsed = clean_prices(standard_columns(chunk, PRICE_COLUMN_OLD), PRICE_COLUMN_OLD, OLD_YEAR)
+        rows += len(df)
+        priced += int(df[PRICE_COLUMN_OLD].notna().sum())
+        parts.append(df.loc[df['Артикул'].notna(), INDEX_COLUMNS])
+        issues.append(chunk_issues)
+        unparsed.append(chunk_unparsed)
+    if not parts:
+        raise ValueError(f"Файл не содержит строк: {source}")
+    
+    positions = pd.concat(parts, ignore_index=True)
+    return PriceIndex(positions, PriceLookup.from_frame(positions, PRICE_COLUMN_OLD), unique_articles(positions), rows,
+                      priced, pd.concat(issues, ignore_index=True), pd.concat(unparsed))
+
+# Читаем новый прайс частями: очистка, подстановка старых цен, изменения и накопление итогов.
+# Если задан spool_dir, готовые части результата сохраняются туда для записи в Excel.
+# threshold - порог значительного изменения цены для категорий, %
+def stream_new_prices(index, source, chunk_rows=DEFAULT_CHUNK_ROWS, reader='auto', spool_dir=None,
+                      threshold=DEFAULT_CHANGE_THRESHOLD):
+    totals = StreamTotals(seen=np.zeros(len(index.articles), dtype=bool))
+    for number, chunk in enumerate(iter_price_file(source, chunk_rows, reader)):
+        df, chunk_issues, chunk_unparsed = clean_prices(standard_columns(chunk, PRICE_COLUMN_NEW), PRICE_COLUMN_NEW, NEW_YEAR)
+        totals.rows += len(df)
+        totals.priced += int(df[PRICE_COLUMN_NEW].notna().sum())
+        totals.issues.append(chunk_issues)
+        totals.unparsed.append(chunk_unparsed)
+        
+        # Сопоставляем артикулы части с индексом старого прайса
+        articles = df['Артикул']
+        has_article = article_mask(articles)
+        positions = np.where(has_article, article_positions(articles, index.articles), -1)
+        totals.seen[positions[positions >= 0]] = True
+        fresh = has_article & (positions < 0)
+        if fresh.any():
+            totals.new_positions.append(df.loc[fresh, ['№ услуги', 'Артикул', 'Наименование услуги', PRICE_COLUMN_NEW]])
+        
+        df['Стоимость услуг предыдущий год'] = index.prices.get(articles)
+        df = add_price_changes(df, threshold)
+        totals.category_counts += df['Категория изменения'].value_counts().reindex(CHANGE_CATEGORIES, fill_value=0)
+        
+        # Общие позиции (есть цены в обоих прайсах) для общего изменения цен
+        prices_old, prices_new = df['Стоимость услуг предыдущий год'], df[PRICE_COLUMN_NEW]
+        common = prices_old.notna() & prices_new.notna() & (prices_old > 0) & (prices_new > 0)
+        totals.common_positions += int(common.sum())
+        totals.total_old_common += prices_old[common].sum()
+        totals.total_new_common += prices_new[common].sum()
+        
+        # В результат попадают заголовки разделов и позиции с артикулами (как в diff)
+        result = df[df['Артикул'].isna().to_numpy() | has_article]
+        totals.result_rows += len(result)
+        
+        # Разделы: заголовок раздела может остаться в предыдущей части
+        numbers, sections = locate_sections(result, PRICE_COLUMN_NEW, totals.last_section)
+        if len(sections):
+            totals.last_section = (numbers[-1], sections.iloc[-1])
+        totals.sections.add(section_rows(result, numbers, sections, PRICE_COLUMN_NEW))
+        if spool_dir is not None:
+            path = os.path.join(spool_dir, f'{number:06d}.parquet')
+            pq.write_table(encode_frame(result.drop(columns='Категория изменения')), path)
+            totals.spool.append(path)
+    if not totals.issues:
+        raise ValueError(f"Файл не содержит строк: {source}")
+    return totals
+
+# Части результата из временных файлов по одной
+def read_spool(paths):
+    for path in paths:
+        yield decode_frame(pq.read_table(path))
+
+# Итоги сравнения по индексу старого прайса и итогам нового: удаленные и новые позиции,
+# общее изменение цен и статистика в том же виде, что и у calculate_stats
+def summarize(index, totals, threshold=DEFAULT_CHANGE_THRESHOLD):
+    missing_in_new = index.articles[~totals.seen]
+    new_index = build_article_index(pd.concat(totals.new_positions, ignore_index=True)) if totals.new_positions else None
+    
+    comparison = Comparison(index.positions, None, pd.concat([index.issues] + totals.issues, ignore_index=True), cleaned=True,
+                            change_threshold=threshold)
+    article_index_old = build_article_index(index.positions)
+    comparison.removed_services = collect_services(article_index_old, missing_in_new, PRICE_COLUMN_OLD)
+    comparison.removed_positions = article_rows(article_index_old, missing_in_new, PRICE_COLUMN_OLD)
+    comparison.added_articles = new_index.index if new_index is not None else pd.Index([], dtype=object)
+    if new_index is not None:
+        comparison.new_services = collect_services(new_index, new_index.index, PRICE_COLUMN_NEW)
+    comparison.total_old_common = totals.total_old_common
+    comparison.total_new_common = totals.total_new_common
+    comparison.total_change_percent = ((totals.total_new_common - totals.total_old_common) / totals.total_old_common * 100
+                                       if totals.total_old_common > 0 else 0)
+    comparison.common_positions = totals.common_positions
+    comparison.section_stats = totals.sections.statistics()
+    
+    comparison.stats = {
+        'Позиций в старом прайсе': index.rows,
+        'Позиций в новом прайсе': totals.rows,
+        'Удаленных позиций': len(comparison.removed_services),
+        'Новых позиций': len(comparison.new_services),
+        **category_stats(totals.category_counts, threshold),
+        'Общее изменение, %': round(float(comparison.total_change_percent), 1),
+        'Разделов': len(comparison.section_stats),
+    }
+    
+    print("\nПроверка цен в прайсах (после очистки):")
+    report_issues(comparison.issues)
+    print("\nСтатистика по количеству позиций:")
+    print(f"Количество позиций в прайсе предыдущего года: {index.rows}")
+    print(f"Количество позиций в прайсе следующего года: {totals.rows}")
+    print(f"\nКоличество уникальных артикулов:")
+    print(f"Прайс предыдущего года: {len(index.articles)}")
+    print(f"Прайс следующего года: {int(totals.seen.sum()) + (len(new_index) if new_index is not None else 0)}")
+    print(f"\nАнализ изменений по артикулам:")
+    print(f"Услуг, отсутствующих в новом прайсе: {len(missing_in_new)}")
+    print(f"\nНовых услуг в новом прайсе: {len(new_index) if new_index is not None else 0}")
+    print(f"\nКоличество позиций для расчета изменения по общим позициям: {totals.common_positions}")
+    print(f"Количество позиций в старом прайсе с ценами: {index.priced}")
+    print(f"Количество позиций в новом прайсе с ценами: {totals.priced}")
+    return comparison
+
+# Потоковое сравнение двух прайс-файлов: память зависит от размера индекса старого прайса
+# и размера части (chunk_rows), но не от числа строк нового прайса.
+# Возвращает Comparison без df_new и df_result (строки результата в памяти не собираются).
+# export_file - таблица различий (.parquet, .csv или .jsonl), пишется из тех же частей результата.
+# max_rows - лимит строк на листе Excel, change_threshold - порог значительного изменения цены, %,
+# changes_only - минимальное изменение цены, %, для отчета "только изменения" (None - все строки)
+def compare_streaming(source_old, source_new, output_file=None, issues_sheet=False, chunk_rows=DEFAULT_CHUNK_ROWS,
+                      reader='auto', monitor=None, export_file=None, max_rows=EXCEL_MAX_ROWS,
+                      change_threshold=DEFAULT_CHANGE_THRESHOLD, changes_only=None):
+    monitor = monitor or StageMonitor()
+    print(f"\nПотоковое сравнение: прайсы читаются частями по {chunk_rows} строк")
+    
+    with monitor.stage('load') as record:
+        index = build_price_index(source_old, chunk_rows, reader)
+        record['rows_out'] = len(index.prices)
+    report_unparsed(index.unparsed, PRICE_COLUMN_OLD)
+    
+    with tempfile.TemporaryDirectory(prefix='price_compare_') as spool_dir:
+        with monitor.stage('stream') as record:
+            totals = stream_new_prices(index, source_new, chunk_rows, reader,
+                                       spool_dir if output_file or export_file else None, change_threshold)
+            record['rows_in'], record['rows_out'] = totals.rows, totals.result_rows
+        report_unparsed(pd.concat(totals.unparsed), PRICE_COLUMN_NEW)
+        
+        with monitor.stage('stats', totals.rows) as record:
+            comparison = summarize(index, totals, change_threshold)
+            record['rows_out'] = comparison.common_positions
+        
+        if output_file is not None:
+            with monitor.stage('render', totals.result_rows) as record:
+                # В отчете "только изменения" строки отбираются по частям; заголовки разделов, изменения
+                # под которыми начинаются в следующей части, переносятся в нее
+                chunks = read_spool(totals.spool)
+                if changes_only is not None:
+                    chunks = iter_changed_rows(chunks, PRICE_COLUMN_NEW, changes_only)
+                report_rows = []
+                write_result(output_file, (report_rows.append(len(chunk)) or chunk for chunk in chunks), PRICE_COLUMN_NEW,
+                             comparison.removed_services, comparison.new_services, comparison.total_change_percent,
+                             comparison.total_old_common, comparison.total_new_common,
+                             comparison.issues if issues_sheet else None, section_stats=comparison.section_stats,
+                             max_rows=max_rows, change_threshold=change_threshold)
+                record['rows_out'] = sum(report_rows) + len(comparison.removed_services) + len(comparison.new_services)
+            if changes_only is not None:
+                print(f"\nОтчет только по изменениям (больше {changes_only:g}%): {sum(report_rows)} строк "
+                      f"из {totals.result_rows}")
+        
+        if export_file is not None:
+            with monitor.stage('export', totals.result_rows) as record:
+                summary = export_diff(comparison, read_spool(totals.spool), PRICE_COLUMN_NEW, export_file)
+                record['rows_out'] = summary['rows']
+            print(f"\nТаблица различий ({summary['rows']} строк) выгружена в файл '{export_file}', "
+                  f"итоги - в '{summary_file_name(export_file)}'")
+    comparison.stages = monitor.stages
+    return comparison
@@ -0,0 +1,243 @@
+# Режим наблюдения за папками: процесс не завершается после сравнения, а ждет новые прайсы
+# в input/old и input/new и пересчитывает результат в уже запущенном процессе (без повторного
+# импорта pandas и openpyxl). Изменения отслеживаются через inotify (Linux), иначе - опросом папок.
+# Сравнение запускается, когда файлы перестали меняться (пачка изменений обрабатывается один раз),
+# а о работе процесса говорит файл состояния с отметкой времени (heartbeat)
+import os
+import json
+import time
+import uuid
+import errno
+import select
+import signal
+import ctypes
+import threading
+import ctypes.util
+import datetime
+import traceback
+import contextlib
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_HEARTBEAT = 10.0
+DEFAULT_STATUS_FILE = os.path.join('result', 'watch_status.json')
+
+# Файлы, которые еще пишутся или не являются прайсами: блокировки Excel и LibreOffice,
+# временные файлы копирования и загрузки браузеров
+TEMPORARY_PREFIXES = ('~$', '.~lock.', '.')
+TEMPORARY_SUFFIXES = ('.tmp', '.part', '.crdownload', '.download', '#')
+
+# События inotify: файл закрыт после записи, создан, перемещен, удален или изменен
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+def is_temporary(name):
+    return name.startswith(TEMPORARY_PREFIXES) or name.endswith(TEMPORARY_SUFFIXES)
+
+# Исправляем имена файлов, скопированных из Windows с суффиксом ":Zone.Identifier"
+# (то же делает entrypoint.sh перед однократным запуском)
+def clean_zone_identifiers(directory):
+    for name in os.listdir(directory):
+        if ':Zone.Identifier' in name:
+            new_name = name.replace(':Zone.Identifier', '')
+            print(f"Переименование: {os.path.join(directory, name)} -> {os.path.join(directory, new_name)}")
+            os.replace(os.path.join(directory, name), os.path.join(directory, new_name))
+
+# Снимок папок: путь -> (размер, время изменения) для всех файлов, кроме временных.
+# Совпадение снимков до и после паузы означает, что запись файлов закончилась
+def snapshot(directories):
+    files = {}
+    for directory in directories:
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if is_temporary(entry.name) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+# Наблюдение через inotify (ядро Linux) без внешних пакетов: вызовы libc через ctypes
+class InotifyWatcher:
+    kind = 'inotify'
+    
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+                error = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(error, f'inotify_add_watch: {directory}')
+    
+    # Ждем события не дольше timeout секунд; True - в папках что-то изменилось
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # Сами события не разбираются: после паузы папки все равно сравниваются по снимкам
+        while True:
+            try:
+                if not os.read(self.fd, 65536):
+                    break
+            except BlockingIOError:
+                break
+        return True
+    
+    def close(self):
+        os.close(self.fd)
+
+# Наблюдение опросом: снимок папок сравнивается с предыдущим каждые interval секунд.
+# Работает везде, в том числе на сетевых и подключенных в Docker Desktop папках, где inotify молчит
+class PollingWatcher:
+    kind = 'polling'
+    
+    def __init__(self, directories, interval=DEFAULT_POLL_INTERVAL):
+        self.directories = directories
+        self.interval = interval
+        self.state = snapshot(directories)
+    
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+            state = snapshot(self.directories)
+            if state != self.state:
+                self.state = state
+                return True
+            if time.monotonic() >= deadline:
+                return False
+    
+    def close(self):
+        pass
+
+# inotify, если он доступен, иначе опрос папок
+def create_watcher(directories, poll_interval=DEFAULT_POLL_INTERVAL, polling=False):
+    if not polling:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            reason = errno.errorcode.get(e.errno, e) if isinstance(e, OSError) and e.errno else e
+            print(f"inotify недоступен ({reason}), папки будут опрашиваться каждые {poll_interval} с")
+    return PollingWatcher(directories, poll_interval)
+
+# Файл состояния процесса наблюдения: по времени heartbeat видно, что процесс жив,
+# по state - ждет он изменений или сравнивает прайсы, по last_run - чем закончился последний запуск
+class WatchStatus:
+    def __init__(self, path, watcher_kind):
+        self.path = path
+        self.status = {
+            'pid': os.getpid(),
+            'started': now(),
+            'heartbeat': None,
+            'state': 'starting',
+            'watcher': watcher_kind,
+            'runs': 0,
+            'last_run': None,
+        }
+    
+    def update(self, **values):
+        self.status.update(values, heartbeat=now())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f'{self.path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.status, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+def now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+# Пока выполняется блок with, отметка времени в файле состояния обновляется каждые interval секунд
+# из отдельного потока: долгое сравнение не выглядит как зависший процесс
+@contextlib.contextmanager
+def heartbeat_thread(status, interval):
+    stop = threading.Event()
+    
+    def beat():
+        while not stop.wait(interval):
+            status.update()
+    
+    thread = threading.Thread(target=beat, name='watch-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+# docker stop присылает SIGTERM: завершаемся так же, как по Ctrl+C
+def stop_on_sigterm():
+    def handler(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, handler)
+
+# Наблюдаем за папками и вызываем run_cycle() при запуске и после каждой законченной пачки изменений.
+# Изменения считаются законченными, когда debounce секунд нет новых событий и снимок папок не меняется.
+# run_cycle возвращает словарь с итогами запуска (попадает в файл состояния); ошибка в нем
+# не останавливает наблюдение
+def watch(directories, run_cycle, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL,
+          heartbeat=DEFAULT_HEARTBEAT, status_file=DEFAULT_STATUS_FILE, polling=False):
+    stop_on_sigterm()
+    watcher = create_watcher(directories, poll_interval, polling)
+    status = WatchStatus(status_file, watcher.kind)
+    print(f"Наблюдение за папками {', '.join(directories)} ({watcher.kind}); состояние - в файле '{status_file}'")
+    
+    # Снимок папок берется после исправления имен, чтобы переименование не считалось новым изменением
+    def run():
+        for directory in directories:
+            clean_zone_identifiers(directory)
+        state = snapshot(directories)
+        status.update(state='running')
+        started = time.perf_counter()
+        try:
+            with heartbeat_thread(status, heartbeat):
+                summary = run_cycle() or {}
+        except Exception as e:
+            traceback.print_exc()
+            summary = {'error': str(e)}
+        last_run = dict(summary, finished=now(), seconds=round(time.perf_counter() - started, 1), files=len(state))
+        status.update(state='idle', runs=status.status['runs'] + 1, last_run=last_run)
+        print(f"\nОжидаем изменений в папках {', '.join(directories)}...")
+        return state
+    
+    try:
+        state = run()
+        while True:
+            if not watcher.wait(heartbeat):
+                status.update()
+                continue
+            
+            # Ждем, пока изменения закончатся: нет событий debounce секунд и размеры файлов не меняются
+            status.update(state='settling')
+            while True:
+                while watcher.wait(debounce):
+                    status.update()
+                current = snapshot(directories)
+                time.sleep(debounce)
+                if snapshot(directories) == current:
+                    break
+            
+            if current != state:
+                state = run()
+            else:
+                status.update(state='idle')
+    except KeyboardInterrupt:
+        print("\nНаблюдение остановлено")
+    finally:
+        watcher.close()
+        status.update(state='stopped')
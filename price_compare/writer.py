@@ -0,0 +1,510 @@
+# Запись результата сравнения в Excel
+import itertools
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Alignment, Font, Border, Side, NamedStyle
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+
+from .changes import DEFAULT_CHANGE_THRESHOLD, classify_changes
+from .readers import SHEET_COLUMN
+
+# Определяем цвета для форматирования
+olive_fill = PatternFill(start_color='E6F2D5', end_color='E6F2D5', fill_type='solid')  # Светлый оливковый
+light_blue_fill = PatternFill(start_color='DEEAF6', end_color='DEEAF6', fill_type='solid')  # Светлый синий
+yellow_fill = PatternFill(start_color='FFFF99', end_color='FFFF99', fill_type='solid')  # Более мягкий желтый
+light_gray_fill = PatternFill(start_color='F5F5F5', end_color='F5F5F5', fill_type='solid')  # Светло-серый
+black_fill = PatternFill(start_color='000000', end_color='000000', fill_type='solid')  # Черный
+white_fill = PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid')  # Белый
+
+# Определяем стиль границ
+thin_border = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
+# Границы для остальных ячеек объединенной строки (как их выставляет openpyxl при merge_cells)
+merged_middle_border = Border(top=Side(style='thin'), bottom=Side(style='thin'))
+merged_last_border = Border(right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+
+bold_font = Font(bold=True)
+center_alignment = Alignment(horizontal='center', vertical='center', shrink_to_fit=False, indent=0)
+header_alignment = Alignment(wrap_text=True, horizontal='center', vertical='center', shrink_to_fit=False, indent=0)
+name_alignment = Alignment(wrap_text=True, vertical='center', horizontal='left', shrink_to_fit=False, indent=0)
+
+# Стандартная ширина колонки openpyxl (13) плюс место для отступов
+DEFAULT_COLUMN_WIDTH = 15
+
+# Предельное число строк листа Excel: таблица, которая не помещается на лист (или в заданный
+# лимит строк), продолжается на следующих листах
+EXCEL_MAX_ROWS = 1048576
+# Наименьший лимит строк на листе: на нем должны помещаться шапка таблицы и каждый блок итогов
+MIN_SHEET_ROWS = 10
+
+# Лист с легендой, списками удаленных и новых позиций и итогами, если они не помещаются под таблицей
+SUMMARY_SHEET = 'Итоги'
+
+# Регистрируем в книге именованные стили таблицы: ячейки ссылаются на них,
+# вместо того чтобы каждая получала собственные объекты шрифта, границ и выравнивания
+def register_named_styles(wb):
+    for named_style in [
+        NamedStyle(name='Заголовок колонки', font=Font(bold=True), border=thin_border, alignment=header_alignment),
+        NamedStyle(name='Ячейка', border=thin_border, alignment=center_alignment),
+        NamedStyle(name='Цена', border=thin_border, alignment=center_alignment, number_format='0.00'),
+        NamedStyle(name='Наименование', border=thin_border, alignment=name_alignment),
+        NamedStyle(name='Раздел', font=Font(bold=True, color='FFFFFF'), fill=black_fill, border=thin_border,
+                   alignment=center_alignment),
+    ]:
+        wb.add_named_style(named_style)
+
+# Цветовая индикация изменения цены условным форматированием: несколько правил
+# на диапазоны колонок с процентами вместо заливки каждой ячейки
+# (percent_text_col - колонка текста процента, если она есть; threshold - порог значительного изменения, %)
+def add_change_highlighting(ws, percent_col, percent_text_col, first_row, last_row, threshold=DEFAULT_CHANGE_THRESHOLD):
+    if last_row < first_row:
+        return
+    ranges = ' '.join(
+        f"{get_column_letter(col)}{first_row}:{get_column_letter(col)}{last_row}"
+        for col in (percent_col, percent_text_col) if col is not None
+    )
+    # Условие строится по числовой колонке процентов той же строки
+    change = f"${get_column_letter(percent_col)}{first_row}"
+    rules = [
+        (f'AND(ISNUMBER({change}),{change}>{threshold:g})', olive_fill),  # Значительное повышение
+        (f'AND(ISNUMBER({change}),{change}<-{threshold:g})', light_blue_fill),  # Значительное снижение
+        (f'AND(ISNUMBER({change}),{change}<>0)', yellow_fill),  # Небольшое изменение
+    ]
+    for formula, fill in rules:
+        ws.conditional_formatting.add(ranges, FormulaRule(formula=[formula], fill=fill, stopIfTrue=True))
+
+# Цвета категорий изменения цены (CHANGE_CATEGORIES)
+CATEGORY_FILLS = {'up': olive_fill, 'down': light_blue_fill, 'small': yellow_fill}
+
+# Приводим значение из DataFrame к тому виду, в котором его вернул бы Excel:
+# пропуски (в том числе pd.NA строковых колонок) и пустые строки - пустая ячейка, целые float - int
+def excel_value(value):
+    if value is None or value is pd.NA or (isinstance(value, str) and value == ''):
+        return None
+    if isinstance(value, float):
+        if np.isnan(value):
+            return None
+        if value.is_integer():
+            return int(value)
+    return value
+
+# Запись листа в режиме write_only: строки пишутся последовательно (номер следующей строки
+# отслеживается), наборы стилей вычисляются один раз и переиспользуются
+class SheetWriter:
+    def __init__(self, ws):
+        self.ws = ws
+        self.next_row = 1
+        # Кэш наборов стилей: одна и та же комбинация оформления вычисляется один раз
+        self.styles = {}
+    
+    def style(self, named=None, font=None, fill=None, border=None, alignment=None, number_format=None):
+        key = (named, font, fill, border, alignment, number_format)
+        if key not in self.styles:
+            prototype = WriteOnlyCell(self.ws)
+            if named is not None:
+                prototype.style = named
+            if font is not None:
+                prototype.font = font
+            if fill is not None:
+                prototype.fill = fill
+            if border is not None:
+                prototype.border = border
+            if alignment is not None:
+                prototype.alignment = alignment
+            if number_format is not None:
+                prototype.number_format = number_format
+            self.styles[key] = prototype._style
+        return self.styles[key]
+    
+    def cell(self, value, cell_style=None):
+        result = WriteOnlyCell(self.ws, value)
+        if cell_style is not None:
+            result._style = cell_style
+        return result
+    
+    def append(self, cells):
+        self.ws.append(cells)
+        self.next_row += 1
+    
+    def skip_to(self, row):
+        while self.next_row < row:
+            self.append([])
+    
+    # Продолжаем запись на другом листе книги (наборы стилей общие для всей книги)
+    def switch_to(self, ws):
+        self.ws = ws
+        self.next_row = 1
+    
+    # Объединенная строка: первая ячейка со значением, остальные - только с границами
+    def merged_row(self, first_cell, end_column, extra_cells=()):
+        # Диапазоны добавляются напрямую: строки не пересекаются, а проверка MultiCellRange.add
+        # перебирает все уже объединенные диапазоны (квадратичное время на больших прайсах)
+        self.ws.merged_cells.ranges.add(CellRange(min_col=1, min_row=self.next_row, max_col=end_column,
+                                                  max_row=self.next_row))
+        middle = self.cell(None, self.style(border=merged_middle_border))
+        last = self.cell(None, self.style(border=merged_last_border))
+        self.append([first_cell] + [middle] * (end_column - 2) + [last] + list(extra_cells))
+
+# Заголовок раздела: у строки без цены заполнена только одна ячейка (не считая названия листа
+# в колонке sheet_col у прайса на нескольких листах). Возвращаем ее текст или None
+def section_title(values, sheet_col=None):
+    non_empty = [value for col, value in enumerate(values, 1) if col != sheet_col and value and str(value).strip()]
+    return str(non_empty[0]).strip() if len(non_empty) == 1 else None
+
+# Легенда цветового обозначения изменений: подпись, пустая строка и три цвета
+LEGEND_ROWS = 5
+
+def append_legend(sheet, threshold=DEFAULT_CHANGE_THRESHOLD):
+    sheet.append([sheet.cell("Легенда цветового обозначения:",
+                             sheet.style(font=bold_font, border=thin_border, fill=white_fill))])
+    sheet.skip_to(sheet.next_row + 1)
+    legend_items = [
+        (CATEGORY_FILLS['up'], f"Повышение цены более чем на {threshold:g}%"),
+        (CATEGORY_FILLS['down'], f"Снижение цены более чем на {threshold:g}%"),
+        (CATEGORY_FILLS['small'], f"Изменение цены в пределах ±{threshold:g}%")
+    ]
+    description_style = sheet.style(border=thin_border, fill=white_fill, alignment=Alignment(vertical='center'))
+    for fill, description in legend_items:
+        sheet.append([sheet.cell(None, sheet.style(fill=fill, border=thin_border)), sheet.cell(description, description_style)])
+
+# Строка общего изменения цен: подпись (объединенная на две колонки) и процент в цвете категории
+def append_total_change(sheet, title, total_change_percent, threshold=DEFAULT_CHANGE_THRESHOLD):
+    change_fill = CATEGORY_FILLS.get(classify_changes([total_change_percent], threshold)[0], white_fill)
+    change_value = sheet.cell(
+        f"{'+' if total_change_percent > 0 else ''}{total_change_percent:.1f}%",
+        sheet.style(border=thin_border, fill=change_fill, alignment=Alignment(horizontal='left', vertical='center'))
+    )
+    sheet.merged_row(sheet.cell(title, sheet.style(font=bold_font, border=thin_border, fill=white_fill)), 2, [change_value])
+
+# Числовой формат процента изменения ("+4.0%", "-3.5%") в таблице нескольких версий и на листе
+# сопоставленных позиций: значение остается числом, по нему работает условное форматирование
+PERCENT_FORMAT = '+0.0"%";-0.0"%";0.0"%"'
+
+# Отдельный лист с проблемами в данных
+def add_issues_sheet(wb, issues):
+    sheet = SheetWriter(wb.create_sheet('Проблемы'))
+    for col, width in enumerate([25, 20, 65, 25], 1):
+        sheet.ws.column_dimensions[get_column_letter(col)].width = width
+    header_style = sheet.style('Заголовок колонки')
+    sheet.append([sheet.cell(column, header_style) for column in issues.columns])
+    name_col = list(issues.columns).index('Наименование услуги')
+    body_style, name_style = sheet.style('Ячейка'), sheet.style('Наименование')
+    for values in issues.itertuples(index=False, name=None):
+        sheet.append([sheet.cell(value, name_style if col == name_col else body_style) for col, value in enumerate(values)])
+
+# Отдельный лист с таблицей из DataFrame: колонки наименований шире остальных, цены - в формате цен,
+# проценты изменения - числами в формате PERCENT_FORMAT, первая колонка процентов - с цветовой индикацией
+def add_table_sheet(wb, title, table, name_columns=(), price_columns=(), percent_columns=(), name_width=50,
+                    threshold=DEFAULT_CHANGE_THRESHOLD):
+    sheet = SheetWriter(wb.create_sheet(title))
+    columns = list(table.columns)
+    for col, column in enumerate(columns, 1):
+        sheet.ws.column_dimensions[get_column_letter(col)].width = name_width if column in name_columns else DEFAULT_COLUMN_WIDTH
+    
+    sheet.append([sheet.cell(column, sheet.style('Заголовок колонки')) for column in columns])
+    column_styles = [
+        sheet.style('Наименование') if column in name_columns else
+        sheet.style('Цена') if column in price_columns else
+        sheet.style('Ячейка', number_format=PERCENT_FORMAT) if column in percent_columns else
+        sheet.style('Ячейка')
+        for column in columns
+    ]
+    for values in table.itertuples(index=False, name=None):
+        sheet.append([sheet.cell(excel_value(value), cell_style) for value, cell_style in zip(values, column_styles)])
+    if percent_columns:
+        add_change_highlighting(sheet.ws, columns.index(percent_columns[0]) + 1, None, 2, sheet.next_row - 1, threshold)
+
+# Отдельный лист с позициями, сопоставленными нечетко (по нормализованному артикулу или похожести
+# наименований): артикулы и наименования из обоих прайсов, цены, изменение и уверенность
+def add_fuzzy_sheet(wb, fuzzy_matches, threshold=DEFAULT_CHANGE_THRESHOLD):
+    add_table_sheet(wb, 'Сопоставленные позиции', fuzzy_matches,
+                    name_columns=['Наименование в старом прайсе', 'Наименование в новом прайсе'],
+                    price_columns=['Цена предыдущего года', 'Цена нового прайса'], percent_columns=['Изменение цены %'],
+                    threshold=threshold)
+
+# Отдельный лист с итогами по разделам прайса (sections.section_statistics)
+def add_sections_sheet(wb, section_stats, threshold=DEFAULT_CHANGE_THRESHOLD):
+    add_table_sheet(wb, 'Итоги по разделам', section_stats, name_columns=['Раздел'],
+                    price_columns=['Сумма цен предыдущего года', 'Сумма цен следующего года'],
+                    percent_columns=['Изменение (взвешенное), %', 'Медианное изменение, %',
+                                     'Наибольшее повышение, %', 'Наибольшее снижение, %'], threshold=threshold)
+
+# Формируем книгу с результатом сравнения за один проход в режиме write_only:
+# строки пишутся потоком, наборы стилей вычисляются один раз и переиспользуются.
+# df_result - DataFrame или последовательность его частей (потоковый режим): части
+# записываются по очереди, и в памяти одновременно находится только одна.
+# Таблица длиннее max_rows строк продолжается на листах Sheet2, Sheet3 и т.д. (с шапкой на каждом),
+# легенда, списки позиций и итоги тогда пишутся на отдельный лист SUMMARY_SHEET.
+# change_threshold - порог значительного изменения цены для цветов и легенды, %
+def build_result(df_result, price_column_new, removed_services, new_services,
+                 total_change_percent, total_old_common, total_new_common, issues=None, fuzzy_matches=None,
+                 section_stats=None, max_rows=EXCEL_MAX_ROWS, change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    register_named_styles(wb)
+    sheet = SheetWriter(ws)
+    style, cell, append, skip_to, merged_row = sheet.style, sheet.cell, sheet.append, sheet.skip_to, sheet.merged_row
+    
+    # Находим индексы нужных колонок (категория изменения в таблицу не выводится)
+    chunks = iter([df_result] if isinstance(df_result, pd.DataFrame) else df_result)
+    first_chunk = next(chunks)
+    columns = [column for column in first_chunk.columns if column != 'Категория изменения']
+    max_col = len(columns)
+    price_col_new = columns.index(price_column_new) + 1
+    price_col_old = columns.index('Стоимость услуг предыдущий год') + 1
+    percent_col = columns.index('Изменение цены %') + 1
+    percent_text_col = columns.index('Изменение цены % (текст)') + 1
+    service_name_col = columns.index('Наименование услуги') + 1
+    sheet_col = columns.index(SHEET_COLUMN) + 1 if SHEET_COLUMN in columns else None
+    
+    # В режиме write_only ширину колонок нужно задать до записи строк,
+    # поэтому сразу учитываем и легенду, и список удаленных позиций
+    summary_widths = {1: 15, 2: 40}
+    if removed_services:
+        summary_widths.update({1: 15, 2: 15, 3: 65, 4: 15})
+    widths = {col: DEFAULT_COLUMN_WIDTH for col in range(1, max_col + 1)}
+    widths[service_name_col] = 65
+    widths.update(summary_widths)
+    
+    def set_widths(ws, widths):
+        for col, width in widths.items():
+            ws.column_dimensions[get_column_letter(col)].width = width
+    
+    # Форматируем заголовки колонок (первая строка) и добавляем отступы
+    header_style = style('Заголовок колонки')
+    def append_header():
+        append([cell(f" {column} ", header_style) for column in columns])
+    
+    set_widths(ws, widths)
+    append_header()
+    table_sheets = [ws]
+    
+    # Продолжение таблицы на следующем листе: цвета изменения цены задаются правилами на таблицу каждого листа
+    def continue_table():
+        add_change_highlighting(sheet.ws, percent_col, percent_text_col, 2, sheet.next_row - 1, change_threshold)
+        ws = wb.create_sheet(f'Sheet{len(table_sheets) + 1}')
+        set_widths(ws, widths)
+        sheet.switch_to(ws)
+        append_header()
+        table_sheets.append(ws)
+    
+    section_style = style('Раздел')
+    
+    rows = itertools.chain.from_iterable(
+        chunk[columns].itertuples(index=False, name=None) for chunk in itertools.chain([first_chunk], chunks)
+    )
+    for values in rows:
+        values = [excel_value(value) for value in values]
+        if sheet.next_row > max_rows:
+            continue_table()
+        
+        # Если цена отсутствует и информация только в одной ячейке - это заголовок раздела
+        no_price = values[price_col_new - 1] is None
+        if no_price:
+            title = section_title(values, sheet_col)
+            if title is not None:
+                merged_row(cell(f" {title} ", section_style), max_col)
+                continue
+        # Для остальных строк без цен - только полужирный шрифт
+        font = bold_font if no_price else None
+        
+        row_cells = []
+        for col, value in enumerate(values, 1):
+            if col == service_name_col:
+                cell_style = style('Наименование', font=font)
+                # Добавляем пробелы в начало и конец текста для создания отступов
+                if value and isinstance(value, str):
+                    value = f" {value} "
+            elif col in (price_col_old, price_col_new):
+                cell_style = style('Цена', font=font)
+            else:
+                cell_style = style('Ячейка', font=font)
+                # Добавляем пробелы в начало и конец текста для создания отступов (кроме цен).
+                # Процент остается числом: по нему работает условное форматирование
+                if col != percent_col and value and isinstance(value, (str, int, float)):
+                    value = f" {value} "
+            row_cells.append(cell(value, cell_style))
+        append(row_cells)
+    
+    # Цвета изменения цены задаются правилами на всю таблицу
+    add_change_highlighting(sheet.ws, percent_col, percent_text_col, 2, sheet.next_row - 1, change_threshold)
+    
+    # Лист итогов и его продолжения ('Итоги (2)' и т.д.), если итоги не помещаются на лист
+    summary_sheets = []
+    def start_summary_sheet():
+        ws = wb.create_sheet(SUMMARY_SHEET if not summary_sheets else f'{SUMMARY_SHEET} ({len(summary_sheets) + 1})')
+        set_widths(ws, summary_widths)
+        sheet.switch_to(ws)
+        summary_sheets.append(ws)
+    
+    # Пропускаем gap пустых строк перед блоком из block_rows строк. Блок, который не помещается
+    # на текущий лист, начинается с первой строки нового листа итогов
+    def start_block(gap, block_rows):
+        if sheet.next_row + gap + block_rows - 1 > max_rows:
+            start_summary_sheet()
+        else:
+            skip_to(sheet.next_row + gap)
+    
+    # Добавляем легенду в конец документа (или на лист итогов, если таблица заняла несколько листов)
+    if len(table_sheets) > 1:
+        start_summary_sheet()
+    else:
+        start_block(1, LEGEND_ROWS)
+    append_legend(sheet, change_threshold)
+    gap = 3  # Три пустые строки перед следующим разделом
+    
+    # Таблица удаленных или новых позиций: заголовок раздела, шапка и строки
+    def services_table(title, title_color, headers, header_fill, services):
+        start_block(gap, 4)
+        title_style = style(font=Font(bold=True, size=14, color=title_color), border=thin_border, fill=light_gray_fill)
+        merged_row(cell(title, title_style), 4)
+        
+        skip_to(sheet.next_row + 1)  # Пропускаем строку после заголовка
+        headers_style = style(font=bold_font, border=thin_border, fill=header_fill,
+                              alignment=Alignment(horizontal='center', vertical='center'))
+        append([cell(header_text, headers_style) for header_text in headers])
+        
+        border_style = style(border=thin_border)
+        service_style = style(border=thin_border, alignment=Alignment(horizontal='left', vertical='center'))
+        price_style = style(border=thin_border, number_format='0.00')  # Формат с двумя десятичными знаками
+        for service_num, article, price, service in services:
+            # Список, не поместившийся на лист, продолжается на следующем листе итогов с той же шапкой
+            if sheet.next_row > max_rows:
+                start_summary_sheet()
+                append([cell(header_text, headers_style) for header_text in headers])
+            append([
+                cell(excel_value(service_num), border_style),
+                cell(article, border_style),
+                cell(service, service_style),
+                cell(excel_value(price), price_style),
+            ])
+    
+    # Добавляем список удаленных услуг, если они есть
+    if removed_services:
+        services_table("Список позиций, отсутствующих в прайсе 2025 года:", "FF0000",
+                       ['№ услуги', 'Артикул', 'Наименование услуги', 'Цена предыдущего года'],
+                       yellow_fill, removed_services)
+        gap = 2
+    
+    # Добавляем список новых позиций (которые есть в новом прайсе, но отсутствуют в старом)
+    if new_services:
+        services_table("СПИСОК НОВЫХ ПОЗИЦИЙ, ПОЯВИВШИХСЯ В НОВОМ ПРАЙСЕ:", "008000",
+                       ['№ услуги', 'Артикул', 'Наименование услуги', 'Цена нового прайса'],
+                       olive_fill, new_services)
+        gap = 2
+    
+    # Добавляем информацию об общем изменении цен в конец документа (после пустых строк)
+    start_block(gap, 3)
+    
+    # Применяем цветовое форматирование к значению изменения
+    append_total_change(sheet, "Общее изменение цен (только по общим позициям):", total_change_percent, change_threshold)
+    
+    # Добавляем информацию об общих позициях
+    border_style = style(border=thin_border)
+    append([cell(f"Сумма цен предыдущего года (только общие позиции): {total_old_common:,.2f} руб.", border_style)])
+    append([cell(f"Сумма цен следующего года (только общие позиции): {total_new_common:,.2f} руб.", border_style)])
+    
+    # Отдельный лист с проблемами в данных (по запросу)
+    if issues is not None and not issues.empty:
+        add_issues_sheet(wb, issues)
+    
+    # Лист нечетко сопоставленных позиций (если сопоставление выполнялось)
+    if fuzzy_matches is not None:
+        add_fuzzy_sheet(wb, fuzzy_matches, change_threshold)
+    
+    # Итоги по разделам прайса
+    if section_stats is not None and not section_stats.empty:
+        add_sections_sheet(wb, section_stats, change_threshold)
+    
+    return wb
+
+# Сохраняем результат сравнения в Excel (max_rows - лимит строк на листе, change_threshold - порог
+# значительного изменения цены, %)
+def write_result(output_file, df_result, price_column_new, removed_services, new_services,
+                 total_change_percent, total_old_common, total_new_common, issues=None, fuzzy_matches=None,
+                 section_stats=None, max_rows=EXCEL_MAX_ROWS, change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    build_result(df_result, price_column_new, removed_services, new_services, total_change_percent, total_old_common,
+                 total_new_common, issues, fuzzy_matches, section_stats, max_rows, change_threshold).save(output_file)
+
+# Формируем книгу со сравнением нескольких версий прайса: цены всех версий, колонки изменений
+# с цветовой индикацией, легенда и общее изменение цен по каждой паре версий (totals)
+def build_multiway_result(df_result, price_columns, change_columns, totals, issues=None,
+                          change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    register_named_styles(wb)
+    sheet = SheetWriter(ws)
+    
+    columns = list(df_result.columns)
+    max_col = len(columns)
+    service_name_col = columns.index('Наименование услуги') + 1
+    price_cols = {columns.index(column) + 1 for column in price_columns}
+    change_cols = [columns.index(column) + 1 for column in change_columns]
+    latest_price_col = columns.index(price_columns[-1]) + 1
+    sheet_col = columns.index(SHEET_COLUMN) + 1 if SHEET_COLUMN in columns else None
+    
+    widths = {col: DEFAULT_COLUMN_WIDTH for col in range(1, max_col + 1)}
+    widths[service_name_col] = 65
+    for col, width in widths.items():
+        ws.column_dimensions[get_column_letter(col)].width = width
+    
+    sheet.append([sheet.cell(f" {column} ", sheet.style('Заголовок колонки')) for column in columns])
+    section_style = sheet.style('Раздел')
+    for values in df_result.itertuples(index=False, name=None):
+        values = [excel_value(value) for value in values]
+        
+        # Заголовок раздела - как при сравнении двух прайсов, по цене последней версии
+        no_price = values[latest_price_col - 1] is None
+        if no_price:
+            title = section_title(values, sheet_col)
+            if title is not None:
+                sheet.merged_row(sheet.cell(f" {title} ", section_style), max_col)
+                continue
+        font = bold_font if no_price else None
+        
+        row_cells = []
+        for col, value in enumerate(values, 1):
+            if col == service_name_col:
+                cell_style = sheet.style('Наименование', font=font)
+                if value and isinstance(value, str):
+                    value = f" {value} "
+            elif col in price_cols:
+                cell_style = sheet.style('Цена', font=font)
+            elif col in change_cols:
+                cell_style = sheet.style('Ячейка', font=font, number_format=PERCENT_FORMAT)
+            else:
+                cell_style = sheet.style('Ячейка', font=font)
+                if value and isinstance(value, (str, int, float)):
+                    value = f" {value} "
+            row_cells.append(sheet.cell(value, cell_style))
+        sheet.append(row_cells)
+    
+    for col in change_cols:
+        add_change_highlighting(ws, col, None, 2, sheet.next_row - 1, change_threshold)
+    sheet.skip_to(sheet.next_row + 1)
+    append_legend(sheet, change_threshold)
+    
+    # Общее изменение цен по каждой паре версий
+    sheet.skip_to(sheet.next_row + 3)
+    for total in totals:
+        append_total_change(sheet, f"Общее изменение цен {total['Изменение']} (только по общим позициям):",
+                            total['Общее изменение, %'], change_threshold)
+    
+    if issues is not None and not issues.empty:
+        add_issues_sheet(wb, issues)
+    return wb
+
+# Сохраняем сравнение нескольких версий прайса в Excel
+def write_multiway_result(output_file, df_result, price_columns, change_columns, totals, issues=None,
+                          change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    build_multiway_result(df_result, price_columns, change_columns, totals, issues, change_threshold).save(output_file)
@@ -0,0 +1,48 @@
+# Пакетный режим: пары прайсов подбираются по именам файлов или читаются из манифеста,
+# каждая пара сравнивается отдельно, ошибка одной пары не останавливает остальные
+import io
+import contextlib
+
+import pandas as pd
+
+from price_compare.batch import find_pairs, read_manifest, run_batch
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+def write_price_list(path, price):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame([[1, 'A1', 'Прием', price]], columns=COLUMNS).to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+    return str(path)
+
+def test_find_pairs(tmp_path):
+    old_dir, new_dir = tmp_path / 'old', tmp_path / 'new'
+    old_file = write_price_list(old_dir / 'Прайс 2024.csv', 100)
+    write_price_list(old_dir / 'Другой.csv', 100)
+    new_file = write_price_list(new_dir / 'прайс_2025.csv', 110)
+    write_price_list(new_dir / 'Без пары.csv', 110)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pairs = find_pairs(str(old_dir), str(new_dir))
+    assert [(old, new) for old, new, _ in pairs] == [(old_file, new_file)]
+
+def test_read_manifest(tmp_path):
+    manifest = tmp_path / 'pairs.csv'
+    manifest.write_text('old;new;output\nold/a.csv;new/a.csv;\nold/b.csv;new/b.csv;out/b.xlsx\n;new/c.csv;\n',
+                        encoding='utf-8')
+    pairs = read_manifest(str(manifest))
+    assert pairs == [
+        (str(tmp_path / 'old' / 'a.csv'), str(tmp_path / 'new' / 'a.csv'), 'result/Сравнение прайсов (a.csv).xlsx'),
+        (str(tmp_path / 'old' / 'b.csv'), str(tmp_path / 'new' / 'b.csv'), str(tmp_path / 'out' / 'b.xlsx')),
+    ]
+
+def test_run_batch(tmp_path):
+    pairs = [
+        (write_price_list(tmp_path / 'old' / 'a.csv', 100), write_price_list(tmp_path / 'new' / 'a.csv', 110),
+         str(tmp_path / 'result' / 'a.xlsx')),
+        (str(tmp_path / 'old' / 'missing.csv'), write_price_list(tmp_path / 'new' / 'b.csv', 110),
+         str(tmp_path / 'result' / 'b.xlsx')),
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = run_batch(pairs, workers=1, cache=None, summary_file=str(tmp_path / 'result' / 'summary.xlsx'))
+    assert list(summary['Статус'].str.startswith('OK')) == [True, False]
+    assert (tmp_path / 'result' / 'a.xlsx').exists()
+    assert (tmp_path / 'result' / 'summary.xlsx').exists()
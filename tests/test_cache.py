@@ -0,0 +1,62 @@
+# Кэш разобранных прайсов: запись читается в том же виде, ключ зависит от содержимого файла и настроек
+import io
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from price_compare.cache import PriceListCache
+from price_compare.cleaning import TEXT_DTYPE
+from price_compare.pipeline import compare
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+def price_frame():
+    return pd.DataFrame({
+        '№ услуги': pd.Series([1, '1.1', np.nan, 2.5], dtype=object),
+        'Артикул': pd.Series(['A1', None, '007', 'A2'], dtype=TEXT_DTYPE),
+        'Наименование услуги': pd.Series(['Прием', 'Раздел', 'Анализ', None], dtype=TEXT_DTYPE),
+        'Стоимость услуг предыдущий год': [100.0, np.nan, 0.5, 200.0],
+    })
+
+def test_cache_round_trip(tmp_path):
+    cache = PriceListCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'price.csv'
+    source.write_text('x', encoding='utf-8')
+    key = cache.key(str(source), {'reader': 'csv'})
+    assert cache.get(key) is None
+    
+    df = price_frame()
+    issues = pd.DataFrame({'Прайс': ['2024'], 'Артикул': pd.Series(['A2'], dtype=TEXT_DTYPE),
+                           'Наименование услуги': [np.nan], 'Проблема': ['Нет цены']})
+    cache.put(key, df, issues)
+    cached_df, cached_issues = cache.get(key)
+    pd.testing.assert_frame_equal(cached_df, df)
+    pd.testing.assert_frame_equal(cached_issues, issues)
+
+def test_cache_key(tmp_path):
+    cache = PriceListCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'price.csv'
+    source.write_text('x', encoding='utf-8')
+    key = cache.key(str(source), {'reader': 'csv'})
+    assert cache.key(str(source), {'reader': 'csv'}) == key
+    assert cache.key(str(source), {'reader': 'pyarrow'}) != key
+    source.write_text('y', encoding='utf-8')
+    assert cache.key(str(source), {'reader': 'csv'}) != key
+
+# Повторное сравнение тех же файлов берет оба прайса из кэша и дает тот же результат
+def test_compare_with_cache(tmp_path):
+    paths = []
+    for name, price in (('old.csv', 100), ('new.csv', 110)):
+        path = tmp_path / name
+        pd.DataFrame([[1, 'A1', 'Прием', price], [2, 'A2', 'Массаж', 200]], columns=COLUMNS).to_csv(
+            path, sep=';', index=False, encoding='utf-8-sig')
+        paths.append(str(path))
+    cache = PriceListCache(str(tmp_path / 'cache'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = compare(*paths, cache=cache, parallel_load=False)
+        second = compare(*paths, cache=cache, parallel_load=False)
+    assert first.reused == []
+    assert second.reused == ['old', 'new']
+    assert second.stats == first.stats
+    pd.testing.assert_frame_equal(second.df_result, first.df_result)
@@ -0,0 +1,17 @@
+# Изменение цен: проценты с округлением, текст для таблицы и категории по порогу
+import numpy as np
+
+from price_compare.changes import calculate_price_changes, format_changes, classify_changes
+
+def test_calculate_price_changes():
+    change = calculate_price_changes([100, 100, 0, np.nan, 200, 3], [110, 95.5, 50, 10, np.nan, 4])
+    np.testing.assert_array_equal(change, [10.0, -4.5, np.nan, np.nan, np.nan, 33.3])
+
+def test_format_changes():
+    assert list(format_changes([4.0, -3.5, 0.0, np.nan])) == ['+4.0%', '-3.5%', '0.0%', '']
+    assert list(format_changes([np.nan])) == ['']
+
+def test_classify_changes_threshold():
+    change = [10.0, -6.0, 3.0, 0.0, np.nan]
+    assert list(classify_changes(change).astype(object)) == ['up', 'down', 'small', 'none', np.nan]
+    assert list(classify_changes(change, threshold=1).astype(object)) == ['up', 'down', 'up', 'none', np.nan]
@@ -0,0 +1,40 @@
+# Векторизованная очистка цен (normalize_prices) должна давать те же значения, что и поэлементная clean_price
+import numpy as np
+import pandas as pd
+
+from price_compare.cleaning import clean_price, normalize_prices
+
+# Значения цен, которые встречаются в прайсах: числа, строки с пробелами, запятыми и апострофами,
+# научная нотация, пустые строки, нераспознаваемый текст и то, что понимает только float()
+MIXED_PRICES = [
+    100, 2.675, 1234.5678, -5, 0, np.nan, None, True,
+    '100', ' 200 ', '1 234,56', '1\xa0234,5', "'300", '12,5', '  ', '',
+    '1e3', '1.5E-2', ' 2e2 ', '1,5e3',
+    'бесплатно', 'по запросу', '12 руб', '1.2.3',
+    '1_000', '１２', '٣', '١٢٣,٤',
+]
+
+def expected_prices(values):
+    return np.array([clean_price(value) for value in values], dtype='float64')
+
+def test_normalize_prices_matches_clean_price():
+    values = pd.Series(MIXED_PRICES, dtype=object)
+    result, _ = normalize_prices(values)
+    np.testing.assert_array_equal(result.to_numpy(), expected_prices(MIXED_PRICES))
+
+def test_normalize_prices_numeric_column():
+    values = pd.Series([1.005, 2.675, 0.125, np.nan, 1e6 / 3])
+    result, unparsed = normalize_prices(values)
+    np.testing.assert_array_equal(result.to_numpy(), expected_prices(values))
+    assert unparsed.empty
+
+# Нераспознанными считаются только непустые значения, которые не удалось преобразовать
+def test_normalize_prices_unparsed():
+    values = pd.Series(MIXED_PRICES, dtype=object)
+    _, unparsed = normalize_prices(values)
+    assert list(unparsed) == ['1,5e3', 'бесплатно', 'по запросу', '12 руб', '1.2.3']
+
+# clean_price, как и normalize_prices, ничего не выводит в консоль
+def test_clean_price_is_silent(capsys):
+    assert clean_price('бесплатно') is None
+    assert capsys.readouterr().out == ''
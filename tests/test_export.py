@@ -0,0 +1,52 @@
+# Статусы таблицы различий (added, removed, changed, unchanged) считаются по результату сопоставления,
+# а не по спискам удаленных и новых позиций отчета, в которые не попадают позиции без номера или цены
+import io
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from price_compare.pipeline import compare
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+def price_list(rows):
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+def export_statuses(df_old, df_new, export_file):
+    with contextlib.redirect_stdout(io.StringIO()):
+        compare(df_old, df_new, export_file=str(export_file))
+    rows = pd.read_csv(export_file, dtype={'article': str})
+    return dict(zip(rows['article'], rows['status']))
+
+def test_export_statuses_without_number_or_price(tmp_path):
+    df_old = price_list([
+        [1, 'A1', 'Прием врача', 100],
+        [2, 'A2', 'Массаж', 200],
+        [None, 'R1', 'Удаленная без номера', 300],
+        [4, 'R2', 'Удаленная без цены', None],
+        [5, 'R3', 'Удаленная', 400],
+    ])
+    df_new = price_list([
+        [1, 'A1', 'Прием врача', 100],
+        [2, 'A2', 'Массаж', 250],
+        [None, 'N1', 'Новая без номера', 150],
+        [4, 'N2', 'Новая без цены', None],
+        [5, 'N3', 'Новая', 500],
+    ])
+    statuses = export_statuses(df_old, df_new, tmp_path / 'diff.csv')
+    assert statuses == {
+        'A1': 'unchanged', 'A2': 'changed',
+        'N1': 'added', 'N2': 'added', 'N3': 'added',
+        'R1': 'removed', 'R2': 'removed', 'R3': 'removed',
+    }
+
+def test_export_removed_prices(tmp_path):
+    df_old = price_list([[1, 'A1', 'Прием врача', 100], [None, 'R1', 'Удаленная', 300]])
+    df_new = price_list([[1, 'A1', 'Прием врача', 110]])
+    with contextlib.redirect_stdout(io.StringIO()):
+        compare(df_old, df_new, export_file=str(tmp_path / 'diff.csv'))
+    rows = pd.read_csv(tmp_path / 'diff.csv').set_index('article')
+    assert rows.loc['R1', 'old_price'] == 300
+    assert np.isnan(rows.loc['R1', 'new_price'])
+    assert rows.loc['A1', 'change_percent'] == 10.0
@@ -0,0 +1,48 @@
+# Нечеткое сопоставление перекодированных позиций: по нормализованному артикулу и по похожести наименований
+import io
+import contextlib
+
+import pandas as pd
+
+from price_compare.fuzzy import article_keys
+from price_compare.pipeline import compare
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+def test_article_keys():
+    keys = article_keys(['a-0102', 'A102', '102.0', '102', '1.05', '15'])
+    assert list(keys) == ['A102', 'A102', '102', '102', '105', '15']
+
+def test_compare_fuzzy():
+    df_old = pd.DataFrame([
+        [1, 'A1', 'Прием терапевта', 100],
+        [2, 'B-007', 'Общий анализ крови', 200],
+        [3, 'X1', 'Ультразвуковое исследование брюшной полости', 500],
+        [4, 'Z9', 'Массаж спины', 300],
+    ], columns=COLUMNS)
+    df_new = pd.DataFrame([
+        [1, 'A1', 'Прием терапевта', 110],
+        [2, 'B7', 'Общий анализ крови', 220],
+        [3, 'U-55', 'УЗИ: ультразвуковое исследование брюшной полости', 550],
+        [4, 'Q1', 'Лазерная коррекция зрения', 900],
+    ], columns=COLUMNS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        comparison = compare(df_old, df_new, fuzzy=0.8)
+    matches = comparison.fuzzy_matches
+    assert list(zip(matches['Артикул в старом прайсе'], matches['Артикул в новом прайсе'], matches['Сопоставлено по'])) == [
+        ('B-007', 'B7', 'артикул'), ('X1', 'U-55', 'наименование')]
+    assert (matches['Уверенность'] >= 0.8).all()
+    # Сопоставленные позиции получают старую цену и не считаются удаленными и новыми
+    previous = dict(zip(comparison.df_result['Артикул'], comparison.df_result['Стоимость услуг предыдущий год']))
+    assert previous['B7'] == 200 and previous['U-55'] == 500
+    assert [service[1] for service in comparison.removed_services] == ['Z9']
+    assert [service[1] for service in comparison.new_services] == ['Q1']
+
+# Без fuzzy перекодированные позиции остаются удаленными и новыми
+def test_compare_without_fuzzy():
+    df_old = pd.DataFrame([[1, 'B-007', 'Общий анализ крови', 200]], columns=COLUMNS)
+    df_new = pd.DataFrame([[1, 'B7', 'Общий анализ крови', 220]], columns=COLUMNS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        comparison = compare(df_old, df_new)
+    assert [service[1] for service in comparison.removed_services] == ['B-007']
+    assert [service[1] for service in comparison.new_services] == ['B7']
@@ -0,0 +1,61 @@
+# История цен: версии сохраняются и читаются в том же виде, сравнение версий совпадает
+# со сравнением прайсов, история артикула и самые большие изменения считаются по индексам
+import io
+import contextlib
+
+import pandas as pd
+
+from price_compare.history import PriceHistory, compare_versions
+from price_compare.pipeline import PRICE_COLUMN_NEW, compare, load_price_list, clean_price_list
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+VERSIONS = {
+    '2024': [[None, None, 'Консультации', None], [1, 'A1', 'Прием терапевта', 100], [2, 'A2', 'Массаж', 200],
+             [3, 'A3', 'Анализ', 300]],
+    '2025': [[None, None, 'Консультации', None], [1, 'A1', 'Прием терапевта', 150], [2, 'A2', 'Массаж', 190],
+             [4, 'A4', 'Посев', 400]],
+}
+
+# Прайс версии после загрузки и очистки (как при сравнении файлов)
+def cleaned(name, price_column):
+    with contextlib.redirect_stdout(io.StringIO()):
+        df, _ = clean_price_list(load_price_list(pd.DataFrame(VERSIONS[name], columns=COLUMNS), price_column),
+                                 price_column, name)
+    return df
+
+def filled_history(tmp_path):
+    history = PriceHistory(str(tmp_path / 'history' / 'prices.sqlite'))
+    for name in VERSIONS:
+        assert history.add_version(name, cleaned(name, PRICE_COLUMN_NEW), PRICE_COLUMN_NEW, file_hash=name)
+    return history
+
+def test_add_and_load_version(tmp_path):
+    history = filled_history(tmp_path)
+    # Тот же файл повторно не сохраняется
+    assert not history.add_version('2024', cleaned('2024', PRICE_COLUMN_NEW), PRICE_COLUMN_NEW, file_hash='2024')
+    assert list(history.versions()['Версия']) == ['2024', '2025']
+    df, issues = history.load_version('2025', PRICE_COLUMN_NEW, '2025')
+    pd.testing.assert_frame_equal(df, cleaned('2025', PRICE_COLUMN_NEW), check_dtype=False)
+    assert issues.empty
+
+def test_compare_versions(tmp_path):
+    history = filled_history(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from_history = compare_versions(history, '2024', '2025')
+        from_frames = compare(pd.DataFrame(VERSIONS['2024'], columns=COLUMNS), pd.DataFrame(VERSIONS['2025'], columns=COLUMNS))
+    assert from_history.stats == from_frames.stats
+    assert from_history.removed_services == from_frames.removed_services
+    assert from_history.new_services == from_frames.new_services
+
+def test_article_history_and_top_movers(tmp_path):
+    history = filled_history(tmp_path)
+    article = history.article_history('A1')
+    assert list(article['Цена']) == [100, 150]
+    assert list(article['Изменение цены %'].fillna(0)) == [0, 50.0]
+    
+    movers = history.top_movers('2024', '2025', limit=1)
+    assert list(movers['Артикул']) == ['A1']
+    movers = history.top_movers('2024', '2025', limit=1, direction='down')
+    assert list(movers['Артикул']) == ['A2']
+    assert list(movers['Изменение цены %']) == [-5.0]
@@ -0,0 +1,43 @@
+# Повторный запуск: если входные файлы, настройки и результат не изменились, сравнение пропускается;
+# рядом с результатом сохраняется отчет о запуске с этапами и статистикой
+import io
+import json
+import contextlib
+
+import pandas as pd
+
+from price_compare.pipeline import run_comparison
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+def write_price_list(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+    return str(path)
+
+def run(source_old, source_new, output_file, **settings):
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        stats = run_comparison(source_old, source_new, output_file, parallel_load=False, **settings)
+    return stats, log.getvalue()
+
+def test_rerun_is_skipped(tmp_path):
+    source_old = write_price_list(tmp_path / 'old.csv', [[1, 'A1', 'Прием', 100], [2, 'A2', 'Массаж', 200]])
+    source_new = write_price_list(tmp_path / 'new.csv', [[1, 'A1', 'Прием', 110], [2, 'A2', 'Массаж', 200]])
+    (tmp_path / 'result').mkdir()
+    output_file = str(tmp_path / 'result' / 'result.xlsx')
+    
+    stats, log = run(source_old, source_new, output_file)
+    assert 'сравнение пропущено' not in log
+    report = json.load(open(tmp_path / 'result' / 'result.json', encoding='utf-8'))
+    assert report['stats'] == stats
+    assert [stage['stage'] for stage in report['stages']][:3] == ['load', 'clean', 'match']
+    
+    skipped_stats, log = run(source_old, source_new, output_file)
+    assert 'сравнение пропущено' in log
+    assert skipped_stats == stats
+    
+    # Другие настройки или измененный файл - сравнение заново
+    assert 'сравнение пропущено' not in run(source_old, source_new, output_file, change_threshold=1)[1]
+    write_price_list(tmp_path / 'new.csv', [[1, 'A1', 'Прием', 120], [2, 'A2', 'Массаж', 200]])
+    stats, log = run(source_old, source_new, output_file, change_threshold=1)
+    assert 'изменился только прайс следующего года' in log
+    assert stats['Общее изменение, %'] == 6.7
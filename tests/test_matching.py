@@ -0,0 +1,49 @@
+# Сопоставление по артикулам: индекс цен (PriceLookup), списки удаленных и новых позиций
+import io
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from price_compare.cleaning import TEXT_DTYPE
+from price_compare.matching import PriceLookup, build_article_index, collect_services
+from price_compare.pipeline import compare
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+# Для повторяющихся артикулов берется последняя цена, артикулы из пробелов не индексируются
+def test_price_lookup():
+    df = pd.DataFrame({
+        'Артикул': pd.Series(['A1', 'A2', 'A1', '  ', None], dtype=TEXT_DTYPE),
+        'Цена': [100, 200, 150, 300, 400],
+    })
+    lookup = PriceLookup.from_frame(df, 'Цена')
+    assert len(lookup) == 2
+    prices = lookup.get(pd.Series(['A1', 'A2', 'A3', '  '], dtype=TEXT_DTYPE))
+    np.testing.assert_array_equal(prices, [150, 200, np.nan, np.nan])
+
+def test_price_lookup_empty():
+    lookup = PriceLookup(pd.Index([], dtype=object), [])
+    assert np.isnan(lookup.get(pd.Series(['A1'], dtype=TEXT_DTYPE))).all()
+
+# Позиции без номера, наименования или цены в список не попадают, список отсортирован по номеру
+def test_collect_services():
+    df = pd.DataFrame({
+        '№ услуги': [10, 2, None, 4, '1.5'],
+        'Артикул': pd.Series(['A1', 'A2', 'A3', 'A4', 'A5'], dtype=TEXT_DTYPE),
+        'Наименование услуги': pd.Series(['Прием', 'Массаж', 'Анализ', None, 'Посев'], dtype=TEXT_DTYPE),
+        'Цена': [100.0, 200.0, 300.0, 400.0, 500.0],
+    })
+    services = collect_services(build_article_index(df), ['A1', 'A2', 'A3', 'A4', 'A5', ' '], 'Цена')
+    assert [service[1] for service in services] == ['A5', 'A2', 'A1']
+
+def test_compare_removed_and_new():
+    df_old = pd.DataFrame([[1, 'A1', 'Прием', 100], [2, 'A2', 'Массаж', 200], [3, 'R1', 'Анализ', 50]], columns=COLUMNS)
+    df_new = pd.DataFrame([[1, 'A1', 'Прием', 110], [2, 'A2', 'Массаж', 200], [4, 'N1', 'Посев', 70]], columns=COLUMNS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        comparison = compare(df_old, df_new)
+    assert comparison.removed_services == [(3, 'R1', 50.0, 'Анализ')]
+    assert comparison.new_services == [(4, 'N1', 70.0, 'Посев')]
+    assert comparison.stats['Повышений более 5%'] == 1
+    assert comparison.stats['Цен без изменений'] == 1
+    assert comparison.stats['Общее изменение, %'] == 3.3
@@ -0,0 +1,30 @@
+# Сравнение нескольких версий в одной таблице: изменения соседних версий и накопленное от первой
+import io
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from price_compare.multiway import compare_many
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+def test_compare_many():
+    versions = [
+        pd.DataFrame([[1, 'A1', 'Прием', 100], [2, 'A2', 'Массаж', 200], [3, 'R1', 'Анализ', 50]], columns=COLUMNS),
+        pd.DataFrame([[1, 'A1', 'Прием', 110], [2, 'A2', 'Массаж', 200], [4, 'N1', 'Посев', 70]], columns=COLUMNS),
+        pd.DataFrame([[1, 'A1', 'Прием', 121], [2, 'A2', 'Массаж', 180], [4, 'N1', 'Посев', 70]], columns=COLUMNS),
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        comparison = compare_many(versions, ['a', 'b', 'c'])
+    totals = {total['Изменение']: total for total in comparison.totals}
+    assert list(totals) == ['a → b', 'b → c', 'a → c']
+    assert totals['a → b']['Общее изменение, %'] == 3.3
+    assert totals['b → c']['Общих позиций'] == 3
+    assert totals['a → c']['Сумма цен после'] == 301.0
+    
+    rows = comparison.df_result.set_index('Артикул')
+    assert rows.loc['A1', 'Изменение a → c, %'] == 21.0
+    assert rows.loc['A2', 'Изменение b → c, %'] == -10.0
+    assert np.isnan(rows.loc['N1', 'Изменение a → c, %'])
+    assert comparison.stats['Отсутствуют в прайсе c'] == 1
@@ -0,0 +1,19 @@
+# Пакет импортируется без режимов, которые нужны не при каждом запуске; их имена доступны при обращении
+import sys
+import subprocess
+
+LAZY = ['price_compare.server', 'price_compare.watch', 'price_compare.history', 'price_compare.multiway',
+        'price_compare.streaming', 'price_compare.batch']
+
+def loaded_modules(code):
+    output = subprocess.run([sys.executable, '-c', f'import sys\n{code}\nprint(" ".join(sys.modules))'],
+                            capture_output=True, text=True, check=True).stdout
+    return set(output.split())
+
+def test_import_is_lazy():
+    assert not loaded_modules('import price_compare') & set(LAZY)
+
+def test_lazy_names():
+    modules = loaded_modules('from price_compare import compare, PriceHistory, serve')
+    assert {'price_compare.history', 'price_compare.server'} <= modules
+    assert 'price_compare.watch' not in modules
@@ -0,0 +1,36 @@
+# Чтение книги из нескольких листов: листы склеиваются в один прайс, а в процессе пула
+# (одновременная загрузка файлов, пакетный режим, HTTP-сервис) листы читаются без вложенного пула
+import pandas as pd
+import pytest
+
+from price_compare import readers
+from price_compare.readers import read_workbook, SHEET_COLUMN
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'price.xlsx'
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame([[1, 'A1', 'Прием врача', 100], [2, 'A2', 'Массаж', 200]],
+                     columns=COLUMNS).to_excel(writer, sheet_name='Первый', index=False)
+        pd.DataFrame([[3, 'A3', 'Анализ', 300]], columns=COLUMNS).to_excel(writer, sheet_name='Второй', index=False)
+        # Лист-продолжение без строки заголовка
+        pd.DataFrame([[4, 'A4', 'Посев', 400]]).to_excel(writer, sheet_name='Третий', index=False, header=False)
+    return str(path)
+
+def test_read_workbook_sheets(workbook):
+    df = read_workbook(workbook, 'openpyxl', parallel=False)
+    assert list(df['Артикул']) == ['A1', 'A2', 'A3', 'A4']
+    assert list(df[SHEET_COLUMN]) == ['Первый', 'Первый', 'Второй', 'Третий']
+
+class NoPool:
+    def __init__(self, *args, **kwargs):
+        raise AssertionError('Пул процессов внутри процесса пула')
+
+def test_read_workbook_in_pool_process(workbook, monkeypatch):
+    expected = read_workbook(workbook, 'openpyxl', parallel=False)
+    monkeypatch.setattr(readers.os, 'cpu_count', lambda: 4)
+    monkeypatch.setattr(readers.multiprocessing, 'parent_process', lambda: object())
+    monkeypatch.setattr(readers, 'ProcessPoolExecutor', NoPool)
+    pd.testing.assert_frame_equal(read_workbook(workbook, 'openpyxl'), expected)
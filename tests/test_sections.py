@@ -0,0 +1,79 @@
+# Разделы прайса: итоги по разделам (разделы с одинаковым названием не сливаются, потоковый режим
+# дает те же итоги, что и сравнение в памяти) и отбор строк отчета "только изменения"
+import io
+import contextlib
+import warnings
+
+import pandas as pd
+
+from price_compare.pipeline import compare
+from price_compare.sections import changed_rows
+from price_compare.streaming import compare_streaming
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+OLD_ROWS = [
+    [None, None, 'Анализы', None],
+    [1, 'A1', 'Общий анализ крови', 100],
+    [2, 'A2', 'Биохимия', 200],
+    [3, 'A3', 'Глюкоза', 300],
+    [None, None, 'Консультации', None],
+    [4, 'K1', 'Прием терапевта', 1000],
+    [5, 'K2', 'Прием хирурга', 1200],
+    [None, None, 'Анализы', None],
+    [6, 'B1', 'Посев', 500],
+    [7, 'B2', 'Мазок', 400],
+]
+
+NEW_ROWS = [
+    [None, None, 'Анализы', None],
+    [1, 'A1', 'Общий анализ крови', 110],
+    [2, 'A2', 'Биохимия', 180],
+    [3, 'A3', 'Глюкоза', 330],
+    [None, None, 'Консультации', None],
+    [4, 'K1', 'Прием терапевта', 1000],
+    [5, 'K2', 'Прием хирурга', 1320],
+    [None, None, 'Анализы', None],
+    [6, 'B1', 'Посев', 450],
+    [7, 'B2', 'Мазок', 400],
+]
+
+def write_price_list(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+    return str(path)
+
+def test_sections_with_same_title(tmp_path):
+    source_old = write_price_list(tmp_path / 'old.csv', OLD_ROWS)
+    source_new = write_price_list(tmp_path / 'new.csv', NEW_ROWS)
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        stats = compare(source_old, source_new).section_stats
+    assert list(stats['Раздел']) == ['Анализы', 'Консультации', 'Анализы']
+    assert list(stats['Позиций']) == [3, 2, 2]
+    assert list(stats['Повышений']) == [2, 1, 0]
+    assert list(stats['Снижений']) == [1, 0, 1]
+    assert list(stats['Медианное изменение, %']) == [10.0, 5.0, -5.0]
+
+def test_streaming_sections_match_in_memory(tmp_path):
+    source_old = write_price_list(tmp_path / 'old.csv', OLD_ROWS)
+    source_new = write_price_list(tmp_path / 'new.csv', NEW_ROWS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = compare(source_old, source_new).section_stats
+        for chunk_rows in (1, 2, 3, 4):
+            stats = compare_streaming(source_old, source_new, chunk_rows=chunk_rows).section_stats
+            pd.testing.assert_frame_equal(stats, expected, check_dtype=False)
+
+# Отчет "только изменения": по умолчанию остаются все изменившиеся цены, даже меньше 0.05%
+# (в таблице изменение округлено до 0.0%), а порог сравнивается с неокругленным изменением
+def test_changed_rows_small_changes():
+    df = pd.DataFrame({
+        'Артикул': [None, 'A1', 'A2', 'A3', 'A4', 'A5'],
+        'Наименование услуги': ['Анализы', 'Глюкоза', 'Посев', 'Мазок', 'Новая', 'Прием'],
+        'Стоимость услуг предыдущий год': [None, 100, 100, 100, None, 100],
+        'Стоимость услуг, руб.': [None, 100.04, 100, 101.04, 50, 101],
+        'Изменение цены %': [None, 0.0, 0.0, 1.0, None, 1.0],
+    })
+    keep, _ = changed_rows(df, 'Стоимость услуг, руб.')
+    assert list(keep) == [True, True, False, True, True, True]
+    keep, _ = changed_rows(df, 'Стоимость услуг, руб.', min_change=1)
+    assert list(keep) == [True, False, False, True, True, False]
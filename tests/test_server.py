@@ -0,0 +1,63 @@
+# HTTP-сервис: сравнение загруженных файлов, а ошибки до чтения тела запроса (неизвестный путь,
+# слишком большой файл) не должны оставлять тело в keep-alive соединении, иначе оно будет принято
+# за следующий запрос
+import json
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from price_compare.server import ComparisonHandler, compare_uploads
+
+@pytest.fixture
+def server():
+    service = SimpleNamespace(max_upload=16, status=lambda: {'workers': 1, 'active': 0, 'completed': 0})
+    handler = type('Handler', (ComparisonHandler,), {'service': service, 'log_message': lambda self, *args: None})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def request(connection, method, path, body=None):
+    connection.request(method, path, body)
+    response = connection.getresponse()
+    return response.status, response.getheader('Connection'), json.loads(response.read())
+
+@pytest.mark.parametrize('path, status', [('/compare', 413), ('/unknown', 404)])
+def test_error_before_body_on_one_connection(server, path, status):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    try:
+        assert request(connection, 'POST', path, b'x' * 1000)[:2] == (status, 'close')
+        code, _, data = request(connection, 'GET', '/health')
+    finally:
+        connection.close()
+    assert code == 200
+    assert data['status'] == 'ok'
+
+# Ошибка после чтения тела соединение не закрывает
+def test_error_after_body_keeps_connection(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    try:
+        status, header, _ = request(connection, 'POST', '/compare', b'x' * 10)
+        assert (status, header) == (400, None)
+        assert request(connection, 'GET', '/health')[0] == 200
+    finally:
+        connection.close()
+
+PRICE_OLD = '№ услуги;Артикул;Наименование услуги;Стоимость услуг, руб.\n1;A1;Прием;100\n2;A2;Массаж;200\n'.encode()
+PRICE_NEW = '№ услуги;Артикул;Наименование услуги;Стоимость услуг, руб.\n1;A1;Прием;110\n3;A3;Анализ;50\n'.encode()
+
+def test_compare_uploads():
+    stats, sections, workbook = compare_uploads('old.csv', PRICE_OLD, 'new.csv', PRICE_NEW, 'json')
+    assert workbook is None
+    assert stats['Удаленных позиций'] == 1 and stats['Новых позиций'] == 1
+    assert stats['Сумма цен следующего года (общие позиции)'] == 110.0
+    assert sections[0]['Позиций'] == 2
+    
+    _, _, workbook = compare_uploads('old.csv', PRICE_OLD, 'new.csv', PRICE_NEW, 'xlsx')
+    assert workbook.startswith(b'PK')
@@ -0,0 +1,52 @@
+# Потоковое сравнение (прайс читается частями) дает ту же статистику и те же списки,
+# что и сравнение в памяти, при любом размере части
+import io
+import contextlib
+
+import pandas as pd
+import pytest
+
+from price_compare.pipeline import compare
+from price_compare.streaming import compare_streaming
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+OLD_ROWS = [
+    [None, None, 'Консультации', None],
+    [1, 'A1', 'Прием терапевта', 1000],
+    [2, 'A2', 'Прием хирурга', '1 200,00'],
+    [3, 'A3', 'Прием окулиста', 900],
+    [4, 'R1', 'Удаленная услуга', 500],
+    [None, None, 'Анализы', None],
+    [5, 'B1', 'Глюкоза', 300],
+    [6, 'B2', 'Посев', 'по запросу'],
+    [7, 'B3', 'Мазок', 0],
+]
+
+NEW_ROWS = [
+    [None, None, 'Консультации', None],
+    [1, 'A1', 'Прием терапевта', 1100],
+    [2, 'A2', 'Прием хирурга', 1200],
+    [3, 'A3', 'Прием окулиста', 850],
+    [None, None, 'Анализы', None],
+    [5, 'B1', 'Глюкоза', 303],
+    [6, 'B2', 'Посев', 450],
+    [7, 'B3', 'Мазок', 100],
+    [8, 'N1', 'Новая услуга', 700],
+]
+
+def write_price_list(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+    return str(path)
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 5, 100])
+def test_streaming_matches_in_memory(tmp_path, chunk_rows):
+    source_old = write_price_list(tmp_path / 'old.csv', OLD_ROWS)
+    source_new = write_price_list(tmp_path / 'new.csv', NEW_ROWS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = compare(source_old, source_new, parallel_load=False)
+        streamed = compare_streaming(source_old, source_new, chunk_rows=chunk_rows)
+    assert streamed.stats == expected.stats
+    assert streamed.total_change_percent == pytest.approx(expected.total_change_percent)
+    assert streamed.removed_services == expected.removed_services
+    assert streamed.new_services == expected.new_services
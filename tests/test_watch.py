@@ -0,0 +1,19 @@
+# Режим наблюдения: временные файлы Excel и загрузок не учитываются, опрос папок замечает изменения
+from price_compare.watch import PollingWatcher, is_temporary, snapshot
+
+def test_is_temporary():
+    assert is_temporary('~$Прайс.xlsx')
+    assert is_temporary('.~lock.Прайс.xlsx#')
+    assert is_temporary('Прайс.xlsx.crdownload')
+    assert not is_temporary('Прайс.xlsx')
+
+def test_polling_watcher(tmp_path):
+    (tmp_path / '~$Прайс.xlsx').write_bytes(b'lock')
+    watcher = PollingWatcher([str(tmp_path)], interval=0.01)
+    assert snapshot([str(tmp_path)]) == {}
+    assert not watcher.wait(0.05)
+    (tmp_path / 'Прайс.xlsx.part').write_bytes(b'part')
+    assert not watcher.wait(0.05)
+    (tmp_path / 'Прайс.xlsx').write_bytes(b'data')
+    assert watcher.wait(1)
+    watcher.close()
@@ -0,0 +1,33 @@
+# Результат Excel: длинная таблица продолжается на следующих листах с заголовком, изменения цен
+# выделяются условным форматированием, ячейки оформлены именованными стилями
+import io
+import contextlib
+
+import openpyxl
+import pandas as pd
+
+from price_compare.pipeline import compare
+
+COLUMNS = ['№ услуги', 'Артикул', 'Наименование услуги', 'Стоимость услуг, руб.']
+
+def test_result_split_into_sheets(tmp_path):
+    df_old = pd.DataFrame([[i, f'A{i}', f'Услуга {i}', 100 + i] for i in range(30)], columns=COLUMNS)
+    df_new = pd.DataFrame([[i, f'A{i}', f'Услуга {i}', (100 + i) * (1.1 if i % 3 == 0 else 1)] for i in range(30)],
+                          columns=COLUMNS)
+    output_file = tmp_path / 'result.xlsx'
+    with contextlib.redirect_stdout(io.StringIO()):
+        compare(df_old, df_new, str(output_file), max_rows=12)
+    
+    workbook = openpyxl.load_workbook(output_file)
+    tables = [ws for ws in workbook.worksheets if ws.title not in ('Итоги', 'Итоги по разделам')]
+    assert len(tables) == 3
+    assert all(ws.max_row <= 12 for ws in tables)
+    articles = []
+    for ws in tables:
+        rows = list(ws.iter_rows(values_only=True))
+        assert rows[0][1].strip() == 'Артикул'
+        articles += [row[1].strip() for row in rows[1:]]
+        assert ws.conditional_formatting
+    assert articles == [f'A{i}' for i in range(30)]
+    assert 'Итоги' in workbook.sheetnames
+    assert {'Заголовок колонки', 'Цена', 'Наименование'} <= set(workbook.named_styles)